@@ -0,0 +1,74 @@
+import hmac
+import os
+import uuid
+
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse, JSONResponse
+
+from app.core.profiling import (
+    PROFILE_HEADER,
+    get_request_profiles_dir,
+    is_profiling_authorized,
+    is_valid_profile_name,
+    list_profiles,
+    profiling_enabled,
+)
+from app.core.settings import settings
+from app.infra.artifacts.analysis_artifacts_repository import AnalysisArtifactsRepository
+
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _check_admin(request: Request):
+    """None, если доступ разрешён, иначе готовый ответ (404 при выключенном профилировании)."""
+    if not profiling_enabled():
+        return JSONResponse(status_code=404, content={"detail": "Не найдено"})
+    token = request.headers.get(PROFILE_HEADER)
+    auth = request.headers.get("Authorization") or ""
+    if is_profiling_authorized(token) or hmac.compare_digest(auth, f"Bearer {settings.PROFILING_ADMIN_TOKEN}"):
+        return None
+    return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
+
+
+def _download(directory: str, name: str):
+    if not is_valid_profile_name(name):
+        return JSONResponse(status_code=400, content={"detail": "Некорректное имя профиля"})
+    path = os.path.join(directory, name)
+    if not os.path.isfile(path):
+        return JSONResponse(status_code=404, content={"detail": "Профиль не найден"})
+    media_type = "text/plain; charset=utf-8" if name.endswith(".txt") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=name)
+
+
+@router.get("/profiles", include_in_schema=False)
+async def list_request_profiles(request: Request):
+    denied = _check_admin(request)
+    if denied:
+        return denied
+    return JSONResponse({"profiles": list_profiles(get_request_profiles_dir())})
+
+
+@router.get("/profiles/requests/{name}", include_in_schema=False)
+async def download_request_profile(request: Request, name: str):
+    denied = _check_admin(request)
+    if denied:
+        return denied
+    return _download(get_request_profiles_dir(), name)
+
+
+@router.get("/profiles/analysis/{analysis_id}", include_in_schema=False)
+async def list_analysis_profiles(request: Request, analysis_id: uuid.UUID):
+    denied = _check_admin(request)
+    if denied:
+        return denied
+    directory = AnalysisArtifactsRepository.get_profiles_dir(str(analysis_id))
+    return JSONResponse({"analysis_id": str(analysis_id), "profiles": list_profiles(directory)})
+
+
+@router.get("/profiles/analysis/{analysis_id}/{name}", include_in_schema=False)
+async def download_analysis_profile(request: Request, analysis_id: uuid.UUID, name: str):
+    denied = _check_admin(request)
+    if denied:
+        return denied
+    return _download(AnalysisArtifactsRepository.get_profiles_dir(str(analysis_id)), name)
@@ -15,6 +15,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth.auth import uuid_by_token
 from app.infra.artifacts.analysis_artifacts_repository import AnalysisArtifactsRepository
 from app.infra.db.deps import get_db
+from app.infra.rate_limit import rate_limit
 from app.services.audit_service import AuditService
 from app.services.analysis_request_service import AnalysisRequestService
 from app.services.analysis_read_service import AnalysisReadService
@@ -40,6 +41,8 @@ async def history_endpoint(request: Request, db: AsyncSession = Depends(get_db))
                 "filename": getattr(row, "filename", None) or row[1],
                 "status": getattr(row, "status", None) or row[2],
                 "analysis_id": str(getattr(row, "analysis_id", None) or row[3]),
+                "danger_count": getattr(row, "danger_count", None),
+                "is_threat": bool(getattr(row, "danger_count", None)),
             }
         )
 
@@ -54,7 +57,7 @@ async def analysis_meta(request: Request, analysis_id: uuid.UUID, db: AsyncSessi
     return JSONResponse(payload)
 
 
-@router.post("/analyze")
+@router.post("/analyze", dependencies=[Depends(rate_limit("upload"))])
 async def analyze_file(request: Request, file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
     try:
         payload = await AnalysisRequestService(db).analyze_upload(request=request, file=file)
@@ -79,13 +82,13 @@ async def get_results(analysis_id: uuid.UUID, db: AsyncSession = Depends(get_db)
 async def get_results_chunk(analysis_id: uuid.UUID, offset: int = 0, limit: int = 50, db: AsyncSession = Depends(get_db)):
     try:
         userservice = UserService(db)
-        result, total = await userservice.get_chunk_result(str(analysis_id), offset, limit)
+        page = await userservice.get_chunk_result(str(analysis_id), offset, limit)
         await AuditService(db).log(
             request=None,
             event_type="analysis.results_chunk_viewed",
-            metadata={"analysis_id": str(analysis_id), "offset": offset, "limit": limit},
+            metadata={"analysis_id": str(analysis_id), "offset": page["offset"], "limit": page["limit"]},
         )
-        return JSONResponse({"chunk": result, "offset": offset, "limit": limit, "total": total})
+        return JSONResponse(page)
     except Exception as e:
         return JSONResponse(status_code=500, content={"detail": str(e)})
 
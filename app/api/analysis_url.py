@@ -1,31 +1,31 @@
+import asyncio
 import base64
 import hashlib
 import hmac
 import ipaddress
 import json
-import socket
 import time
 import uuid
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
-import redis
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.auth import uuid_by_token
+from app.infra.dns_resolver import is_ip_private_or_local, resolve_host_ips
+from app.infra.pinned_http import pinned_session
+from app.infra.rate_limit import rate_limit
+from app.infra.redis_client import get_redis
 from app.infra.db.deps import get_db
 from app.core.settings import settings
 from app.services.audit_service import AuditService
+from app.services.url_reputation_service import UrlReputationService
 from app.services.user_service import UserService
 from app.utils.file_operations import FileOperations
 from app.utils.logging import Logger
-from app.celery_app import download_url_and_enqueue_analysis_task
 
 
 router = APIRouter()
@@ -52,35 +52,7 @@ def _normalize_url(raw: str) -> str:
     return u
 
 
-def _is_ip_private_or_local(ip_str: str) -> bool:
-    try:
-        ip = ipaddress.ip_address(ip_str)
-        return (
-            ip.is_private
-            or ip.is_loopback
-            or ip.is_link_local
-            or ip.is_multicast
-            or ip.is_reserved
-            or ip.is_unspecified
-        )
-    except Exception:
-        return True
-
-
-def _resolve_host_ips(host: str) -> List[str]:
-    try:
-        infos = socket.getaddrinfo(host, None)
-    except Exception:
-        return []
-    ips = []
-    for info in infos:
-        sockaddr = info[4]
-        if sockaddr and len(sockaddr) >= 1:
-            ips.append(sockaddr[0])
-    return list(dict.fromkeys(ips))
-
-
-def _enforce_ssrf_protection(url: str) -> Dict[str, Any]:
+async def _enforce_ssrf_protection(url: str) -> Dict[str, Any]:
     parsed = urlparse(url)
     host = parsed.hostname
     if not host:
@@ -91,48 +63,21 @@ def _enforce_ssrf_protection(url: str) -> Dict[str, Any]:
 
     try:
         ipaddress.ip_address(host)
-        if _is_ip_private_or_local(host):
+        if is_ip_private_or_local(host):
             raise HTTPException(status_code=400, detail="Запрещено проверять локальные/приватные IP")
         resolved_ips = [host]
     except ValueError:
-        resolved_ips = _resolve_host_ips(host)
+        resolved_ips = await resolve_host_ips(host)
 
     if not resolved_ips:
         raise HTTPException(status_code=400, detail="Не удалось определить IP адрес хоста")
 
     for ip in resolved_ips:
-        if _is_ip_private_or_local(ip):
+        if is_ip_private_or_local(ip):
             raise HTTPException(status_code=400, detail="Запрещено проверять локальные/приватные IP")
 
-    return {"host": host, "resolved_ips": resolved_ips}
-
-
-def _url_rate_limit_key(user_id: str) -> str:
-    return f"filetrace:url_rate:{user_id}"
-
-
-def _check_url_rate_limit(user_id: str) -> None:
-    limit = int(getattr(settings, "URL_RATE_LIMIT_PER_MINUTE", 1) or 1)
-    if limit < 1:
-        return
-
-    r = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
-    key = _url_rate_limit_key(user_id)
-
-    now = int(time.time())
-    window = now // 60
-    window_key = f"{key}:{window}"
-
-    try:
-        cnt = r.incr(window_key)
-        if cnt == 1:
-            r.expire(window_key, 70)
-        if cnt > limit:
-            raise HTTPException(status_code=429, detail="Слишком много запросов. Попробуйте позже")
-    except HTTPException:
-        raise
-    except Exception:
-        return
+    # Further requests for this URL connect to the checked address instead of resolving the host again.
+    return {"host": host, "resolved_ips": resolved_ips, "pinned_ip": resolved_ips[0]}
 
 
 def _download_ticket_key(user_id: str, ticket: str) -> str:
@@ -183,7 +128,7 @@ def _verify_ticket(token: str) -> Dict[str, Any]:
 
 def _issue_download_ticket(user_id: str, url: str) -> Optional[str]:
     try:
-        r = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        r = get_redis()
         ticket = uuid.uuid4().hex
         key = _download_ticket_key(user_id, ticket)
         r.set(key, url, ex=5 * 60)
@@ -210,7 +155,7 @@ def _consume_download_ticket(user_id: str, ticket: str, url: str) -> None:
         return
 
     try:
-        r = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        r = get_redis()
         key = _download_ticket_key(user_id, ticket)
         stored = r.get(key)
         if not stored or stored != url:
@@ -249,8 +194,8 @@ def _enforce_url_file_policy(final_url: str, content_length: Optional[int]) -> D
     }
 
 
-def _fetch_head_or_range(url: str, *, timeout_s: int, max_redirects: int) -> Dict[str, Any]:
-    session = requests.Session()
+def _fetch_head_or_range(url: str, *, pinned_ip: Optional[str], timeout_s: int, max_redirects: int) -> Dict[str, Any]:
+    session = pinned_session(url, pinned_ip)
     session.max_redirects = max_redirects
 
     headers = {
@@ -289,134 +234,29 @@ def _fetch_head_or_range(url: str, *, timeout_s: int, max_redirects: int) -> Dic
         raise HTTPException(status_code=502, detail=f"Не удалось получить метаданные: {str(e)}")
 
 
-def _vt_url_report(url: str) -> Optional[Dict[str, Any]]:
-    api_key = getattr(settings, "VT_API_KEY", None)
-    if not api_key:
-        return None
-
-    try:
-        s = requests.Session()
-        headers = {"x-apikey": api_key}
-        submit = s.post(
-            "https://www.virustotal.com/api/v3/urls",
-            headers=headers,
-            data={"url": url},
-            timeout=15,
-        )
-        if not submit.ok:
-            return {"ok": False, "error": f"VT submit failed: {submit.status_code}", "raw": submit.text}
-
-        data = submit.json()
-        analysis_id = ((data or {}).get("data") or {}).get("id")
-        if not analysis_id:
-            return {"ok": False, "error": "VT did not return analysis id"}
-
-        report = s.get(
-            f"https://www.virustotal.com/api/v3/analyses/{analysis_id}",
-            headers=headers,
-            timeout=20,
-        )
-        if not report.ok:
-            return {"ok": False, "error": f"VT report failed: {report.status_code}", "raw": report.text}
-
-        rep = report.json()
-        stats = (((rep or {}).get("data") or {}).get("attributes") or {}).get("stats") or {}
-        return {"ok": True, "analysis_id": analysis_id, "stats": stats}
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
-
-
-def _yandex_sb_lookup(url: str) -> Optional[Dict[str, Any]]:
-    api_key = getattr(settings, "YANDEX_SB_API_KEY", None)
-    if not api_key:
-        return None
-
-    body = {
-        "client": {
-            "clientId": "filetrace",
-            "clientVersion": "1.0",
-        },
-        "threatInfo": {
-            "threatTypes": [
-                "MALWARE",
-                "SOCIAL_ENGINEERING",
-                "UNWANTED_SOFTWARE",
-                "POTENTIALLY_HARMFUL_APPLICATION",
-            ],
-            "platformTypes": ["ANY_PLATFORM"],
-            "threatEntryTypes": ["URL"],
-            "threatEntries": [{"url": url}],
-        },
-    }
-
-    try:
-        r = requests.post(
-            f"https://sba.yandex.net/v4/threatMatches:find?key={api_key}",
-            json=body,
-            timeout=15,
-        )
-        if not r.ok:
-            return {"ok": False, "error": f"Yandex SB failed: {r.status_code}", "raw": r.text}
-        data = r.json() if r.text else {}
-        matches = data.get("matches") if isinstance(data, dict) else None
-        return {"ok": True, "matches": matches or []}
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
-
-
-def _aggregate_verdict(vt: Optional[Dict[str, Any]], ysb: Optional[Dict[str, Any]]) -> Dict[str, Any]:
-    verdict = "unknown"
-    reasons: List[str] = []
-
-    vt_mal = 0
-    vt_susp = 0
-    if vt and vt.get("ok"):
-        stats = vt.get("stats") or {}
-        vt_mal = int(stats.get("malicious") or 0)
-        vt_susp = int(stats.get("suspicious") or 0)
-
-    y_matches = 0
-    if ysb and ysb.get("ok"):
-        y_matches = len(ysb.get("matches") or [])
-
-    if y_matches > 0:
-        verdict = "malicious"
-        reasons.append("yandex_safe_browsing_match")
-
-    if vt_mal > 0:
-        verdict = "malicious"
-        reasons.append("virustotal_malicious")
-    elif verdict != "malicious" and vt_susp > 0:
-        verdict = "suspicious"
-        reasons.append("virustotal_suspicious")
-
-    if verdict == "unknown" and ((vt and vt.get("ok")) or (ysb and ysb.get("ok"))):
-        verdict = "clean"
-
-    return {
-        "verdict": verdict,
-        "reasons": reasons,
-        "vt": vt,
-        "yandex": ysb,
-    }
+async def _fetch_meta(url: str, pinned_ip: Optional[str]) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None,
+        lambda: _fetch_head_or_range(
+            url,
+            pinned_ip=pinned_ip,
+            timeout_s=int(getattr(settings, "URL_META_TIMEOUT_SECONDS", 10) or 10),
+            max_redirects=int(getattr(settings, "URL_MAX_REDIRECTS", 5) or 5),
+        ),
+    )
 
 
-@router.post("/url/meta")
+@router.post("/url/meta", dependencies=[Depends(rate_limit("url"))])
 async def url_meta(request: Request, payload: UrlRequest):
     user_id = uuid_by_token(request.cookies.get("refresh_token"))
     if not user_id:
         raise HTTPException(status_code=401, detail="unauthorized")
 
-    _check_url_rate_limit(str(user_id))
-
     url = _normalize_url(payload.url)
-    ssrf = _enforce_ssrf_protection(url)
+    ssrf = await _enforce_ssrf_protection(url)
 
-    meta = _fetch_head_or_range(
-        url,
-        timeout_s=int(getattr(settings, "URL_META_TIMEOUT_SECONDS", 10) or 10),
-        max_redirects=int(getattr(settings, "URL_MAX_REDIRECTS", 5) or 5),
-    )
+    meta = await _fetch_meta(url, ssrf.get("pinned_ip"))
 
     headers = meta.get("headers") or {}
     content_type = headers.get("Content-Type") or headers.get("content-type")
@@ -443,31 +283,23 @@ async def url_meta(request: Request, payload: UrlRequest):
     )
 
 
-@router.post("/url/check")
+@router.post("/url/check", dependencies=[Depends(rate_limit("url"))])
 async def url_check(request: Request, payload: UrlRequest, db: AsyncSession = Depends(get_db)):
     user_id = uuid_by_token(request.cookies.get("refresh_token"))
     if not user_id:
         raise HTTPException(status_code=401, detail="unauthorized")
 
-    _check_url_rate_limit(str(user_id))
-
     url = _normalize_url(payload.url)
-    _enforce_ssrf_protection(url)
+    ssrf = await _enforce_ssrf_protection(url)
 
-    meta = _fetch_head_or_range(
-        url,
-        timeout_s=int(getattr(settings, "URL_META_TIMEOUT_SECONDS", 10) or 10),
-        max_redirects=int(getattr(settings, "URL_MAX_REDIRECTS", 5) or 5),
-    )
+    meta = await _fetch_meta(url, ssrf.get("pinned_ip"))
     headers = meta.get("headers") or {}
     content_length = headers.get("Content-Length") or headers.get("content-length")
     content_length_int = int(content_length) if str(content_length or "").isdigit() else None
     final_url = meta.get("final_url") or url
     policy = _enforce_url_file_policy(final_url, content_length_int)
 
-    vt = _vt_url_report(url)
-    ysb = _yandex_sb_lookup(url)
-    agg = _aggregate_verdict(vt, ysb)
+    agg = await UrlReputationService().check(url)
 
     ticket = _issue_download_ticket(str(user_id), url) if policy.get("can_download") and agg.get("verdict") != "malicious" else None
 
@@ -479,72 +311,14 @@ async def url_check(request: Request, payload: UrlRequest, db: AsyncSession = De
             "url": url,
             "verdict": agg.get("verdict"),
             "reasons": agg.get("reasons"),
+            "cached": agg.get("cached"),
         },
     )
 
     return JSONResponse({"url": url, "final_url": final_url, "content_length": content_length_int, **policy, **agg, "ticket": ticket})
 
 
-def _download_stream(url: str, *, timeout_s: int, max_bytes: int) -> bytes:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) FileTrace/1.0",
-        "Accept": "*/*",
-        "Connection": "close",
-    }
-    try:
-        s = requests.Session()
-        retry = Retry(
-            total=2,
-            connect=2,
-            read=2,
-            backoff_factor=0.5,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"],
-            raise_on_status=False,
-        )
-        s.mount("http://", HTTPAdapter(max_retries=retry))
-        s.mount("https://", HTTPAdapter(max_retries=retry))
-
-        timeout = (min(10, timeout_s), timeout_s)
-
-        with s.get(url, stream=True, timeout=timeout, headers=headers, allow_redirects=True) as r:
-            r.raise_for_status()
-            cl = r.headers.get("Content-Length") or r.headers.get("content-length")
-            if str(cl or "").isdigit() and max_bytes > 0 and int(cl) > max_bytes:
-                raise HTTPException(status_code=413, detail=f"Слишком большой файл по ссылке (лимит {max_bytes} bytes)")
-            buf = bytearray()
-            for chunk in r.iter_content(chunk_size=1024 * 256):
-                if not chunk:
-                    continue
-                buf.extend(chunk)
-                if len(buf) > max_bytes:
-                    raise HTTPException(status_code=413, detail="Слишком большой файл по ссылке")
-                if len(buf) >= 2 and buf[0:2] != b"MZ":
-                    raise HTTPException(status_code=400, detail="Файл по ссылке не похож на Windows PE (.exe)")
-            return bytes(buf)
-    except HTTPException:
-        raise
-    except requests.exceptions.ReadTimeout:
-        raise HTTPException(status_code=504, detail="Не удалось скачать файл: превышено время ожидания ответа сервера")
-    except requests.exceptions.ConnectTimeout:
-        raise HTTPException(status_code=504, detail="Не удалось скачать файл: превышено время ожидания соединения")
-    except requests.exceptions.ConnectionError as e:
-        msg = str(e)
-        if "ConnectionResetError" in msg or "10054" in msg:
-            raise HTTPException(
-                status_code=502,
-                detail=(
-                    "Не удалось скачать файл: удаленный хост разорвал соединение. "
-                    "Сайт может блокировать автоматическое скачивание (антибот/ограничения). "
-                    "Попробуйте скачать файл вручную и загрузить его через форму."
-                ),
-            )
-        raise HTTPException(status_code=502, detail=f"Не удалось скачать файл: ошибка соединения ({msg})")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Не удалось скачать файл: {str(e)}")
-
-
-@router.post("/url/download-and-analyze")
+@router.post("/url/download-and-analyze", dependencies=[Depends(rate_limit("url"))])
 async def url_download_and_analyze(request: Request, payload: UrlDownloadRequest, db: AsyncSession = Depends(get_db)):
     try:
         userservice = UserService(db)
@@ -553,18 +327,12 @@ async def url_download_and_analyze(request: Request, payload: UrlDownloadRequest
         if not uuid_user:
             raise HTTPException(status_code=401, detail="unauthorized")
 
-        _check_url_rate_limit(str(uuid_user))
-
         url = _normalize_url(payload.url)
-        _enforce_ssrf_protection(url)
+        ssrf = await _enforce_ssrf_protection(url)
 
         _consume_download_ticket(str(uuid_user), payload.ticket or "", url)
 
-        meta = _fetch_head_or_range(
-            url,
-            timeout_s=int(getattr(settings, "URL_META_TIMEOUT_SECONDS", 10) or 10),
-            max_redirects=int(getattr(settings, "URL_MAX_REDIRECTS", 5) or 5),
-        )
+        meta = await _fetch_meta(url, ssrf.get("pinned_ip"))
         headers = meta.get("headers") or {}
         content_length = headers.get("Content-Length") or headers.get("content-length")
         content_length_int = int(content_length) if str(content_length or "").isdigit() else None
@@ -608,7 +376,16 @@ async def url_download_and_analyze(request: Request, payload: UrlDownloadRequest
             },
         )
 
-        task = download_url_and_enqueue_analysis_task.delay(url, str(run_id), str(uuid_user), filename, pipeline_version)
+        from app.celery_app import download_url_and_enqueue_analysis_task
+
+        task = download_url_and_enqueue_analysis_task.delay(
+            url,
+            str(run_id),
+            str(uuid_user),
+            filename,
+            pipeline_version,
+            pinned_ip=ssrf.get("pinned_ip"),
+        )
         Logger.log(f"URL download queued. ID: {run_id}, task_id: {task.id}")
 
         return JSONResponse(
@@ -4,7 +4,8 @@ import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from app.auth.auth import uuid_by_token
-from app.infra.db.session import AsyncSessionLocal
+from app.core.metrics import WEBSOCKET_CONNECTIONS
+from app.infra.db.session import WsSessionLocal
 from app.services.analysis_ws_service import AnalysisWsService
 from app.utils.logging import Logger
 from app.utils.sse_operations import subscribers
@@ -49,7 +50,7 @@ async def websocket_endpoint(websocket: WebSocket, analysis_id: str):
         last_docker_len = 0
         while True:
             try:
-                async with AsyncSessionLocal() as db_ws:
+                async with WsSessionLocal() as db_ws:
                     ws_service = AnalysisWsService(db_ws)
                     result_data = await ws_service.get_analysis_snapshot(str(analysis_id))
 
@@ -85,6 +86,7 @@ async def websocket_endpoint(websocket: WebSocket, analysis_id: str):
 @router.websocket("/ws-history")
 async def websocket_history_endpoint(websocket: WebSocket):
     await websocket.accept()
+    WEBSOCKET_CONNECTIONS.labels(channel="history").inc()
     try:
         refresh_token = websocket.cookies.get("refresh_token")
         if not refresh_token:
@@ -95,7 +97,7 @@ async def websocket_history_endpoint(websocket: WebSocket):
         last_payload = None
         while True:
             try:
-                async with AsyncSessionLocal() as db_ws:
+                async with WsSessionLocal() as db_ws:
                     ws_service = AnalysisWsService(db_ws)
                     payload = await ws_service.get_history_payload(user_id=user_id)
                 payload_str = json.dumps(payload, ensure_ascii=False)
@@ -116,3 +118,5 @@ async def websocket_history_endpoint(websocket: WebSocket):
             await websocket.close()
         except Exception:
             pass
+    finally:
+        WEBSOCKET_CONNECTIONS.labels(channel="history").dec()
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from app.core.settings import settings
+
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live", include_in_schema=False)
+async def live():
+    return {"status": "ok"}
+
+
+@router.get("/ready", include_in_schema=False)
+async def ready(request: Request):
+    supervisor = getattr(request.app.state, "etw_supervisor", None)
+    collector = supervisor.status() if supervisor is not None else {"state": "stopped", "ready": False}
+    is_ready = bool(collector["ready"]) or not settings.HEALTH_READY_REQUIRE_COLLECTOR
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "not_ready", "collector": collector},
+    )
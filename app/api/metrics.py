@@ -0,0 +1,45 @@
+import hmac
+import ipaddress
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import render_latest, set_queue_depth
+from app.core.settings import settings
+from app.infra.db.deps import get_db
+from app.infra.rate_limit import client_ip
+from app.repositories.analysis_repository import AnalysisRepository
+
+
+router = APIRouter(tags=["metrics"])
+
+
+def _is_internal(ip: Optional[str]) -> bool:
+    try:
+        addr = ipaddress.ip_address(ip or "")
+    except ValueError:
+        return False
+    return addr.is_loopback or addr.is_private
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request, db: AsyncSession = Depends(get_db)):
+    if settings.METRICS_TOKEN:
+        auth = request.headers.get("Authorization") or ""
+        if not hmac.compare_digest(auth, f"Bearer {settings.METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+    elif not _is_internal(client_ip(request)):
+        # No token: fail closed for anything that is not loopback or a private network
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    try:
+        set_queue_depth(await AnalysisRepository(db).list_global_active())
+    except Exception:
+        # Stale queue depth is better than no metrics at all
+        logging.getLogger("app").exception("Failed to refresh queue depth metric")
+
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -1,6 +1,6 @@
 from fastapi import Response
 from fastapi.staticfiles import StaticFiles
-from app.core.security import verify_password
+from app.core.security import password_hasher
 from app.infra.db.deps import get_db
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -30,7 +30,7 @@ async def root(request: Request):
 async def register_user(request: Request, response: Response, user_data: UserRegistration, db: AsyncSession = Depends(get_db)):
     try:
         from app.utils.captcha import captcha
-        is_captcha_valid = captcha.verify_captcha(user_data.captcha_id, user_data.captcha_text)
+        is_captcha_valid = await captcha.verify_captcha(user_data.captcha_id, user_data.captcha_text)
         
         if not is_captcha_valid:
             return JSONResponse(
@@ -61,6 +61,8 @@ async def register_user(request: Request, response: Response, user_data: UserReg
             path="/",
         )
         return resp
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -137,7 +139,7 @@ async def login(request: Request, response: Response, user_data: UserLogin, db:
     try:
         if user_data.captcha_id and user_data.captcha_text:
             from app.utils.captcha import captcha
-            is_captcha_valid = captcha.verify_captcha(user_data.captcha_id, user_data.captcha_text)
+            is_captcha_valid = await captcha.verify_captcha(user_data.captcha_id, user_data.captcha_text)
             
             if not is_captcha_valid:
                 await AuditService(db).log(request=request, event_type="auth.captcha_required", metadata={"email": user_data.email})
@@ -216,6 +218,8 @@ async def login(request: Request, response: Response, user_data: UserLogin, db:
             path="/",
         )
         return resp
+    except HTTPException:
+        raise
     except Exception as e:
         await AuditService(db).log(request=request, event_type="error.app_exception", metadata={"route": "users.login", "error": str(e)})
         return JSONResponse(
@@ -270,7 +274,7 @@ async def refresh(request: Request, db: AsyncSession = Depends(get_db)):
 @router.get("/captcha")
 async def generate_captcha():
     from app.utils.captcha import captcha
-    return captcha.generate_captcha()
+    return await captcha.generate_captcha()
 
 @router.post("/logout")
 async def logout(response: Response, request: Request, db: AsyncSession = Depends(get_db)):
@@ -322,7 +326,7 @@ async def forgot_password_page(request: Request):
 async def forgot_password(request: Request, data: ForgotPasswordRequest, db: AsyncSession = Depends(get_db)):
     try:
         from app.utils.captcha import captcha
-        is_captcha_valid = captcha.verify_captcha(data.captcha_id, data.captcha_text)
+        is_captcha_valid = await captcha.verify_captcha(data.captcha_id, data.captcha_text)
 
         if not is_captcha_valid:
             return JSONResponse(
@@ -380,7 +384,7 @@ async def reset_password(request: Request, response: Response, token: str | None
 async def reset_password(request: Request, user_data: UserPasswordReset, db: AsyncSession = Depends(get_db)):
     try:
         from app.utils.captcha import captcha
-        is_captcha_valid = captcha.verify_captcha(user_data.captcha_id, user_data.captcha_text)
+        is_captcha_valid = await captcha.verify_captcha(user_data.captcha_id, user_data.captcha_text)
 
         if not is_captcha_valid:
             return JSONResponse(
@@ -408,8 +412,7 @@ async def reset_password(request: Request, user_data: UserPasswordReset, db: Asy
                     content={"detail": "Пользователь не найден"}
                 )
 
-            from app.core.security import get_password_hash
-            user.hashed_password = get_password_hash(user_data.password)
+            user.hashed_password = await password_hasher.hash(user_data.password)
             user.login_attempts = 0
             db.add(user)
             await db.commit()
@@ -428,6 +431,8 @@ async def reset_password(request: Request, user_data: UserPasswordReset, db: Asy
 
         await AuditService(db).log(request=request, event_type="user.password_changed", metadata={"by": "reset_password"})
         return {"message": "Пароль успешно обновлен"}
+    except HTTPException:
+        raise
     except Exception as e:
         await AuditService(db).log(request=request, event_type="error.app_exception", metadata={"route": "users.reset_password", "error": str(e)})
         return JSONResponse(
@@ -3,13 +3,11 @@ import certifi
 import string
 from random import choices
 from jose import JWTError, jwt
-from app.config.auth import SMTP
-from captcha.image import ImageCaptcha
 from passlib.context import CryptContext
-from fastapi_mail import FastMail, MessageSchema
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 from datetime import datetime, timedelta, timezone
+from app.core.settings import settings
 from app.config.auth import SECRET_KEY, ALGORITHM, REFRESH_TOKEN_EXPIRE_DAYS, ACCESS_TOKEN_EXPIRE_MINUTES
 
 
@@ -38,6 +36,8 @@ def generate_code():
     return ''.join(choices(string.digits, k=6))
 
 def generate_captcha():
+    from captcha.image import ImageCaptcha
+
     captcha = ImageCaptcha()
     text = ''.join(choices(string.ascii_letters + string.digits, k=6))
     captcha.write(text, "captcha.png")
@@ -64,6 +64,9 @@ def refresh_token(token: str = Depends(oauth2_scheme)):
     return uuid
 
 async def send_email(email: str, verification_code: str):
+    # fastapi_mail is heavy to import and only needed here
+    from fastapi_mail import FastMail, MessageSchema
+
     try:
         html_body = f"""
         <html>
@@ -81,13 +84,15 @@ async def send_email(email: str, verification_code: str):
             subtype="html"
         )
 
-        fm = FastMail(SMTP)
+        fm = FastMail(settings.SMTP)
 
         await fm.send_message(message)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to send email")
 
 async def send_reset_password_email(email: str, reset_link: str):
+    from fastapi_mail import FastMail, MessageSchema
+
     try:
         html_body = f"""
         <html>
@@ -108,7 +113,7 @@ async def send_reset_password_email(email: str, reset_link: str):
             subtype="html"
         )
 
-        fm = FastMail(SMTP)
+        fm = FastMail(settings.SMTP)
         await fm.send_message(message)
     except Exception as e:
         raise HTTPException(status_code=500, detail="Failed to send email")
\ No newline at end of file
@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from jose import jwt
+from jose.exceptions import JWTError
+
+from app.config.auth import SECRET_KEY, ALGORITHM, REFRESH_TOKEN_EXPIRE_DAYS
+from app.core.settings import settings
+from app.infra.redis_client import get_async_redis
+
+
+_REVOKED_REFRESH_TOKENS_KEY = "filetrace:revoked_refresh_tokens"
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class VerifiedTokenCache:
+    """
+    LRU уже проверенных токенов: sha256(токена) -> (sub, момент истечения).
+    Запись живёт не дольше exp токена и не дольше AUTH_TOKEN_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = max(0, int(ttl_seconds))
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, digest: str) -> Optional[str]:
+        key = (kind, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            sub, expires_at = entry
+            if expires_at <= time.time():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return sub
+
+    def put(self, kind: str, digest: str, sub: str, exp: Optional[float]) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        key = (kind, digest)
+        with self._lock:
+            self._entries[key] = (sub, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, kind: str, digest: str) -> None:
+        with self._lock:
+            self._entries.pop((kind, digest), None)
+
+
+token_cache = VerifiedTokenCache(
+    max_entries=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl_seconds=settings.AUTH_TOKEN_CACHE_TTL_SECONDS,
+)
+
+
+def _decode(token: str) -> Optional[dict]:
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+
+def verify_access_token(token: str) -> Optional[str]:
+    """sub валидного access-токена; проверка подписи выполняется один раз на время жизни записи в кэше."""
+    digest = token_digest(token)
+    sub = token_cache.get("access", digest)
+    if sub is not None:
+        return sub
+    payload = _decode(token)
+    if not payload or not payload.get("sub"):
+        return None
+    sub = str(payload["sub"])
+    token_cache.put("access", digest, sub, payload.get("exp"))
+    return sub
+
+
+async def _is_revoked(digest: str) -> Optional[bool]:
+    try:
+        return await get_async_redis().zscore(_REVOKED_REFRESH_TOKENS_KEY, digest) is not None
+    except Exception:
+        return None
+
+
+async def verify_refresh_token(token: str, lookup_user: Callable[[str], Awaitable[Any]]) -> Optional[str]:
+    """
+    sub refresh-токена, если он подписан, не истёк и всё ещё принадлежит пользователю.
+    При попадании в кэш БД не трогается: достаточно проверить список отозванных токенов в Redis.
+    """
+    digest = token_digest(token)
+    sub = token_cache.get("refresh", digest)
+    if sub is not None:
+        revoked = await _is_revoked(digest)
+        if revoked is False:
+            return sub
+        token_cache.discard("refresh", digest)
+        if revoked:
+            return None
+        # Redis is unavailable: fall back to the database check below.
+
+    payload = _decode(token)
+    if not payload or not payload.get("sub"):
+        return None
+
+    user = await lookup_user(token)
+    if user is None:
+        return None
+
+    sub = str(payload["sub"])
+    token_cache.put("refresh", digest, sub, payload.get("exp"))
+    return sub
+
+
+async def revoke_refresh_token(token: Optional[str]) -> None:
+    if not token:
+        return
+    digest = token_digest(token)
+    token_cache.discard("refresh", digest)
+
+    try:
+        exp = float(jwt.get_unverified_claims(token).get("exp") or 0)
+    except Exception:
+        exp = 0
+    now = time.time()
+    if not exp:
+        exp = now + REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+    elif exp <= now:
+        # Already expired: JWT validation rejects it everywhere without a revocation entry.
+        return
+
+    try:
+        r = get_async_redis()
+        pipe = r.pipeline(transaction=False)
+        # Score is the token expiry, so entries past it are pruned on the next revocation.
+        pipe.zadd(_REVOKED_REFRESH_TOKENS_KEY, {digest: exp})
+        pipe.zremrangebyscore(_REVOKED_REFRESH_TOKENS_KEY, "-inf", now)
+        await pipe.execute()
+    except Exception:
+        logging.getLogger("app").exception("Failed to publish refresh token revocation")
@@ -1,7 +1,10 @@
 import base64
 import hashlib
 import hmac
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
 from cryptography.fernet import Fernet
 from app.core.settings import settings
 
@@ -18,7 +21,19 @@ def _get_fernet() -> Fernet:
     return Fernet(key_bytes)
 
 
+def _get_hmac_key() -> bytes:
+    key = settings.HMAC_KEY or settings.SECRET_KEY
+    if isinstance(key, str):
+        return key.encode("utf-8")
+    return key
+
+
 _fernet = _get_fernet()
+_hmac_key = _get_hmac_key()
+
+_IP_CIPHER_CACHE_MAX = 4096
+_ip_cipher_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_ip_cipher_lock = threading.Lock()
 
 
 def normalize_email(email: str) -> str:
@@ -33,16 +48,47 @@ def decrypt_str(ciphertext: str) -> str:
     return _fernet.decrypt(ciphertext.encode("utf-8")).decode("utf-8")
 
 
+def encrypt_many(values: Sequence[str]) -> List[str]:
+    return [_fernet.encrypt(v.encode("utf-8")).decode("utf-8") for v in values]
+
+
 def hmac_hash(value: str) -> str:
-    key = settings.HMAC_KEY or settings.SECRET_KEY
-    if isinstance(key, str):
-        key_bytes = key.encode("utf-8")
-    else:
-        key_bytes = key
-    return hmac.new(key_bytes, value.encode("utf-8"), hashlib.sha256).hexdigest()
+    return hmac.new(_hmac_key, value.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def cached_ip_ciphertext(ip: str) -> Optional[str]:
+    """Ранее выданный шифротекст для IP, если он ещё в пределах окна AUDIT_IP_CIPHER_CACHE_SECONDS."""
+    window = int(settings.AUDIT_IP_CIPHER_CACHE_SECONDS or 0)
+    if window <= 0:
+        return None
+    with _ip_cipher_lock:
+        entry = _ip_cipher_cache.get(ip)
+        if entry is None:
+            return None
+        created_at, ciphertext = entry
+        if time.monotonic() - created_at > window:
+            _ip_cipher_cache.pop(ip, None)
+            return None
+        _ip_cipher_cache.move_to_end(ip)
+        return ciphertext
+
+
+def remember_ip_ciphertext(ip: str, ciphertext: str) -> None:
+    if int(settings.AUDIT_IP_CIPHER_CACHE_SECONDS or 0) <= 0:
+        return
+    with _ip_cipher_lock:
+        _ip_cipher_cache[ip] = (time.monotonic(), ciphertext)
+        _ip_cipher_cache.move_to_end(ip)
+        while len(_ip_cipher_cache) > _IP_CIPHER_CACHE_MAX:
+            _ip_cipher_cache.popitem(last=False)
 
 
 def encrypt_ip(ip: Optional[str]) -> Optional[str]:
     if not ip:
         return None
-    return encrypt_str(ip)
+    # Repeated requests from one address reuse the ciphertext instead of running Fernet again.
+    ciphertext = cached_ip_ciphertext(ip)
+    if ciphertext is None:
+        ciphertext = encrypt_str(ip)
+        remember_ip_ciphertext(ip, ciphertext)
+    return ciphertext
@@ -5,6 +5,8 @@ import time
 import uuid
 from contextvars import ContextVar
 
+from app.core.tracing import current_trace_id
+
 
 REQUEST_ID_CTX: ContextVar[str] = ContextVar("request_id", default="-")
 
@@ -15,6 +17,10 @@ class RequestIdFilter(logging.Filter):
             record.request_id = REQUEST_ID_CTX.get()
         except Exception:
             record.request_id = "-"
+        try:
+            record.trace_id = current_trace_id() or "-"
+        except Exception:
+            record.trace_id = "-"
         return True
 
 class JsonFormatter(logging.Formatter):
@@ -25,6 +31,7 @@ class JsonFormatter(logging.Formatter):
             "logger": record.name,
             "msg": record.getMessage(),
             "request_id": getattr(record, "request_id", "-"),
+            "trace_id": getattr(record, "trace_id", "-"),
         }
         if record.exc_info:
             log["exc_info"] = self.formatException(record.exc_info)
@@ -0,0 +1,187 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+from app.core.tracing import start_span
+from app.infra.redis_client import pool_stats, set_roundtrip_observer
+
+
+# With PROMETHEUS_MULTIPROC_DIR set (shared by API and Celery workers on one host) every process writes
+# its samples there and /metrics aggregates them; without it only the API process is reported.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir"))
+
+_STAGE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800)
+_WAIT_BUCKETS = (0.01, 0.1, 0.5, 1, 5, 15, 30, 60, 300, 900, 1800, 3600)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+_SIZE_BUCKETS = tuple(2 ** p for p in range(16, 34, 2))
+_ROWS_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+_ROWS_PER_SECOND_BUCKETS = (1e3, 5e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6)
+
+
+ANALYSIS_STAGE_SECONDS = Histogram(
+    "filetrace_analysis_stage_seconds",
+    "Duration of analysis pipeline stages",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+ANALYSIS_STAGE_FAILURES = Counter(
+    "filetrace_analysis_stage_failures_total",
+    "Analysis pipeline stages that raised",
+    ["stage"],
+)
+ANALYSIS_SLOT_WAIT_SECONDS = Histogram(
+    "filetrace_analysis_slot_wait_seconds",
+    "Time analyze_file waits for a MAX_CONCURRENT_ANALYSES slot",
+    buckets=_WAIT_BUCKETS,
+)
+ANALYSIS_QUEUE_DEPTH = Gauge(
+    "filetrace_analysis_queue_depth",
+    "Analyses waiting or running, by status",
+    ["status"],
+    multiprocess_mode="mostrecent",
+)
+TRACE_CSV_BYTES = Histogram(
+    "filetrace_trace_csv_bytes",
+    "Size of trace.csv produced by the ETW collector",
+    buckets=_SIZE_BUCKETS,
+)
+TRACE_CSV_ROWS = Histogram(
+    "filetrace_trace_csv_rows",
+    "Rows in trace.csv produced by the ETW collector",
+    buckets=_ROWS_BUCKETS,
+)
+CLEANER_ROWS_PER_SECOND = Histogram(
+    "filetrace_cleaner_rows_per_second",
+    "Cleaner throughput over trace.csv rows",
+    buckets=_ROWS_PER_SECOND_BUCKETS,
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "filetrace_websocket_connections",
+    "Open WebSocket connections",
+    ["channel"],
+    multiprocess_mode="livesum",
+)
+DB_CONNECTION_ACQUIRE_SECONDS = Histogram(
+    "filetrace_db_connection_acquire_seconds",
+    "Time to check a connection out of the SQLAlchemy pool",
+    ["role"],
+    buckets=_DB_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "filetrace_db_pool_checked_out",
+    "Connections currently checked out of the SQLAlchemy pools",
+    ["role"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CAPACITY = Gauge(
+    "filetrace_db_pool_capacity",
+    "pool_size + max_overflow of the SQLAlchemy pools (saturation = checked_out / capacity)",
+    ["role"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_TIMEOUTS = Counter(
+    "filetrace_db_pool_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS",
+    ["role"],
+)
+DB_STATEMENTS = Counter(
+    "filetrace_db_statements_total",
+    "SQL statements sent to PostgreSQL",
+    ["verb"],
+)
+ETW_COLLECTOR_UP = Gauge(
+    "filetrace_etw_collector_up",
+    "1 while the ETW collector answers /health, as seen by the API supervisor",
+    multiprocess_mode="mostrecent",
+)
+ETW_COLLECTOR_RESTARTS = Counter(
+    "filetrace_etw_collector_restarts_total",
+    "ETW collector restarts by the API supervisor after a crash or a lost health check",
+)
+REDIS_ROUNDTRIPS = Counter(
+    "filetrace_redis_roundtrips_total",
+    "Redis round trips (single commands and whole pipelines)",
+    ["kind"],
+)
+
+_SQL_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+def count_db_statement(statement: str) -> None:
+    words = statement.lstrip().lstrip("(").split(None, 1)
+    verb = words[0].upper() if words else ""
+    DB_STATEMENTS.labels(verb=verb.lower() if verb in _SQL_VERBS else "other").inc()
+
+
+set_roundtrip_observer(lambda kind: REDIS_ROUNDTRIPS.labels(kind=kind).inc())
+
+
+@contextmanager
+def observe_stage(stage: str, analysis_id=None) -> Iterator[None]:
+    """Гистограмма длительности стадии и span `analysis.<stage>` в текущем trace."""
+    start = time.perf_counter()
+    try:
+        with start_span(f"analysis.{stage}", attributes={"analysis.id": str(analysis_id) if analysis_id else None}):
+            yield
+    except BaseException:
+        ANALYSIS_STAGE_FAILURES.labels(stage=stage).inc()
+        raise
+    finally:
+        ANALYSIS_STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def set_queue_depth(rows) -> None:
+    counts = {"queued": 0, "running": 0}
+    for _, status, _ in rows:
+        if status in counts:
+            counts[status] += 1
+    for status, value in counts.items():
+        ANALYSIS_QUEUE_DEPTH.labels(status=status).set(value)
+
+
+class _RedisPoolCollector:
+    """Состояние пулов Redis текущего процесса на момент scrape."""
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "filetrace_redis_pool_connections",
+            "Redis pool connections of the API process",
+            labels=["kind", "decode_responses", "state"],
+        )
+        for pool in pool_stats():
+            labels = [pool["kind"], str(pool["decode_responses"]).lower()]
+            family.add_metric(labels + ["in_use"], pool["in_use"])
+            family.add_metric(labels + ["idle"], pool["idle"])
+            family.add_metric(labels + ["max"], pool["max_connections"])
+        yield family
+
+
+_redis_collector = _RedisPoolCollector()
+if not MULTIPROCESS:
+    REGISTRY.register(_redis_collector)
+
+
+def mark_process_dead(pid: int) -> None:
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+def render_latest() -> tuple[bytes, str]:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_redis_collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
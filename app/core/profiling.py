@@ -0,0 +1,125 @@
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.core.settings import settings
+from app.infra.docker.paths import get_docker_root
+
+
+PROFILE_HEADER = "X-Profile-Token"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*\.(pstats|txt)$")
+_SLUG_RE = re.compile(r"[^A-Za-z0-9]+")
+
+_lock = threading.Lock()
+_active_threads: set = set()
+
+
+def profiling_enabled() -> bool:
+    return bool(settings.PROFILING_ADMIN_TOKEN)
+
+
+def is_profiling_authorized(token: Optional[str]) -> bool:
+    if not settings.PROFILING_ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.strip(), settings.PROFILING_ADMIN_TOKEN)
+
+
+def get_request_profiles_dir() -> str:
+    return os.path.join(get_docker_root(), "profiles", "requests")
+
+
+def slugify(value: str, max_len: int = 60) -> str:
+    return _SLUG_RE.sub("-", value).strip("-")[:max_len] or "root"
+
+
+def is_valid_profile_name(name: str) -> bool:
+    return bool(_NAME_RE.match(name or ""))
+
+
+def _write(profiler: cProfile.Profile, out_dir: str, name: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{name}.pstats")
+    profiler.dump_stats(path)
+    # Human-readable top list next to the binary stats (snakeviz / gprof2dot / flameprof read .pstats)
+    buf = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buf)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(80)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(40)
+    with open(os.path.join(out_dir, f"{name}.txt"), "w", encoding="utf-8") as f:
+        f.write(buf.getvalue())
+    return path
+
+
+@contextmanager
+def profiled(out_dir: str, name: str) -> Iterator[bool]:
+    """
+    cProfile текущего потока на время блока; результат — <name>.pstats и <name>.txt в out_dir.
+    В async-коде в профиль попадают и другие корутины, выполнявшиеся на том же loop.
+    Если в потоке (или, на 3.12+, в процессе) профилировщик уже работает, блок выполняется без профиля.
+    """
+    tid = threading.get_ident()
+    with _lock:
+        busy = tid in _active_threads
+        if not busy:
+            _active_threads.add(tid)
+    if busy:
+        yield False
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12+: another profiler already owns sys.monitoring for the whole process
+        with _lock:
+            _active_threads.discard(tid)
+        yield False
+        return
+
+    try:
+        yield True
+    finally:
+        profiler.disable()
+        with _lock:
+            _active_threads.discard(tid)
+        try:
+            _write(profiler, out_dir, name)
+        except Exception:
+            logging.getLogger("app").exception("Failed to write profile %s", name)
+
+
+def profiled_call(out_dir: str, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Для функций, которые выполняются в отдельном потоке (run_in_executor)."""
+    with profiled(out_dir, name):
+        return fn(*args, **kwargs)
+
+
+def list_profiles(directory: str) -> List[Dict[str, Any]]:
+    try:
+        entries = [e for e in os.scandir(directory) if e.is_file() and is_valid_profile_name(e.name)]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return [{"name": e.name, "bytes": e.stat().st_size, "modified": e.stat().st_mtime} for e in entries]
+
+
+def prune_request_profiles(keep: int) -> None:
+    directory = get_request_profiles_dir()
+    stems: Dict[str, float] = {}
+    for item in list_profiles(directory):
+        stem = item["name"].rsplit(".", 1)[0]
+        stems[stem] = max(stems.get(stem, 0.0), item["modified"])
+    for stem in sorted(stems, key=stems.get, reverse=True)[max(0, keep):]:
+        for ext in ("pstats", "txt"):
+            try:
+                os.remove(os.path.join(directory, f"{stem}.{ext}"))
+            except OSError:
+                pass
@@ -1,7 +1,86 @@
+import asyncio
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import bcrypt
+from fastapi import HTTPException
+
+from app.core.settings import settings
+
+
+_BCRYPT_COST_RE = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
 
-def get_password_hash(password: str):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+def get_password_hash(password: str, rounds: int | None = None):
+    salt = bcrypt.gensalt(rounds=rounds or settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
\ No newline at end of file
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+class PasswordHasher:
+    """
+    bcrypt в отдельном ограниченном пуле потоков, чтобы не блокировать event loop.
+    Если очередь переполнена, запрос отклоняется с 429 вместо бесконечного ожидания.
+    """
+
+    def __init__(self, *, workers: int, max_pending: int, rounds: int):
+        self.workers = max(1, int(workers))
+        self.max_pending = max(self.workers, int(max_pending))
+        self.rounds = int(rounds)
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            return self._executor
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Слишком много запросов. Попробуйте позже",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        if not hashed_password:
+            return False
+        try:
+            return await self._run(verify_password, plain_password, hashed_password)
+        except ValueError:
+            # Malformed stored hash
+            return False
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        m = _BCRYPT_COST_RE.match(hashed_password or "")
+        return m is None or int(m.group(1)) != self.rounds
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    rounds=settings.BCRYPT_ROUNDS,
+)
@@ -1,11 +1,13 @@
 import os
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from dataclasses import dataclass
-from fastapi_mail import ConnectionConfig
 from dotenv import load_dotenv
 
 load_dotenv()
 
+if TYPE_CHECKING:
+    from fastapi_mail import ConnectionConfig
+
 def _get_bool(name: str, default: bool = False) -> bool:
     val = os.getenv(name)
     if val is None:
@@ -27,27 +29,122 @@ class Settings:
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = _get_int("ACCESS_TOKEN_EXPIRE_MINUTES", 30)
     REFRESH_TOKEN_EXPIRE_DAYS: int = _get_int("REFRESH_TOKEN_EXPIRE_DAYS", 7)
+    AUTH_TOKEN_CACHE_SIZE: int = _get_int("AUTH_TOKEN_CACHE_SIZE", 10000)
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = _get_int("AUTH_TOKEN_CACHE_TTL_SECONDS", 300)
+
+    BCRYPT_ROUNDS: int = _get_int("BCRYPT_ROUNDS", 12)
+    PASSWORD_HASH_WORKERS: int = _get_int("PASSWORD_HASH_WORKERS", 2)
+    PASSWORD_HASH_MAX_PENDING: int = _get_int("PASSWORD_HASH_MAX_PENDING", 32)
+
+    CAPTCHA_POOL_SIZE: int = _get_int("CAPTCHA_POOL_SIZE", 50)
+    CAPTCHA_POOL_REFILL_INTERVAL_SECONDS: int = _get_int("CAPTCHA_POOL_REFILL_INTERVAL_SECONDS", 5)
     ENCRYPTION_KEY: Optional[str] = os.getenv("ENCRYPTION_KEY")
     HMAC_KEY: Optional[str] = os.getenv("HMAC_KEY")
+    AUDIT_IP_CIPHER_CACHE_SECONDS: int = _get_int("AUDIT_IP_CIPHER_CACHE_SECONDS", 300)
 
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    REDIS_MAX_CONNECTIONS: int = _get_int("REDIS_MAX_CONNECTIONS", 50)
+    REDIS_POOL_TIMEOUT_SECONDS: int = _get_int("REDIS_POOL_TIMEOUT_SECONDS", 5)
+    REDIS_SOCKET_TIMEOUT_SECONDS: int = _get_int("REDIS_SOCKET_TIMEOUT_SECONDS", 5)
+    REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS: int = _get_int("REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS", 2)
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS: int = _get_int("REDIS_HEALTH_CHECK_INTERVAL_SECONDS", 30)
     PIPELINE_VERSION: str = os.getenv("PIPELINE_VERSION", "v1")
 
     MAX_CONCURRENT_ANALYSES: int = _get_int("MAX_CONCURRENT_ANALYSES", 1)
+    # AnalysisProgressWriter: analysis_log lines are written in one UPDATE per interval (or per N lines);
+    # status changes flush immediately. The WebSocket pushers poll the DB once a second.
+    ANALYSIS_LOG_FLUSH_INTERVAL_MS: int = _get_int("ANALYSIS_LOG_FLUSH_INTERVAL_MS", 1000)
+    ANALYSIS_LOG_FLUSH_MAX_LINES: int = _get_int("ANALYSIS_LOG_FLUSH_MAX_LINES", 200)
+
+    CELERY_SANDBOX_QUEUE: str = os.getenv("CELERY_SANDBOX_QUEUE", "sandbox")
+    CELERY_CPU_QUEUE: str = os.getenv("CELERY_CPU_QUEUE", "cpu")
+
+    ETW_COLLECTOR_URL: str = os.getenv("ETW_COLLECTOR_URL", "http://127.0.0.1:8765")
+    # run: `dotnet run` (builds the project on every start) | prebuilt: start the compiled binary
+    # | attach: never spawn, the collector is managed externally (service, load-test stub)
+    ETW_COLLECTOR_MODE: str = os.getenv("ETW_COLLECTOR_MODE", "run")
+    # prebuilt mode; default is etw_collector/bin/Release/net8.0/EtwCollector(.exe|.dll)
+    ETW_COLLECTOR_PATH: Optional[str] = os.getenv("ETW_COLLECTOR_PATH")
+    # stderr of a spawned collector (appended); the supervisor reports its tail when the process exits
+    ETW_COLLECTOR_LOG_PATH: str = os.getenv("ETW_COLLECTOR_LOG_PATH", os.path.join("logs", "etw_collector.log"))
+    # API-side supervisor: restart delay doubles from INITIAL up to MAX after failed starts or crashes
+    ETW_COLLECTOR_BACKOFF_INITIAL_SECONDS: int = _get_int("ETW_COLLECTOR_BACKOFF_INITIAL_SECONDS", 1)
+    ETW_COLLECTOR_BACKOFF_MAX_SECONDS: int = _get_int("ETW_COLLECTOR_BACKOFF_MAX_SECONDS", 60)
+    ETW_COLLECTOR_HEALTH_INTERVAL_SECONDS: int = _get_int("ETW_COLLECTOR_HEALTH_INTERVAL_SECONDS", 5)
+    # /health/ready answers 503 until the collector is up (sandbox hosts); off for plain API replicas
+    HEALTH_READY_REQUIRE_COLLECTOR: bool = _get_bool("HEALTH_READY_REQUIRE_COLLECTOR", False)
+    # cli | fake (loadtest.fake_docker: simulated build/run/diff for load tests without Windows)
+    DOCKER_BACKEND: str = os.getenv("DOCKER_BACKEND", "cli")
+
+    # `python main.py` only; reload re-imports the whole app (and restarts the collector) on every change
+    UVICORN_RELOAD: bool = _get_bool("UVICORN_RELOAD", False)
+    UVICORN_HOST: str = os.getenv("UVICORN_HOST", "0.0.0.0")
+    UVICORN_PORT: int = _get_int("UVICORN_PORT", 443)
 
     MAX_UPLOAD_BYTES: int = _get_int("MAX_UPLOAD_BYTES", 50 * 1024 * 1024)
 
     VT_API_KEY: Optional[str] = os.getenv("VT_API_KEY")
     YANDEX_SB_API_KEY: Optional[str] = os.getenv("YANDEX_SB_API_KEY")
+    VT_API_BASE_URL: str = os.getenv("VT_API_BASE_URL", "https://www.virustotal.com/api/v3")
+    YANDEX_SB_API_BASE_URL: str = os.getenv("YANDEX_SB_API_BASE_URL", "https://sba.yandex.net/v4")
+    URL_REPUTATION_VT_TIMEOUT_SECONDS: int = _get_int("URL_REPUTATION_VT_TIMEOUT_SECONDS", 30)
+    URL_REPUTATION_YANDEX_TIMEOUT_SECONDS: int = _get_int("URL_REPUTATION_YANDEX_TIMEOUT_SECONDS", 15)
+    URL_VERDICT_CACHE_TTL_SECONDS: int = _get_int("URL_VERDICT_CACHE_TTL_SECONDS", 60 * 60)
 
     URL_META_TIMEOUT_SECONDS: int = _get_int("URL_META_TIMEOUT_SECONDS", 10)
     URL_DOWNLOAD_TIMEOUT_SECONDS: int = _get_int("URL_DOWNLOAD_TIMEOUT_SECONDS", 30)
     URL_MAX_DOWNLOAD_BYTES: int = _get_int("URL_MAX_DOWNLOAD_BYTES", 50 * 1024 * 1024)
     URL_MAX_REDIRECTS: int = _get_int("URL_MAX_REDIRECTS", 5)
 
+    # Peers whose X-Real-IP / X-Forwarded-For are trusted as the client address (the nginx in etc/nginx)
+    TRUSTED_PROXIES: str = os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1")
     URL_RATE_LIMIT_PER_MINUTE: int = _get_int("URL_RATE_LIMIT_PER_MINUTE", 1)
+    URL_RATE_LIMIT_BURST: int = _get_int("URL_RATE_LIMIT_BURST", _get_int("URL_RATE_LIMIT_PER_MINUTE", 1))
+    URL_RATE_LIMIT_IP_PER_MINUTE: int = _get_int("URL_RATE_LIMIT_IP_PER_MINUTE", 30)
+    URL_RATE_LIMIT_IP_BURST: int = _get_int("URL_RATE_LIMIT_IP_BURST", 10)
+
+    UPLOAD_RATE_LIMIT_PER_MINUTE: int = _get_int("UPLOAD_RATE_LIMIT_PER_MINUTE", 5)
+    UPLOAD_RATE_LIMIT_BURST: int = _get_int("UPLOAD_RATE_LIMIT_BURST", 3)
+    UPLOAD_RATE_LIMIT_IP_PER_MINUTE: int = _get_int("UPLOAD_RATE_LIMIT_IP_PER_MINUTE", 20)
+    UPLOAD_RATE_LIMIT_IP_BURST: int = _get_int("UPLOAD_RATE_LIMIT_IP_BURST", 10)
+
+    DNS_RESOLVE_TIMEOUT_SECONDS: int = _get_int("DNS_RESOLVE_TIMEOUT_SECONDS", 5)
+    DNS_CACHE_MIN_TTL_SECONDS: int = _get_int("DNS_CACHE_MIN_TTL_SECONDS", 5)
+    DNS_CACHE_MAX_TTL_SECONDS: int = _get_int("DNS_CACHE_MAX_TTL_SECONDS", 300)
+    DNS_NEGATIVE_CACHE_TTL_SECONDS: int = _get_int("DNS_NEGATIVE_CACHE_TTL_SECONDS", 30)
 
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # Apply pending db/migrations on API startup; when disabled, run `python -m app.infra.db.migrations` before deploying
+    DB_MIGRATE_ON_STARTUP: bool = _get_bool("DB_MIGRATE_ON_STARTUP", True)
+    # Pools per process role (app/infra/db/session.py): API requests, Celery workers, WebSocket pushers
+    DB_POOL_SIZE_API: int = _get_int("DB_POOL_SIZE_API", 5)
+    DB_MAX_OVERFLOW_API: int = _get_int("DB_MAX_OVERFLOW_API", 10)
+    DB_POOL_SIZE_WORKER: int = _get_int("DB_POOL_SIZE_WORKER", 5)
+    DB_MAX_OVERFLOW_WORKER: int = _get_int("DB_MAX_OVERFLOW_WORKER", 5)
+    DB_POOL_SIZE_WS: int = _get_int("DB_POOL_SIZE_WS", 3)
+    DB_MAX_OVERFLOW_WS: int = _get_int("DB_MAX_OVERFLOW_WS", 7)
+    DB_POOL_TIMEOUT_SECONDS: int = _get_int("DB_POOL_TIMEOUT_SECONDS", 30)
+    DB_POOL_RECYCLE_SECONDS: int = _get_int("DB_POOL_RECYCLE_SECONDS", 300)
+    DB_COMMAND_TIMEOUT_SECONDS: int = _get_int("DB_COMMAND_TIMEOUT_SECONDS", 30)
+    # Behind pgbouncer (transaction pooling): no client pool, no prepared statement caches
+    DB_PGBOUNCER: bool = _get_bool("DB_PGBOUNCER", False)
+
+    # Bearer token for /metrics; empty serves only loopback/private clients (the real client behind
+    # TRUSTED_PROXIES), everyone else gets 403. etc/nginx also denies /metrics
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+
+    # Enables cProfile for requests/uploads sending X-Profile-Token and the /admin/profiles download endpoints
+    PROFILING_ADMIN_TOKEN: str = os.getenv("PROFILING_ADMIN_TOKEN", "")
+    PROFILING_MAX_REQUEST_PROFILES: int = _get_int("PROFILING_MAX_REQUEST_PROFILES", 200)
+
+    # Span export: none | file (OTLP/JSON lines in TRACING_FILE_PATH) | otlp (POST to an OTLP/HTTP collector)
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "none")
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", os.path.join("logs", "traces.jsonl"))
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces")
+    TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "filetrace")
+    TRACING_BATCH_SIZE: int = _get_int("TRACING_BATCH_SIZE", 256)
+    TRACING_FLUSH_INTERVAL_SECONDS: int = _get_int("TRACING_FLUSH_INTERVAL_SECONDS", 2)
+    TRACING_MAX_QUEUE: int = _get_int("TRACING_MAX_QUEUE", 10000)
 
     MAIL_USERNAME: Optional[str] = os.getenv("MAIL_USERNAME")
     MAIL_PASSWORD: Optional[str] = os.getenv("MAIL_PASSWORD")
@@ -59,7 +156,10 @@ class Settings:
     MAIL_FROM_NAME: Optional[str] = os.getenv("MAIL_FROM_NAME")
 
     @property
-    def SMTP(self) -> ConnectionConfig:
+    def SMTP(self) -> "ConnectionConfig":
+        # fastapi_mail (pydantic email validators, aiosmtplib) is only needed when a letter is actually sent
+        from fastapi_mail import ConnectionConfig
+
         return ConnectionConfig(
             MAIL_USERNAME=self.MAIL_USERNAME,
             MAIL_PASSWORD=self.MAIL_PASSWORD,
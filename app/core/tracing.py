@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from app.core.settings import settings
+
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+SPAN_KIND_PRODUCER = 4
+SPAN_KIND_CONSUMER = 5
+
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+@dataclass
+class SpanContext:
+    trace_id: str
+    span_id: str
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    kind: int = SPAN_KIND_INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def context(self) -> SpanContext:
+        return SpanContext(trace_id=self.trace_id, span_id=self.span_id)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _exporter.submit(self)
+
+
+# Either the active local span or a remote parent taken from traceparent.
+_CURRENT: ContextVar[Optional[SpanContext]] = ContextVar("trace_span", default=None)
+
+
+def current_span_context() -> Optional[SpanContext]:
+    return _CURRENT.get()
+
+
+def current_trace_id() -> Optional[str]:
+    ctx = _CURRENT.get()
+    return ctx.trace_id if ctx else None
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    m = _TRACEPARENT_RE.match((header or "").strip().lower())
+    if not m or m.group(1) == "0" * 32 or m.group(2) == "0" * 16:
+        return None
+    return SpanContext(trace_id=m.group(1), span_id=m.group(2))
+
+
+def format_traceparent(ctx: Optional[SpanContext] = None) -> Optional[str]:
+    ctx = ctx or _CURRENT.get()
+    if ctx is None:
+        return None
+    return f"00-{ctx.trace_id}-{ctx.span_id}-01"
+
+
+def begin_span(
+    name: str,
+    *,
+    parent: Optional[SpanContext] = None,
+    kind: int = SPAN_KIND_INTERNAL,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Span:
+    """Создаёт span без активации; для случаев, когда начало и конец в разных callback'ах (сигналы Celery)."""
+    parent = parent or _CURRENT.get()
+    span = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_span_id=parent.span_id if parent else None,
+        kind=kind,
+    )
+    for key, value in (attributes or {}).items():
+        span.set_attribute(key, value)
+    return span
+
+
+def activate(span: Span):
+    return _CURRENT.set(span.context)
+
+
+def deactivate(token) -> None:
+    _CURRENT.reset(token)
+
+
+@contextmanager
+def start_span(
+    name: str,
+    *,
+    parent: Optional[SpanContext] = None,
+    kind: int = SPAN_KIND_INTERNAL,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Iterator[Span]:
+    span = begin_span(name, parent=parent, kind=kind, attributes=attributes)
+    token = activate(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        deactivate(token)
+        span.end()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    data: Dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns or span.start_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+        "status": {"code": _STATUS_ERROR, "message": span.error} if span.error else {"code": _STATUS_OK},
+    }
+    if span.parent_span_id:
+        data["parentSpanId"] = span.parent_span_id
+    return data
+
+
+def to_otlp_json(spans: List[Span]) -> Dict[str, Any]:
+    """Пакет span'ов в формате OTLP/JSON (ExportTraceServiceRequest)."""
+    resource_attrs = {
+        "service.name": settings.TRACING_SERVICE_NAME,
+        "process.pid": os.getpid(),
+    }
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": k, "value": _otlp_value(v)} for k, v in resource_attrs.items()]},
+                "scopeSpans": [{"scope": {"name": "filetrace"}, "spans": [_otlp_span(s) for s in spans]}],
+            }
+        ]
+    }
+
+
+class SpanExporter:
+    """
+    Фоновая отправка завершённых span'ов пачками: в файл (одна OTLP/JSON строка на пачку)
+    или на OTLP/HTTP collector (/v1/traces). При переполнении очереди span'ы отбрасываются.
+    """
+
+    def __init__(self, *, mode: str, file_path: str, endpoint: str, batch_size: int, flush_interval_s: float, max_queue: int):
+        self.mode = (mode or "none").strip().lower()
+        self.file_path = file_path
+        self.endpoint = endpoint
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = max(0.1, float(flush_interval_s))
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in {"file", "otlp"}
+
+    def submit(self, span: Span) -> None:
+        if not self.enabled:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            # A forked worker inherits the queue object but not the thread.
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="filetrace-span-exporter", daemon=True)
+            self._thread.start()
+
+    def _drain(self) -> List[Span]:
+        batch: List[Span] = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval_s)
+            self.flush()
+
+    def flush(self) -> None:
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            try:
+                self._write(to_otlp_json(batch))
+            except Exception:
+                logging.getLogger("app").exception("Failed to export %d spans", len(batch))
+
+    def _write(self, payload: Dict[str, Any]) -> None:
+        if self.mode == "file":
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            line = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+            with self._write_lock, open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        elif self.mode == "otlp":
+            r = requests.post(self.endpoint, json=payload, timeout=5)
+            r.raise_for_status()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout=self.flush_interval_s + 5)
+        self.flush()
+
+
+_exporter = SpanExporter(
+    mode=settings.TRACING_EXPORTER,
+    file_path=settings.TRACING_FILE_PATH,
+    endpoint=settings.TRACING_OTLP_ENDPOINT,
+    batch_size=settings.TRACING_BATCH_SIZE,
+    flush_interval_s=settings.TRACING_FLUSH_INTERVAL_SECONDS,
+    max_queue=settings.TRACING_MAX_QUEUE,
+)
+
+
+def shutdown_tracing() -> None:
+    _exporter.shutdown()
@@ -26,10 +26,18 @@ class AnalysisArtifactsRepository:
     def get_trace_csv_path(cls, analysis_id: str) -> str:
         return os.path.join(cls.get_base_dir(analysis_id), "trace.csv")
 
+    @classmethod
+    def get_trace_csv_match_index_path(cls, analysis_id: str) -> str:
+        return os.path.join(cls.get_base_dir(analysis_id), "trace.csv.match.json")
+
     @classmethod
     def get_trace_etl_path(cls, analysis_id: str) -> str:
         return os.path.join(cls.get_base_dir(analysis_id), "trace.etl")
 
+    @classmethod
+    def get_profiles_dir(cls, analysis_id: str) -> str:
+        return os.path.join(cls.get_base_dir(analysis_id), "profiles")
+
     @staticmethod
     def read_json(path: str) -> Any:
         with open(path, "r", encoding="utf-8") as f:
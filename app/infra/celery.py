@@ -3,6 +3,8 @@ import os
 from celery import Celery
 
 from app.core.settings import settings
+from app.infra.celery_tracing import install_celery_tracing
+from app.infra.worker_runtime import install_worker_runtime
 
 
 def create_celery_app() -> Celery:
@@ -18,6 +20,14 @@ def create_celery_app() -> Celery:
         result_serializer="json",
         timezone="UTC",
         enable_utc=True,
+        # Sandbox stage holds a semaphore slot for minutes, so workers must not prefetch extra analyses.
+        worker_prefetch_multiplier=1,
+        task_routes={
+            "analyze_file": {"queue": settings.CELERY_SANDBOX_QUEUE},
+            "clean_analysis": {"queue": settings.CELERY_CPU_QUEUE},
+            # Every task needs an explicit queue: nothing consumes the default "celery" queue
+            "download_url_and_enqueue_analysis": {"queue": settings.CELERY_CPU_QUEUE},
+        },
     )
 
     if os.name == "nt":
@@ -25,4 +35,7 @@ def create_celery_app() -> Celery:
             worker_pool="threads",
         )
 
+    install_worker_runtime()
+    install_celery_tracing()
+
     return celery_app
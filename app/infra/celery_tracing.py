@@ -0,0 +1,97 @@
+import inspect
+import threading
+from typing import Any, Dict, Tuple
+
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun
+
+from app.core.logging import REQUEST_ID_CTX
+from app.core.tracing import (
+    SPAN_KIND_CONSUMER,
+    Span,
+    activate,
+    begin_span,
+    deactivate,
+    format_traceparent,
+    parse_traceparent,
+)
+
+
+_TRACEPARENT_HEADER = "traceparent"
+_REQUEST_ID_HEADER = "x_request_id"
+
+_active: Dict[str, Tuple[Span, Any, Any]] = {}
+_active_lock = threading.Lock()
+
+
+def _request_header(task, name: str):
+    # Protocol 2 exposes custom message headers as request attributes.
+    value = getattr(task.request, name, None)
+    if value:
+        return value
+    return (getattr(task.request, "headers", None) or {}).get(name)
+
+
+def _task_argument(task, args, kwargs, name: str):
+    # Tasks are enqueued positionally, so the name is resolved against the task signature
+    try:
+        bound = inspect.signature(task.run).bind_partial(*(args or ()), **(kwargs or {}))
+    except (TypeError, ValueError):
+        return (kwargs or {}).get(name)
+    return bound.arguments.get(name)
+
+
+def install_celery_tracing() -> None:
+    """Пробрасывает trace context (W3C traceparent) и request id через заголовки задач Celery."""
+
+    @before_task_publish.connect(weak=False)
+    def _inject(headers=None, **kwargs):
+        if headers is None:
+            return
+        traceparent = format_traceparent()
+        if traceparent:
+            headers.setdefault(_TRACEPARENT_HEADER, traceparent)
+        request_id = REQUEST_ID_CTX.get()
+        if request_id and request_id != "-":
+            headers.setdefault(_REQUEST_ID_HEADER, request_id)
+
+    @task_prerun.connect(weak=False)
+    def _start(task_id=None, task=None, args=None, kwargs=None, **extra):
+        if task is None or task_id is None:
+            return
+        span = begin_span(
+            f"celery.task {task.name}",
+            parent=parse_traceparent(_request_header(task, _TRACEPARENT_HEADER)),
+            kind=SPAN_KIND_CONSUMER,
+            attributes={
+                "celery.task_id": task_id,
+                "celery.queue": (getattr(task.request, "delivery_info", None) or {}).get("routing_key"),
+                "analysis.id": _task_argument(task, args, kwargs, "analysis_id"),
+            },
+        )
+        token = activate(span)
+        rid_token = REQUEST_ID_CTX.set(_request_header(task, _REQUEST_ID_HEADER) or task_id)
+        with _active_lock:
+            _active[task_id] = (span, token, rid_token)
+
+    @task_failure.connect(weak=False)
+    def _failed(task_id=None, exception=None, **extra):
+        with _active_lock:
+            entry = _active.get(task_id)
+        if entry is not None:
+            entry[0].error = f"{type(exception).__name__}: {exception}"
+
+    @task_postrun.connect(weak=False)
+    def _finish(task_id=None, state=None, **extra):
+        with _active_lock:
+            entry = _active.pop(task_id, None)
+        if entry is None:
+            return
+        span, token, rid_token = entry
+        span.set_attribute("celery.state", state)
+        try:
+            REQUEST_ID_CTX.reset(rid_token)
+            deactivate(token)
+        except ValueError:
+            # Reset from a different context (should not happen with prefork/threads pools)
+            pass
+        span.end()
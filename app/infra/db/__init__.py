@@ -1,6 +1,23 @@
 from app.infra.db.base import Base
-from app.infra.db.session import engine, AsyncSessionLocal
+from app.infra.db.session import AsyncSessionLocal, WsSessionLocal, get_engine, use_role
 from app.infra.db.deps import get_db
 from app.infra.db.init import init_db_from_sql
+from app.infra.db.migrations import apply_migrations
 
-__all__ = ["Base", "engine", "AsyncSessionLocal", "get_db", "init_db_from_sql"]
+__all__ = [
+    "Base",
+    "engine",
+    "AsyncSessionLocal",
+    "WsSessionLocal",
+    "get_engine",
+    "use_role",
+    "get_db",
+    "init_db_from_sql",
+    "apply_migrations",
+]
+
+
+def __getattr__(name: str):
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
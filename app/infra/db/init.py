@@ -2,7 +2,7 @@ import os
 from typing import List, Optional
 
 from sqlalchemy import text
-from app.infra.db.session import engine
+from app.infra.db.session import get_engine
 
 
 def _split_sql_statements(sql: str) -> List[str]:
@@ -33,6 +33,6 @@ async def init_db_from_sql(sql_path: Optional[str] = None) -> None:
         raw = f.read()
 
     statements = _split_sql_statements(raw)
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         for stmt in statements:
             await conn.execute(text(stmt))
\ No newline at end of file
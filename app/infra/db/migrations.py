@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.infra.db.init import _split_sql_statements
+
+
+_MIGRATION_FILE_RE = re.compile(r"^(\d{4})_[\w-]+\.sql$")
+# Arbitrary constant shared by every process that runs migrations against the same database.
+_MIGRATIONS_LOCK_ID = 748_201_113
+
+
+def get_migrations_dir() -> str:
+    return os.path.join("db", "migrations")
+
+
+def list_migrations(migrations_dir: Optional[str] = None) -> List[Tuple[str, str]]:
+    """(версия, путь) всех файлов миграций по порядку версий."""
+    migrations_dir = migrations_dir or get_migrations_dir()
+    found = []
+    for name in os.listdir(migrations_dir):
+        m = _MIGRATION_FILE_RE.match(name)
+        if m:
+            found.append((m.group(1), os.path.join(migrations_dir, name)))
+    found.sort()
+    versions = [v for v, _ in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {migrations_dir}")
+    return found
+
+
+async def apply_migrations(engine: Optional[AsyncEngine] = None, migrations_dir: Optional[str] = None) -> List[str]:
+    """
+    Применяет ещё не применённые миграции из db/migrations, каждую в своей транзакции.
+    Возвращает список применённых версий.
+    """
+    if engine is None:
+        from app.infra.db.session import engine
+
+    logger = logging.getLogger("app")
+    applied_now: List[str] = []
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "version VARCHAR(16) PRIMARY KEY, "
+                "name TEXT NOT NULL, "
+                "applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP)"
+            )
+        )
+
+    for version, path in list_migrations(migrations_dir):
+        async with engine.begin() as conn:
+            # Serialises concurrent starts (several API replicas or workers); released at commit.
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": _MIGRATIONS_LOCK_ID})
+            already = await conn.execute(
+                text("SELECT 1 FROM schema_migrations WHERE version = :version"), {"version": version}
+            )
+            if already.first() is not None:
+                continue
+
+            with open(path, "r", encoding="utf-8") as f:
+                raw = f.read()
+            for stmt in _split_sql_statements(raw):
+                await conn.execute(text(stmt))
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": version, "name": os.path.basename(path)},
+            )
+            applied_now.append(version)
+            logger.info("Applied migration %s", os.path.basename(path))
+
+    return applied_now
+
+
+async def _main() -> None:
+    from app.infra.db.session import engine
+
+    try:
+        applied = await apply_migrations(engine)
+        print(f"applied: {', '.join(applied) if applied else 'nothing to apply'}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -1,8 +1,20 @@
-import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.pool import NullPool
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
+from app.core.metrics import (
+    DB_CONNECTION_ACQUIRE_SECONDS,
+    DB_POOL_CAPACITY,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_TIMEOUTS,
+    count_db_statement,
+)
 from app.core.settings import settings
 
 
@@ -16,33 +28,152 @@ def _normalize_database_url(url: str) -> str:
 
 DATABASE_URL = _normalize_database_url(settings.DATABASE_URL)
 
-_engine_kwargs = {
-    "echo": False,
-    "pool_pre_ping": True,
-    "connect_args": {
-        "command_timeout": 30,
-    },
+# api: HTTP requests of the API process; worker: Celery tasks (analysis_log, status updates, results);
+# ws: WebSocket pushers that poll every second and must not starve API requests of connections.
+ROLES = ("api", "worker", "ws")
+
+_role = "api"
+_engines: Dict[str, AsyncEngine] = {}
+_sessionmakers: Dict[str, async_sessionmaker] = {}
+_lock = threading.Lock()
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет время получения соединения (включая ожидание свободного слота)."""
+
+    role = "api"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.labels(role=self.role).inc()
+            raise
+        finally:
+            DB_CONNECTION_ACQUIRE_SECONDS.labels(role=self.role).observe(time.perf_counter() - start)
+
+
+# Subclass per role, so the label survives pool.recreate() on dispose()
+_pool_classes = {
+    role: type(f"TimedAsyncAdaptedQueuePool_{role}", (TimedAsyncAdaptedQueuePool,), {"role": role})
+    for role in ROLES
 }
 
-if os.name == "nt":
-    _engine_kwargs.update(
-        {
-            "poolclass": NullPool,
-        }
-    )
-else:
-    _engine_kwargs.update(
+
+def _pool_limits(role: str) -> tuple:
+    return {
+        "api": (settings.DB_POOL_SIZE_API, settings.DB_MAX_OVERFLOW_API),
+        "worker": (settings.DB_POOL_SIZE_WORKER, settings.DB_MAX_OVERFLOW_WORKER),
+        "ws": (settings.DB_POOL_SIZE_WS, settings.DB_MAX_OVERFLOW_WS),
+    }[role]
+
+
+def _engine_kwargs(role: str) -> dict:
+    connect_args = {"command_timeout": settings.DB_COMMAND_TIMEOUT_SECONDS}
+    kwargs = {"echo": False, "connect_args": connect_args}
+
+    if settings.DB_PGBOUNCER:
+        # Transaction pooling hands each transaction a different server connection:
+        # named prepared statements and their caches would collide or go missing.
+        connect_args.update(
+            {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        )
+        kwargs["poolclass"] = NullPool
+        return kwargs
+
+    pool_size, max_overflow = _pool_limits(role)
+    kwargs.update(
         {
-            "pool_recycle": 300,
-            "pool_size": 5,
-            "max_overflow": 10,
+            "poolclass": _pool_classes[role],
+            "pool_pre_ping": True,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
         }
     )
+    return kwargs
+
+
+def _create_engine(role: str) -> AsyncEngine:
+    kwargs = _engine_kwargs(role)
+    new_engine = create_async_engine(DATABASE_URL, **kwargs)
+
+    @event.listens_for(new_engine.sync_engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        count_db_statement(statement)
+
+    @event.listens_for(new_engine.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.labels(role=role).inc()
+
+    @event.listens_for(new_engine.sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.labels(role=role).dec()
+
+    if "pool_size" in kwargs:
+        DB_POOL_CAPACITY.labels(role=role).set(kwargs["pool_size"] + kwargs["max_overflow"])
+    return new_engine
+
+
+def use_role(role: str) -> None:
+    """Роль процесса по умолчанию для engine и AsyncSessionLocal; вызывается до первого запроса к БД."""
+    global _role
+    if role not in ROLES:
+        raise ValueError(f"Unknown database role {role!r}, expected one of {', '.join(ROLES)}")
+    _role = role
+
+
+def current_role() -> str:
+    return _role
+
+
+def get_engine(role: Optional[str] = None) -> AsyncEngine:
+    role = role or _role
+    existing = _engines.get(role)
+    if existing is not None:
+        return existing
+    with _lock:
+        if role not in _engines:
+            _engines[role] = _create_engine(role)
+        return _engines[role]
+
+
+def get_sessionmaker(role: Optional[str] = None) -> async_sessionmaker:
+    role = role or _role
+    existing = _sessionmakers.get(role)
+    if existing is not None:
+        return existing
+    maker = async_sessionmaker(get_engine(role), class_=AsyncSession, expire_on_commit=False)
+    with _lock:
+        return _sessionmakers.setdefault(role, maker)
+
+
+def created_engines() -> Dict[str, AsyncEngine]:
+    return dict(_engines)
+
+
+class _RoleSessionFactory:
+    """async_sessionmaker нужной роли; без явной роли — роли процесса (use_role)."""
+
+    def __init__(self, role: Optional[str] = None):
+        self.role = role
+
+    def __call__(self, **kwargs) -> AsyncSession:
+        return get_sessionmaker(self.role)(**kwargs)
+
+
+AsyncSessionLocal = _RoleSessionFactory()
+WsSessionLocal = _RoleSessionFactory("ws")
 
-engine = create_async_engine(DATABASE_URL, **_engine_kwargs)
 
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
\ No newline at end of file
+def __getattr__(name: str):
+    # `engine` stays importable, but is created lazily for the role chosen by the process
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
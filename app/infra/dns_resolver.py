@@ -0,0 +1,144 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+
+from app.core.settings import settings
+
+
+_MAX_ENTRIES = 4096
+
+_cache: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+_inflight: Dict[str, asyncio.Task] = {}
+_resolver: Optional[dns.asyncresolver.Resolver] = None
+
+
+def is_ip_private_or_local(ip_str: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(ip_str)
+        return (
+            ip.is_private
+            or ip.is_loopback
+            or ip.is_link_local
+            or ip.is_multicast
+            or ip.is_reserved
+            or ip.is_unspecified
+        )
+    except Exception:
+        return True
+
+
+def _get_resolver() -> dns.asyncresolver.Resolver:
+    global _resolver
+    if _resolver is None:
+        _resolver = dns.asyncresolver.Resolver()
+        _resolver.lifetime = float(settings.DNS_RESOLVE_TIMEOUT_SECONDS)
+    return _resolver
+
+
+def _clamp_ttl(ttl: int) -> int:
+    return max(int(settings.DNS_CACHE_MIN_TTL_SECONDS), min(int(ttl), int(settings.DNS_CACHE_MAX_TTL_SECONDS)))
+
+
+async def _query(host: str, rdtype: str) -> Tuple[List[str], Optional[int]]:
+    try:
+        answer = await _get_resolver().resolve(host, rdtype)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        return [], None
+    ttl = answer.rrset.ttl if answer.rrset is not None else None
+    return [rr.to_text() for rr in answer], ttl
+
+
+async def _getaddrinfo(host: str) -> List[str]:
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(host, None, type=socket.SOCK_STREAM),
+            timeout=float(settings.DNS_RESOLVE_TIMEOUT_SECONDS),
+        )
+    except Exception:
+        return []
+    return [info[4][0] for info in infos if info[4]]
+
+
+async def _lookup(host: str) -> Tuple[List[str], int]:
+    try:
+        (v4, ttl4), (v6, ttl6) = await asyncio.gather(_query(host, "A"), _query(host, "AAAA"))
+        ips = v4 + v6
+        ttls = [t for t in (ttl4, ttl6) if t is not None]
+    except (dns.exception.DNSException, OSError):
+        ips, ttls = [], []
+
+    if ips:
+        return list(dict.fromkeys(ips)), _clamp_ttl(min(ttls) if ttls else settings.DNS_CACHE_MIN_TTL_SECONDS)
+
+    # Hosts from /etc/hosts or search domains are only visible to the system resolver.
+    ips = await _getaddrinfo(host)
+    if ips:
+        return list(dict.fromkeys(ips)), _clamp_ttl(settings.DNS_CACHE_MIN_TTL_SECONDS)
+    return [], int(settings.DNS_NEGATIVE_CACHE_TTL_SECONDS)
+
+
+def _cache_get(host: str) -> Optional[List[str]]:
+    entry = _cache.get(host)
+    if entry is None:
+        return None
+    expires_at, ips = entry
+    if expires_at <= time.monotonic():
+        _cache.pop(host, None)
+        return None
+    _cache.move_to_end(host)
+    return ips
+
+
+def _cache_put(host: str, ips: List[str], ttl: int) -> None:
+    if ttl <= 0:
+        return
+    _cache[host] = (time.monotonic() + ttl, ips)
+    _cache.move_to_end(host)
+    while len(_cache) > _MAX_ENTRIES:
+        _cache.popitem(last=False)
+
+
+async def resolve_host_ips(host: str) -> List[str]:
+    """Асинхронно резолвит хост в список IP с кэшем по TTL записей (включая негативный кэш)."""
+    host = (host or "").strip().lower().rstrip(".")
+    if not host:
+        return []
+
+    cached = _cache_get(host)
+    if cached is not None:
+        return list(cached)
+
+    task = _inflight.get(host)
+    if task is None:
+        # The lookup is a task of its own: a caller that is cancelled (client disconnect)
+        # stops waiting, while the lookup keeps running for the other waiters and the cache.
+        task = asyncio.get_running_loop().create_task(_lookup_and_cache(host))
+        _inflight[host] = task
+        task.add_done_callback(lambda t: _lookup_done(host, t))
+    return list(await asyncio.shield(task))
+
+
+async def _lookup_and_cache(host: str) -> List[str]:
+    ips, ttl = await _lookup(host)
+    _cache_put(host, ips, ttl)
+    return ips
+
+
+def _lookup_done(host: str, task: "asyncio.Task") -> None:
+    if _inflight.get(host) is task:
+        _inflight.pop(host, None)
+    if not task.cancelled():
+        # Mark retrieved so a lookup whose waiters all left does not log "exception never retrieved".
+        task.exception()
+
+
+def clear_dns_cache() -> None:
+    _cache.clear()
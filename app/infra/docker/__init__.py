@@ -3,7 +3,7 @@ from app.infra.docker.paths import (
     get_analysis_dir,
     ensure_analysis_dir,
 )
-from app.infra.docker.runner import DockerCli
+from app.infra.docker.runner import DockerCli, create_docker_cli
 from app.infra.docker.dockerfile_writer import write_analysis_dockerfile
 
 __all__ = [
@@ -11,5 +11,6 @@ __all__ = [
     "get_analysis_dir",
     "ensure_analysis_dir",
     "DockerCli",
+    "create_docker_cli",
     "write_analysis_dockerfile",
 ]
@@ -3,6 +3,8 @@ import subprocess
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
+from app.core.settings import settings
+
 
 @dataclass(frozen=True)
 class DockerResult:
@@ -73,3 +75,15 @@ class DockerCli:
         await self._run(["powershell", "-command", f"docker stop {self.container_name}"])
         await self._run(["powershell", "-command", f"docker rm {self.container_name}"])
         await self._run(["powershell", "-command", f"docker rmi {self.image_tag}"])
+
+
+def create_docker_cli(analysis_id: str):
+    """DockerCli или его замена из settings.DOCKER_BACKEND."""
+    backend = (settings.DOCKER_BACKEND or "cli").strip().lower()
+    if backend == "fake":
+        from loadtest.fake_docker import FakeDockerCli
+
+        return FakeDockerCli(analysis_id)
+    if backend != "cli":
+        raise ValueError(f"Unknown DOCKER_BACKEND: {settings.DOCKER_BACKEND}")
+    return DockerCli(analysis_id)
@@ -0,0 +1,82 @@
+import ipaddress
+import socket
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.infra.dns_resolver import is_ip_private_or_local
+
+
+class PinnedHostAdapter(HTTPAdapter):
+    """
+    HTTPAdapter, который подключается к заранее проверенному IP вместо повторного резолва хоста.
+    TLS (SNI и проверка сертификата) и заголовок Host при этом остаются на исходном имени.
+    Хосты, появившиеся после редиректов, резолвятся один раз и проходят ту же SSRF-проверку.
+    """
+
+    def __init__(self, pins: Optional[Dict[str, str]] = None, **kwargs):
+        self.pins: Dict[str, str] = {h.lower(): ip for h, ip in (pins or {}).items() if h and ip}
+        super().__init__(**kwargs)
+
+    def _pinned_ip(self, host: str) -> Optional[str]:
+        host = host.lower().strip("[]")
+        if host in self.pins:
+            return self.pins[host]
+
+        try:
+            ipaddress.ip_address(host)
+        except ValueError:
+            pass
+        else:
+            if is_ip_private_or_local(host):
+                raise requests.exceptions.ConnectionError(f"Запрещено подключаться к локальным/приватным IP: {host}")
+            return None
+
+        try:
+            infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        except OSError as e:
+            raise requests.exceptions.ConnectionError(f"Не удалось определить IP адрес хоста {host}: {e}")
+        ips = list(dict.fromkeys(info[4][0] for info in infos if info[4]))
+        if not ips:
+            raise requests.exceptions.ConnectionError(f"Не удалось определить IP адрес хоста {host}")
+        if any(is_ip_private_or_local(ip) for ip in ips):
+            raise requests.exceptions.ConnectionError(f"Запрещено подключаться к локальным/приватным IP: {host}")
+
+        self.pins[host] = ips[0]
+        return ips[0]
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        hostname = host_params["host"]
+        ip = self._pinned_ip(hostname)
+        if ip:
+            host_params["host"] = ip
+            if host_params["scheme"] == "https":
+                pool_kwargs["server_hostname"] = hostname
+                pool_kwargs["assert_hostname"] = hostname
+        return host_params, pool_kwargs
+
+    def send(self, request, **kwargs):
+        parsed = urlparse(request.url)
+        if parsed.hostname and self._pinned_ip(parsed.hostname):
+            host = parsed.hostname
+            if ":" in host:
+                host = f"[{host}]"
+            request.headers["Host"] = f"{host}:{parsed.port}" if parsed.port else host
+        else:
+            # Redirected requests inherit headers, so drop a Host left over from a pinned hop.
+            request.headers.pop("Host", None)
+        return super().send(request, **kwargs)
+
+
+def pinned_session(url: str, pinned_ip: Optional[str], **adapter_kwargs) -> requests.Session:
+    host = urlparse(url).hostname or ""
+    adapter = PinnedHostAdapter({host: pinned_ip} if pinned_ip else None, **adapter_kwargs)
+    session = requests.Session()
+    # Proxies from the environment would connect to the proxy instead of the checked address.
+    session.trust_env = False
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,160 @@
+import logging
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request
+
+from app.auth.auth import uuid_by_token
+from app.core.settings import settings
+from app.infra.redis_client import get_async_redis
+
+
+_RATE_LIMIT_KEY_PREFIX = "filetrace:rate:"
+
+# GCRA over several keys in one round trip: a request passes only if every key allows it,
+# and state is written only when it passes. Time comes from the Redis server, so API
+# replicas with skewed clocks share the same buckets.
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local new_tats = {}
+local retry_after = 0
+for i = 1, #KEYS do
+    local emission = tonumber(ARGV[2 * i - 1])
+    local burst = tonumber(ARGV[2 * i])
+    local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + emission
+    local allow_at = new_tat - burst * emission
+    if allow_at > now and allow_at - now > retry_after then
+        retry_after = allow_at - now
+    end
+    new_tats[i] = new_tat
+end
+if retry_after > 0 then
+    return {0, retry_after}
+end
+for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], new_tats[i], 'PX', new_tats[i] - now)
+end
+return {1, 0}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    per_minute: int
+    burst: int
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0 and self.burst > 0
+
+    @property
+    def emission_interval_ms(self) -> int:
+        return max(1, int(60_000 / self.per_minute))
+
+
+def _scope_policies(scope: str) -> Tuple[RateLimitPolicy, RateLimitPolicy]:
+    if scope == "url":
+        return (
+            RateLimitPolicy(settings.URL_RATE_LIMIT_PER_MINUTE, settings.URL_RATE_LIMIT_BURST),
+            RateLimitPolicy(settings.URL_RATE_LIMIT_IP_PER_MINUTE, settings.URL_RATE_LIMIT_IP_BURST),
+        )
+    if scope == "upload":
+        return (
+            RateLimitPolicy(settings.UPLOAD_RATE_LIMIT_PER_MINUTE, settings.UPLOAD_RATE_LIMIT_BURST),
+            RateLimitPolicy(settings.UPLOAD_RATE_LIMIT_IP_PER_MINUTE, settings.UPLOAD_RATE_LIMIT_IP_BURST),
+        )
+    raise ValueError(f"Unknown rate limit scope: {scope}")
+
+
+class RateLimiter:
+    async def hit(self, limits: Sequence[Tuple[str, RateLimitPolicy]]) -> float:
+        """Списывает по одному запросу со всех ключей; возвращает 0 или через сколько секунд повторить."""
+        active = [(key, policy) for key, policy in limits if policy.enabled]
+        if not active:
+            return 0.0
+
+        keys: List[str] = []
+        args: List[int] = []
+        for key, policy in active:
+            keys.append(_RATE_LIMIT_KEY_PREFIX + key)
+            args.extend((policy.emission_interval_ms, policy.burst))
+
+        script = get_async_redis().register_script(_GCRA_LUA)
+        allowed, retry_after_ms = await script(keys=keys, args=args)
+        if int(allowed):
+            return 0.0
+        return int(retry_after_ms) / 1000.0
+
+
+_limiter = RateLimiter()
+
+
+def _user_id_from_request(request: Request) -> Optional[str]:
+    token = request.cookies.get("refresh_token")
+    if not token:
+        return None
+    try:
+        user_id = uuid_by_token(token)
+    except Exception:
+        return None
+    return str(user_id) if user_id else None
+
+
+def _trusted_proxies() -> frozenset:
+    return frozenset(p.strip() for p in (settings.TRUSTED_PROXIES or "").split(",") if p.strip())
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """Адрес клиента; за доверенным прокси берётся из X-Real-IP / X-Forwarded-For."""
+    peer = request.client.host if request.client else None
+    trusted = _trusted_proxies()
+    if peer is None or peer not in trusted:
+        return peer
+
+    real_ip = (request.headers.get("x-real-ip") or "").strip()
+    if real_ip:
+        return real_ip
+    # Rightmost hop not added by our own proxies; the left part is whatever the client sent
+    for hop in reversed((request.headers.get("x-forwarded-for") or "").split(",")):
+        hop = hop.strip()
+        if hop and hop not in trusted:
+            return hop
+    return peer
+
+
+def rate_limit(scope: str):
+    """FastAPI dependency: лимит на пользователя и на IP для группы эндпоинтов (scope)."""
+    _scope_policies(scope)
+
+    async def _dependency(request: Request) -> None:
+        user_policy, ip_policy = _scope_policies(scope)
+        limits: List[Tuple[str, RateLimitPolicy]] = []
+
+        user_id = _user_id_from_request(request)
+        if user_id:
+            limits.append((f"{scope}:user:{user_id}", user_policy))
+        ip = client_ip(request)
+        if ip:
+            limits.append((f"{scope}:ip:{ip}", ip_policy))
+
+        try:
+            retry_after = await _limiter.hit(limits)
+        except Exception:
+            # Redis outage must not take the API down with it
+            logging.getLogger("app").exception("Rate limit check failed")
+            return
+
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Слишком много запросов. Попробуйте позже",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    return _dependency
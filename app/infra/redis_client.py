@@ -0,0 +1,146 @@
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+import redis
+import redis.asyncio as redis_asyncio
+
+from app.core.settings import settings
+
+
+_lock = threading.Lock()
+_sync_pools: Dict[bool, redis.BlockingConnectionPool] = {}
+_sync_pid: Optional[int] = None
+# asyncio connections are bound to the loop they were opened on, so async pools are kept per loop.
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[bool, redis_asyncio.BlockingConnectionPool]]" = (
+    weakref.WeakKeyDictionary()
+)
+# Set by app.core.metrics; kept as a hook so this module does not import the metrics registry.
+_roundtrip_observer: Optional[Callable[[str], None]] = None
+_counting_classes: Dict[type, type] = {}
+
+
+def set_roundtrip_observer(observer: Optional[Callable[[str], None]]) -> None:
+    global _roundtrip_observer
+    _roundtrip_observer = observer
+
+
+def _notify_roundtrip(kind: str) -> None:
+    observer = _roundtrip_observer
+    if observer is not None:
+        try:
+            observer(kind)
+        except Exception:
+            pass
+
+
+def _counting_connection_class(base: type, kind: str) -> type:
+    """Подкласс соединения пула (обычного, TLS или unix), который считает отправленные пакеты команд."""
+    # Called under _lock by the pool getters.
+    cls = _counting_classes.get(base)
+    if cls is not None:
+        return cls
+    if kind == "async":
+        async def send_packed_command(self, command, check_health=True):
+            _notify_roundtrip(kind)
+            return await base.send_packed_command(self, command, check_health)
+    else:
+        def send_packed_command(self, command, check_health=True):
+            _notify_roundtrip(kind)
+            return base.send_packed_command(self, command, check_health)
+    cls = type(f"Counting{base.__name__}", (base,), {"send_packed_command": send_packed_command})
+    _counting_classes[base] = cls
+    return cls
+
+
+def _pool_kwargs(decode_responses: bool) -> Dict[str, Any]:
+    return {
+        "decode_responses": decode_responses,
+        "max_connections": max(1, int(settings.REDIS_MAX_CONNECTIONS)),
+        "timeout": float(settings.REDIS_POOL_TIMEOUT_SECONDS),
+        "socket_timeout": float(settings.REDIS_SOCKET_TIMEOUT_SECONDS),
+        "socket_connect_timeout": float(settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS),
+        "socket_keepalive": True,
+        "health_check_interval": int(settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS),
+    }
+
+
+def get_redis(decode_responses: bool = True) -> redis.Redis:
+    """Синхронный клиент поверх общего пула процесса (пул пересоздаётся после fork)."""
+    global _sync_pid
+    with _lock:
+        if _sync_pid != os.getpid():
+            # Sockets inherited from the parent must not be shared with it.
+            _sync_pools.clear()
+            _sync_pid = os.getpid()
+        pool = _sync_pools.get(decode_responses)
+        if pool is None:
+            pool = redis.BlockingConnectionPool.from_url(settings.REDIS_URL, **_pool_kwargs(decode_responses))
+            pool.connection_class = _counting_connection_class(pool.connection_class, "sync")
+            _sync_pools[decode_responses] = pool
+    return redis.Redis(connection_pool=pool)
+
+
+def get_async_redis(decode_responses: bool = True) -> redis_asyncio.Redis:
+    """asyncio-клиент поверх общего пула текущего event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        pools = _async_pools.setdefault(loop, {})
+        pool = pools.get(decode_responses)
+        if pool is None:
+            pool = redis_asyncio.BlockingConnectionPool.from_url(settings.REDIS_URL, **_pool_kwargs(decode_responses))
+            pool.connection_class = _counting_connection_class(pool.connection_class, "async")
+            pools[decode_responses] = pool
+    return redis_asyncio.Redis(connection_pool=pool)
+
+
+async def close_async_redis() -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    with _lock:
+        pools = _async_pools.pop(loop, {})
+    for pool in pools.values():
+        try:
+            await pool.disconnect()
+        except Exception:
+            pass
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    stats: List[Dict[str, Any]] = []
+    with _lock:
+        sync_pools = list(_sync_pools.items()) if _sync_pid == os.getpid() else []
+        async_pools = [item for pools in _async_pools.values() for item in pools.items()]
+
+    for decode, pool in sync_pools:
+        created = len(getattr(pool, "_connections", []) or [])
+        idle = sum(1 for c in list(getattr(getattr(pool, "pool", None), "queue", []) or []) if c is not None)
+        stats.append(
+            {
+                "kind": "sync",
+                "decode_responses": decode,
+                "max_connections": pool.max_connections,
+                "created": created,
+                "in_use": max(0, created - idle),
+                "idle": idle,
+            }
+        )
+
+    for decode, pool in async_pools:
+        in_use = len(getattr(pool, "_in_use_connections", ()) or ())
+        idle = len(getattr(pool, "_available_connections", ()) or ())
+        stats.append(
+            {
+                "kind": "async",
+                "decode_responses": decode,
+                "max_connections": pool.max_connections,
+                "created": in_use + idle,
+                "in_use": in_use,
+                "idle": idle,
+            }
+        )
+    return stats
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from urllib3.util.retry import Retry
+
+from app.infra.docker.paths import get_docker_root
+from app.infra.pinned_http import pinned_session
+
+
+_CHUNK_SIZE = 1024 * 256
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) FileTrace/1.0",
+    "Accept": "*/*",
+    "Connection": "close",
+}
+
+
+@dataclass
+class DownloadedFile:
+    path: str
+    sha256: str
+    size: int
+
+    def discard(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def get_download_tmp_dir() -> str:
+    # Same filesystem as storage/files, so the result can be moved into the store with os.replace.
+    path = os.path.join(get_docker_root(), "storage", "tmp")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _stream_to_file(response: requests.Response, out, *, max_bytes: int) -> tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    header = b""
+    for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+        if not chunk:
+            continue
+        if len(header) < 2:
+            header += chunk[: 2 - len(header)]
+            if len(header) == 2 and header != b"MZ":
+                raise RuntimeError("Файл по ссылке не похож на Windows PE (.exe)")
+        size += len(chunk)
+        if max_bytes > 0 and size > max_bytes:
+            raise RuntimeError(f"Слишком большой файл по ссылке (лимит {max_bytes} bytes)")
+        digest.update(chunk)
+        out.write(chunk)
+
+    if len(header) < 2:
+        raise RuntimeError("Файл по ссылке не похож на Windows PE (.exe)")
+    return digest.hexdigest(), size
+
+
+def download_to_temp_file(url: str, *, pinned_ip: Optional[str], timeout_s: int, max_bytes: int) -> DownloadedFile:
+    """
+    Скачивает файл потоково во временный файл, считая sha256 на лету.
+    Ошибки поднимаются как RuntimeError с сообщением для пользователя.
+    """
+    retry = Retry(
+        total=2,
+        connect=2,
+        read=2,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    session = pinned_session(url, pinned_ip, max_retries=retry)
+    timeout = (min(10, timeout_s), timeout_s)
+
+    fd, tmp_path = tempfile.mkstemp(prefix="url_", suffix=".part", dir=get_download_tmp_dir())
+    try:
+        with os.fdopen(fd, "wb") as out:
+            with session.get(url, stream=True, timeout=timeout, headers=_HEADERS, allow_redirects=True) as r:
+                r.raise_for_status()
+                cl = r.headers.get("Content-Length")
+                if str(cl or "").isdigit() and max_bytes > 0 and int(cl) > max_bytes:
+                    raise RuntimeError(f"Слишком большой файл по ссылке (лимит {max_bytes} bytes)")
+                file_hash, size = _stream_to_file(r, out, max_bytes=max_bytes)
+        return DownloadedFile(path=tmp_path, sha256=file_hash, size=size)
+    except BaseException as e:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        if isinstance(e, (RuntimeError, KeyboardInterrupt, SystemExit)):
+            raise
+        raise RuntimeError(_describe_download_error(e)) from e
+    finally:
+        session.close()
+
+
+def _describe_download_error(e: BaseException) -> str:
+    if isinstance(e, requests.exceptions.ReadTimeout):
+        return "Не удалось скачать файл: превышено время ожидания ответа сервера"
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return "Не удалось скачать файл: превышено время ожидания соединения"
+    if isinstance(e, requests.exceptions.ConnectionError):
+        msg = str(e)
+        if "ConnectionResetError" in msg or "10054" in msg:
+            return (
+                "Не удалось скачать файл: удаленный хост разорвал соединение. "
+                "Сайт может блокировать автоматическое скачивание (антибот/ограничения). "
+                "Попробуйте скачать файл вручную и загрузить его через форму."
+            )
+        return f"Не удалось скачать файл: ошибка соединения ({msg})"
+    return f"Не удалось скачать файл: {str(e)}"
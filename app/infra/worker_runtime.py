@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
+
+from app.core.metrics import mark_process_dead
+from app.core.tracing import shutdown_tracing
+from app.infra.db.session import created_engines, use_role
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def _is_alive() -> bool:
+    return _loop is not None and _pid == os.getpid() and _thread is not None and _thread.is_alive()
+
+
+def start_worker_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _thread, _pid
+    with _lock:
+        if _is_alive():
+            return _loop
+
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        thread = threading.Thread(target=_run, name="filetrace-worker-loop", daemon=True)
+        thread.start()
+        ready.wait()
+
+        _loop, _thread, _pid = loop, thread, os.getpid()
+        return loop
+
+
+def stop_worker_loop(timeout_s: float = 10.0) -> None:
+    global _loop, _thread, _pid
+    with _lock:
+        if not _is_alive():
+            _loop, _thread, _pid = None, None, None
+            return
+        loop, thread = _loop, _thread
+        _loop, _thread, _pid = None, None, None
+
+    for engine in created_engines().values():
+        try:
+            asyncio.run_coroutine_threadsafe(engine.dispose(), loop).result(timeout=timeout_s)
+        except Exception:
+            pass
+
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout_s)
+    if not loop.is_running():
+        loop.close()
+
+
+def run_coro(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Выполняет корутину на долгоживущем event loop процесса воркера и ждёт результат."""
+    loop = _loop if _is_alive() else start_worker_loop()
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def install_worker_runtime() -> None:
+    @worker_init.connect(weak=False)
+    def _on_worker_init(**kwargs):
+        # Fires in the worker main process for every pool type (prefork children inherit it, threads share it)
+        use_role("worker")
+
+    @worker_process_init.connect(weak=False)
+    def _on_worker_process_init(**kwargs):
+        # Connections pooled before fork belong to the parent process; drop them without closing.
+        for engine in created_engines().values():
+            engine.sync_engine.dispose(close=False)
+        start_worker_loop()
+
+    @worker_process_shutdown.connect(weak=False)
+    def _on_worker_process_shutdown(**kwargs):
+        stop_worker_loop()
+        shutdown_tracing()
+        mark_process_dead(os.getpid())
+
+    @worker_shutdown.connect(weak=False)
+    def _on_worker_shutdown(**kwargs):
+        stop_worker_loop()
+        shutdown_tracing()
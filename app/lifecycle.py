@@ -4,18 +4,44 @@ from typing import AsyncIterator, Callable
 
 from fastapi import FastAPI
 
+from app.core.security import password_hasher
+from app.core.settings import settings
+from app.core.tracing import shutdown_tracing
+from app.infra.db.migrations import apply_migrations
+from app.infra.redis_client import close_async_redis
 from app.services.cleanup_service import CleanupService
 from app.services.etw_collector_singleton import etw_collector
+from app.services.etw_collector_supervisor import EtwCollectorSupervisor
+from app.services.url_reputation_service import close_url_reputation_clients
 
 def build_lifespan(cleanup_service: CleanupService) -> Callable[[FastAPI], AsyncIterator[None]]:
     @asynccontextmanager
     async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-        etw_collector.start_process()
+        if settings.DB_MIGRATE_ON_STARTUP:
+            await apply_migrations()
+        # PIL and the captcha pool are imported only when the app actually starts serving
+        from app.utils.captcha import captcha
+
+        # Not awaited: the API serves right away, collector readiness is reported by /health/ready
+        supervisor = EtwCollectorSupervisor(
+            etw_collector,
+            backoff_initial_s=settings.ETW_COLLECTOR_BACKOFF_INITIAL_SECONDS,
+            backoff_max_s=settings.ETW_COLLECTOR_BACKOFF_MAX_SECONDS,
+            check_interval_s=settings.ETW_COLLECTOR_HEALTH_INTERVAL_SECONDS,
+        )
+        app.state.etw_supervisor = supervisor
+        supervisor.start()
         await cleanup_service.start()
+        captcha.start_pool_producer()
         try:
             yield
         finally:
             await asyncio.shield(cleanup_service.stop())
-            etw_collector.stop_process()
+            await captcha.stop_pool_producer()
+            await close_url_reputation_clients()
+            await close_async_redis()
+            password_hasher.shutdown()
+            await supervisor.stop()
+            shutdown_tracing()
 
     return lifespan
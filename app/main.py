@@ -5,12 +5,16 @@ from app.api.main import router as main_router
 from app.api.users import router as user_router
 from app.api.analysis import router as analysis_router
 from app.api.documents import router as documents_router
+from app.api.metrics import router as metrics_router
+from app.api.admin import router as admin_router
+from app.api.health import router as health_router
 from app.services.cleanup_service import CleanupService
 from app.core.logging import setup_logging
 from app.auth.auth import verify_token
 from app.lifecycle import build_lifespan
 from app.middlewares.request_logging import install_request_logger
 from app.middlewares.auth_cookie_gate import install_cookie_auth_gate
+from app.middlewares.profiling import install_request_profiler
 from fastapi.responses import HTMLResponse, RedirectResponse
  
  
@@ -24,6 +28,7 @@ def create_app() -> FastAPI:
 
     install_request_logger(app)
     install_cookie_auth_gate(app)
+    install_request_profiler(app)
 
     @app.exception_handler(404)
     async def not_found_handler(request: Request, exc):
@@ -41,5 +46,8 @@ def create_app() -> FastAPI:
     app.include_router(analysis_router)
     app.include_router(documents_router)
     app.include_router(main_router)
+    app.include_router(metrics_router)
+    app.include_router(admin_router)
+    app.include_router(health_router)
 
     return app
\ No newline at end of file
@@ -1,9 +1,7 @@
-from jose import jwt
-from jose.exceptions import JWTError
 from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse
 
-from app.config.auth import SECRET_KEY, ALGORITHM
+from app.auth.token_cache import verify_access_token, verify_refresh_token
 from app.infra.db.session import AsyncSessionLocal
 from app.services.user_service import UserService
 from app.auth.auth import create_access_token
@@ -15,7 +13,10 @@ def install_cookie_auth_gate(app: FastAPI) -> None:
         def _is_public_path(path: str) -> bool:
             if path.startswith("/static/") or path.startswith("/media/") or path.startswith("/documents/"):
                 return True
-            if path in {"/", "/main/"}:
+            # Token-protected, see app/api/admin.py
+            if path.startswith("/admin/"):
+                return True
+            if path in {"/", "/main/", "/metrics", "/health/live", "/health/ready"}:
                 return True
             return False
 
@@ -24,12 +25,12 @@ def install_cookie_auth_gate(app: FastAPI) -> None:
             resp.delete_cookie(key="access_token", path="/")
             return resp
 
+        async def _lookup_user_by_refresh_token(token: str):
+            async with AsyncSessionLocal() as db2:
+                return await UserService(db2).get_refresh_token(refresh_token=token)
+
         def _try_decode(token: str) -> bool:
-            try:
-                jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-                return True
-            except JWTError:
-                return False
+            return verify_access_token(token) is not None
 
         path = request.url.path
         access_token = request.cookies.get("access_token")
@@ -56,40 +57,31 @@ def install_cookie_auth_gate(app: FastAPI) -> None:
                 return RedirectResponse(url="/users/")
 
             if refresh_token:
-                async with AsyncSessionLocal() as db2:
-                    try:
-                        user_service = UserService(db2)
-                        user = await user_service.get_refresh_token(refresh_token=refresh_token)
-                        if user is None:
-                            return await _clear_auth_cookies(RedirectResponse(url="/users/"))
-                    except Exception:
-                        response = await call_next(request)
-                        return await _clear_auth_cookies(response)
-
-                    try:
-                        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-                        user_id = payload.get("sub")
-                        if not user_id:
-                            return await _clear_auth_cookies(RedirectResponse(url="/users/"))
-                    except JWTError:
-                        return await _clear_auth_cookies(RedirectResponse(url="/users/"))
-
-                    needs_new_access = (not access_token) or (not _try_decode(access_token))
-                    if needs_new_access:
-                        new_access_token = create_access_token({"sub": user_id})
-                        response = await call_next(request)
-                        response.set_cookie(
-                            key="access_token",
-                            value=new_access_token,
-                            httponly=True,
-                            samesite="Lax",
-                            max_age=30 * 60,
-                            secure=(request.url.scheme == "https"),
-                            path="/",
-                        )
-                        return response
-
-                    return await call_next(request)
+                try:
+                    user_id = await verify_refresh_token(refresh_token, _lookup_user_by_refresh_token)
+                except Exception:
+                    response = await call_next(request)
+                    return await _clear_auth_cookies(response)
+
+                if not user_id:
+                    return await _clear_auth_cookies(RedirectResponse(url="/users/"))
+
+                needs_new_access = (not access_token) or (not _try_decode(access_token))
+                if needs_new_access:
+                    new_access_token = create_access_token({"sub": user_id})
+                    response = await call_next(request)
+                    response.set_cookie(
+                        key="access_token",
+                        value=new_access_token,
+                        httponly=True,
+                        samesite="Lax",
+                        max_age=30 * 60,
+                        secure=(request.url.scheme == "https"),
+                        path="/",
+                    )
+                    return response
+
+                return await call_next(request)
 
             if access_token and not _try_decode(access_token):
                 response = RedirectResponse(url="/users/")
@@ -0,0 +1,37 @@
+import secrets
+import time
+
+from fastapi import FastAPI, Request
+
+from app.core.profiling import (
+    PROFILE_HEADER,
+    get_request_profiles_dir,
+    is_profiling_authorized,
+    profiled,
+    profiling_enabled,
+    prune_request_profiles,
+    slugify,
+)
+from app.core.settings import settings
+
+
+def install_request_profiler(app: FastAPI) -> None:
+    # Not installed at all without PROFILING_ADMIN_TOKEN, so ordinary requests pay nothing.
+    if not profiling_enabled():
+        return
+
+    @app.middleware("http")
+    async def request_profiler(request: Request, call_next):
+        if not is_profiling_authorized(request.headers.get(PROFILE_HEADER)):
+            return await call_next(request)
+
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        name = f"{stamp}-{request.method.lower()}-{slugify(request.url.path)}-{secrets.token_hex(4)}"
+        with profiled(get_request_profiles_dir(), name) as active:
+            response = await call_next(request)
+        if active:
+            prune_request_profiles(settings.PROFILING_MAX_REQUEST_PROFILES)
+            response.headers["X-Profile-Id"] = name
+        else:
+            response.headers["X-Profile-Id"] = "busy"
+        return response
@@ -4,12 +4,20 @@ import time
 from fastapi import FastAPI, Request
 
 from app.core.logging import set_request_id, clear_request_id
+from app.core.tracing import SPAN_KIND_SERVER, activate, begin_span, deactivate, format_traceparent, parse_traceparent
 
 
 def install_request_logger(app: FastAPI) -> None:
     @app.middleware("http")
     async def request_logger(request: Request, call_next):
         rid = set_request_id(request.headers.get("X-Request-ID"))
+        span = begin_span(
+            f"{request.method} {request.url.path}",
+            parent=parse_traceparent(request.headers.get("traceparent")),
+            kind=SPAN_KIND_SERVER,
+            attributes={"http.method": request.method, "http.target": request.url.path, "request.id": rid},
+        )
+        span_token = activate(span)
         start = time.perf_counter()
         logger = logging.getLogger("app")
         try:
@@ -17,11 +25,16 @@ def install_request_logger(app: FastAPI) -> None:
             response = await call_next(request)
             duration_ms = (time.perf_counter() - start) * 1000
             response.headers["X-Request-ID"] = rid
+            response.headers["traceparent"] = format_traceparent(span.context)
+            span.set_attribute("http.status_code", response.status_code)
             logger.info(f"{request.method} {request.url.path} {response.status_code} {duration_ms:.1f}ms")
             return response
-        except Exception:
+        except Exception as e:
             duration_ms = (time.perf_counter() - start) * 1000
+            span.error = f"{type(e).__name__}: {e}"
             logger.exception(f"Unhandled error {request.method} {request.url.path} {duration_ms:.1f}ms")
             raise
         finally:
+            deactivate(span_token)
+            span.end()
             clear_request_id()
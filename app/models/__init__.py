@@ -2,5 +2,7 @@ from app.models.user import Users
 from app.models.analysis import Analysis
 from app.models.result import Results
 from app.models.analysis_subscriber import AnalysisSubscriber
+from app.models.analysis_summary import AnalysisSummary
+from app.models.file_activity_event import FileActivityEvent
 
-__all__ = ['Users', 'Analysis', 'Results', 'AnalysisSubscriber']
\ No newline at end of file
+__all__ = ['Users', 'Analysis', 'Results', 'AnalysisSubscriber', 'AnalysisSummary', 'FileActivityEvent']
\ No newline at end of file
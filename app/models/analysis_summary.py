@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, UUID, ForeignKey, Integer, BigInteger, Float, TIMESTAMP
+from sqlalchemy.dialects.postgresql import JSONB
+from app.infra.db.base import Base
+
+
+class AnalysisSummary(Base):
+    __tablename__ = "analysis_summary"
+
+    analysis_id = Column(UUID(as_uuid=True), ForeignKey("analysis.analysis_id", ondelete="CASCADE"), primary_key=True)
+    danger_count = Column(Integer, nullable=False, default=0)
+    threat_levels = Column(JSONB, nullable=False, default=dict)
+    trace_events = Column(Integer, nullable=False, default=0)
+    kept_events = Column(Integer, nullable=False, default=0)
+    tracked_processes = Column(Integer, nullable=False, default=0)
+    duration_seconds = Column(Float)
+    trace_csv_bytes = Column(BigInteger, nullable=False, default=0)
+    trace_etl_bytes = Column(BigInteger, nullable=False, default=0)
+    clean_tree_bytes = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
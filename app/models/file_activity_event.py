@@ -0,0 +1,11 @@
+from sqlalchemy import Column, UUID, ForeignKey, Integer, String, Text
+from app.infra.db.base import Base
+
+
+class FileActivityEvent(Base):
+    __tablename__ = "file_activity_events"
+
+    analysis_id = Column(UUID(as_uuid=True), ForeignKey("analysis.analysis_id", ondelete="CASCADE"), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    kind = Column(String(1), nullable=False)
+    path = Column(Text, nullable=False)
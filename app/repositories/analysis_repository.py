@@ -1,11 +1,12 @@
 import uuid
 from typing import List, Optional, Sequence, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import select, union, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.analysis import Analysis
 from app.models.analysis_subscriber import AnalysisSubscriber
+from app.models.analysis_summary import AnalysisSummary
 
 
 class AnalysisRepository:
@@ -21,12 +22,26 @@ class AnalysisRepository:
         return result.all()
 
     async def list_user_analyses(self, user_id: uuid.UUID) -> Sequence[Tuple]:
-        result = await self.db.execute(
-            select(Analysis.timestamp, Analysis.filename, Analysis.status, Analysis.analysis_id)
-            .outerjoin(AnalysisSubscriber, AnalysisSubscriber.analysis_id == Analysis.analysis_id)
-            .where((Analysis.user_id == user_id) | (AnalysisSubscriber.user_id == user_id))
-            .distinct(Analysis.analysis_id)
+        columns = (
+            Analysis.timestamp,
+            Analysis.filename,
+            Analysis.status,
+            Analysis.analysis_id,
+            AnalysisSummary.danger_count,
+        )
+        # Two index-backed branches instead of one OR across the subscriber join, which forces a seq scan.
+        own = (
+            select(*columns)
+            .outerjoin(AnalysisSummary, AnalysisSummary.analysis_id == Analysis.analysis_id)
+            .where(Analysis.user_id == user_id)
+        )
+        subscribed = (
+            select(*columns)
+            .join(AnalysisSubscriber, AnalysisSubscriber.analysis_id == Analysis.analysis_id)
+            .outerjoin(AnalysisSummary, AnalysisSummary.analysis_id == Analysis.analysis_id)
+            .where(AnalysisSubscriber.user_id == user_id)
         )
+        result = await self.db.execute(union(own, subscribed))
         return result.all()
 
     async def get_accessible_by_id(self, *, analysis_id: uuid.UUID, user_id: uuid.UUID) -> Optional[Analysis]:
@@ -41,17 +56,35 @@ class AnalysisRepository:
         )
         return result.scalars().first()
 
+    async def get_accessible_with_summary(
+        self, *, analysis_id: uuid.UUID, user_id: uuid.UUID
+    ) -> Optional[Tuple[Analysis, Optional[AnalysisSummary]]]:
+        result = await self.db.execute(
+            select(Analysis, AnalysisSummary)
+            .outerjoin(AnalysisSubscriber, AnalysisSubscriber.analysis_id == Analysis.analysis_id)
+            .outerjoin(AnalysisSummary, AnalysisSummary.analysis_id == Analysis.analysis_id)
+            .where(
+                (Analysis.analysis_id == analysis_id)
+                & ((Analysis.user_id == user_id) | (AnalysisSubscriber.user_id == user_id))
+            )
+            .limit(1)
+        )
+        return result.first()
+
     async def get_by_id(self, analysis_id: uuid.UUID) -> Optional[Analysis]:
         result = await self.db.execute(select(Analysis).where(Analysis.analysis_id == analysis_id))
         return result.scalars().first()
 
-    async def set_status(self, analysis_id: str, status: str) -> None:
-        analysis = await self.get_by_id(uuid.UUID(str(analysis_id)))
-        if not analysis:
-            return
-        analysis.status = status
-        self.db.add(analysis)
-        await self.db.commit()
+    async def set_status(self, analysis_id: str, status: str, *, commit: bool = True) -> None:
+        stmt = (
+            update(Analysis)
+            .where(Analysis.analysis_id == uuid.UUID(str(analysis_id)))
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(stmt)
+        if commit:
+            await self.db.commit()
 
     async def find_latest_completed_by_hash(self, *, file_hash: str, pipeline_version: str) -> Optional[Analysis]:
         result = await self.db.execute(
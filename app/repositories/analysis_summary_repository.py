@@ -0,0 +1,43 @@
+import uuid
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.analysis_summary import AnalysisSummary
+
+
+_SUMMARY_FIELDS = (
+    "danger_count",
+    "threat_levels",
+    "trace_events",
+    "kept_events",
+    "tracked_processes",
+    "duration_seconds",
+    "trace_csv_bytes",
+    "trace_etl_bytes",
+    "clean_tree_bytes",
+)
+
+
+class AnalysisSummaryRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_by_analysis_id(self, analysis_id: uuid.UUID) -> Optional[AnalysisSummary]:
+        result = await self.db.execute(select(AnalysisSummary).where(AnalysisSummary.analysis_id == analysis_id))
+        return result.scalars().first()
+
+    async def upsert(self, analysis_id: uuid.UUID, summary: Dict[str, Any]) -> None:
+        values = {k: summary[k] for k in _SUMMARY_FIELDS if k in summary}
+        stmt = insert(AnalysisSummary).values(analysis_id=analysis_id, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[AnalysisSummary.analysis_id], set_=values)
+        await self.db.execute(stmt)
+        await self.db.commit()
+
+    async def copy(self, *, source_analysis_id: uuid.UUID, target_analysis_id: uuid.UUID) -> None:
+        source = await self.get_by_analysis_id(source_analysis_id)
+        if source is None:
+            return
+        await self.upsert(target_analysis_id, {k: getattr(source, k) for k in _SUMMARY_FIELDS})
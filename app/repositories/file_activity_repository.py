@@ -0,0 +1,57 @@
+import uuid
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file_activity_event import FileActivityEvent
+
+
+_INSERT_BATCH_SIZE = 1000
+
+
+class FileActivityRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def replace(self, analysis_id: uuid.UUID, entries: Sequence[Tuple[str, str]]) -> None:
+        """Заменяет записи анализа; коммит остаётся за вызывающим."""
+        await self.db.execute(delete(FileActivityEvent).where(FileActivityEvent.analysis_id == analysis_id))
+        rows = [
+            {"analysis_id": analysis_id, "seq": seq, "kind": kind, "path": path}
+            for seq, (kind, path) in enumerate(entries)
+        ]
+        for start in range(0, len(rows), _INSERT_BATCH_SIZE):
+            await self.db.execute(insert(FileActivityEvent), rows[start : start + _INSERT_BATCH_SIZE])
+
+    async def clear(self, analysis_id: uuid.UUID) -> None:
+        await self.db.execute(delete(FileActivityEvent).where(FileActivityEvent.analysis_id == analysis_id))
+
+    async def copy(self, *, source_analysis_id: uuid.UUID, target_analysis_id: uuid.UUID) -> None:
+        await self.clear(target_analysis_id)
+        source = select(
+            literal(target_analysis_id, FileActivityEvent.analysis_id.type),
+            FileActivityEvent.seq,
+            FileActivityEvent.kind,
+            FileActivityEvent.path,
+        ).where(FileActivityEvent.analysis_id == source_analysis_id)
+        await self.db.execute(
+            insert(FileActivityEvent).from_select(["analysis_id", "seq", "kind", "path"], source)
+        )
+
+    async def get_chunk(self, analysis_id: uuid.UUID, *, offset: int, limit: int) -> List[Dict[str, str]]:
+        # seq is dense, so the page is a primary key range scan rather than OFFSET
+        result = await self.db.execute(
+            select(FileActivityEvent.kind, FileActivityEvent.path)
+            .where(FileActivityEvent.analysis_id == analysis_id, FileActivityEvent.seq >= offset)
+            .order_by(FileActivityEvent.seq)
+            .limit(limit)
+        )
+        return [{"kind": kind, "path": path} for kind, path in result.all()]
+
+    async def count(self, analysis_id: uuid.UUID) -> int:
+        result = await self.db.execute(
+            select(func.max(FileActivityEvent.seq)).where(FileActivityEvent.analysis_id == analysis_id)
+        )
+        last_seq = result.scalar()
+        return 0 if last_seq is None else int(last_seq) + 1
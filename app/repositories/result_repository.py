@@ -1,11 +1,17 @@
 import uuid
-from typing import Any, Optional, Tuple
+from typing import Any, Dict, Optional
 
-from sqlalchemy import select, text
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.analysis import Analysis
 from app.models.result import Results
+from app.repositories.file_activity_repository import FileActivityRepository
+from app.utils.docker_diff import parse_docker_diff
+
+
+_MAX_CHUNK_LIMIT = 500
 
 
 class ResultRepository:
@@ -26,13 +32,17 @@ class ResultRepository:
         await self.db.commit()
         return result
 
-    async def append_docker_output(self, analysis_id: str, msg: str) -> None:
-        result = await self.get_by_analysis_id(uuid.UUID(str(analysis_id)))
-        if not result:
-            return
-        result.docker_output = (result.docker_output or "") + msg
-        self.db.add(result)
-        await self.db.commit()
+    async def append_docker_output(self, analysis_id: str, msg: str, *, commit: bool = True) -> None:
+        # Appended in SQL: no SELECT and no rewrite of the whole log from Python
+        stmt = (
+            update(Results)
+            .where(Results.analysis_id == uuid.UUID(str(analysis_id)))
+            .values(docker_output=func.coalesce(Results.docker_output, "") + msg)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(stmt)
+        if commit:
+            await self.db.commit()
 
     async def set_results(self, analysis_id: str, result_data: str) -> None:
         result = await self.get_by_analysis_id(uuid.UUID(str(analysis_id)))
@@ -48,6 +58,7 @@ class ResultRepository:
             return
         result.file_activity = history
         self.db.add(result)
+        await FileActivityRepository(self.db).replace(result.analysis_id, parse_docker_diff(history))
         await self.db.commit()
 
     async def set_error(self, analysis_id: str, error_message: str) -> None:
@@ -57,25 +68,39 @@ class ResultRepository:
         result.docker_output = error_message
         result.file_activity = ""
         self.db.add(result)
+        await FileActivityRepository(self.db).clear(result.analysis_id)
         await self.db.commit()
 
-    async def get_chunk_result(self, analysis_id: str, offset: int = 0, limit: int = 50) -> Tuple[Any, Any]:
-        result = await self.db.execute(
-            text(
-                f"""
-                SELECT jsonb_path_query_array(
-                    file_activity,
-                    '$.items[{offset} to {offset + limit - 1}]'
-                )
-                FROM results
-                WHERE analysis_id = :analysis_id
-                """
-            ),
-            {"analysis_id": analysis_id},
-        )
+    async def backfill_file_activity(self, analysis_id: uuid.UUID, *, commit: bool = True) -> int:
+        """
+        Заполняет file_activity_events из results.file_activity, если строк ещё нет
+        (анализы, сохранённые до появления таблицы). Возвращает число записей.
+        """
+        repo = FileActivityRepository(self.db)
+        total = await repo.count(analysis_id)
+        if total:
+            return total
 
-        total = await self.db.execute(
-            text("""SELECT jsonb_array_length(file_activity) FROM results WHERE analysis_id = :analysis_id"""),
-            {"analysis_id": analysis_id},
-        )
-        return result.scalars().all(), total.scalars().first()
+        result = await self.db.execute(select(Results.file_activity).where(Results.analysis_id == analysis_id))
+        entries = parse_docker_diff(result.scalar())
+        if not entries:
+            return 0
+
+        await repo.replace(analysis_id, entries)
+        if commit:
+            try:
+                await self.db.commit()
+            except IntegrityError:
+                # A concurrent request backfilled the same analysis first
+                await self.db.rollback()
+        return len(entries)
+
+    async def get_chunk_result(self, analysis_id: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Страница file activity: chunk, total и фактически применённые (ограниченные) offset/limit."""
+        repo = FileActivityRepository(self.db)
+        analysis_uuid = uuid.UUID(str(analysis_id))
+        offset = max(0, int(offset))
+        limit = max(1, min(int(limit), _MAX_CHUNK_LIMIT))
+        total = await self.backfill_file_activity(analysis_uuid)
+        chunk = await repo.get_chunk(analysis_uuid, offset=offset, limit=limit) if offset < total else []
+        return {"chunk": chunk, "offset": offset, "limit": limit, "total": total}
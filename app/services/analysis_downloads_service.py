@@ -1,14 +1,21 @@
+import asyncio
 import os
 import uuid
 
 from fastapi import Request
-from fastapi.responses import FileResponse, JSONResponse, Response
+from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.infra.artifacts.analysis_artifacts_repository import AnalysisArtifactsRepository
 from app.repositories.analysis_repository import AnalysisRepository
 from app.services.audit_service import AuditService
-from app.utils.trace_csv_filter import filter_trace_csv_lines
+from app.utils.file_region_response import FileRegionResponse
+from app.utils.trace_csv_filter import get_trace_csv_match
+
+
+def _read_head(path: str, size: int) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(size)
 
 
 class AnalysisDownloadsService:
@@ -30,16 +37,27 @@ class AnalysisDownloadsService:
         analysis = await self.analysis_repo.get_by_id(analysis_uuid)
         filename = getattr(analysis, "filename", None) if analysis else None
 
-        filtered_lines = filter_trace_csv_lines(csv_file_path, filename)
+        # Only the first scan reads up to the target's first row; later downloads take the offset from the index
+        match = await asyncio.to_thread(
+            get_trace_csv_match,
+            csv_file_path,
+            filename,
+            AnalysisArtifactsRepository.get_trace_csv_match_index_path(analysis_id),
+        )
 
         await self.audit.log(request=request, event_type="analysis.trace_csv_downloaded", metadata={"analysis_id": analysis_id})
-        if filtered_lines is None:
-            return FileResponse(path=str(csv_file_path), filename=f"analysis_{analysis_id}_trace.csv", media_type="text/csv")
-
-        return Response(
-            content="".join(filtered_lines),
+        download_name = f"analysis_{analysis_id}_trace.csv"
+        if match is None or match[1] is None or match[1] == match[0]:
+            return FileResponse(path=str(csv_file_path), filename=download_name, media_type="text/csv")
+
+        header_end, offset = match
+        header = await asyncio.to_thread(_read_head, str(csv_file_path), header_end)
+        return FileRegionResponse(
+            str(csv_file_path),
+            offset=offset,
+            prefix=header,
+            filename=download_name,
             media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=analysis_{analysis_id}_trace.csv"},
         )
 
     async def download_clean_tree_csv(self, *, analysis_id: str, request: Request):
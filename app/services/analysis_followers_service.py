@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infra.artifacts.analysis_artifacts_repository import AnalysisArtifactsRepository
+from app.infra.db.session import AsyncSessionLocal
+from app.infra.redis_client import get_async_redis
+from app.repositories.analysis_repository import AnalysisRepository
+from app.repositories.analysis_summary_repository import AnalysisSummaryRepository
+from app.repositories.file_activity_repository import FileActivityRepository
+from app.repositories.result_repository import ResultRepository
+
+
+_FOLLOWERS_KEY_PREFIX = "filetrace:analysis_followers:"
+_FOLLOWERS_TTL_SECONDS = 60 * 60 * 2
+
+_ARTIFACT_FILENAMES = (
+    "trace.csv",
+    "trace.etl",
+    "trace.json",
+    "clean_tree.csv",
+    "clean_tree.json",
+    "threat_report.json",
+)
+
+
+def _followers_key(file_hash: str, pipeline_version: str) -> str:
+    return f"{_FOLLOWERS_KEY_PREFIX}{pipeline_version}:{file_hash}"
+
+
+def _copy_artifacts(src_analysis_id: str, dst_analysis_id: str) -> None:
+    try:
+        src_dir = AnalysisArtifactsRepository.get_base_dir(src_analysis_id)
+        dst_dir = AnalysisArtifactsRepository.get_base_dir(dst_analysis_id)
+        os.makedirs(dst_dir, exist_ok=True)
+
+        for name in _ARTIFACT_FILENAMES:
+            src = os.path.join(src_dir, name)
+            if os.path.exists(src):
+                shutil.copy2(src, os.path.join(dst_dir, name))
+    except Exception:
+        # Best-effort: artifacts are optional and may not exist
+        return
+
+
+class AnalysisFollowersService:
+    """
+    Дубликаты URL-анализов с тем же file_hash не ждут лидера в воркере:
+    они регистрируются в Redis как followers, а лидер по завершении сам переносит им результаты.
+    """
+
+    @staticmethod
+    async def copy_completed_analysis(
+        db: AsyncSession,
+        *,
+        source_analysis_id: uuid.UUID,
+        target_analysis_id: uuid.UUID,
+        file_hash: str,
+        pipeline_version: str,
+        filename: str | None = None,
+    ) -> None:
+        analysis_repo = AnalysisRepository(db)
+        results_repo = ResultRepository(db)
+
+        cached_result = await results_repo.get_by_analysis_id(source_analysis_id)
+        current_result = await results_repo.get_by_analysis_id(target_analysis_id)
+        current_analysis = await analysis_repo.get_by_id(target_analysis_id)
+        if current_analysis:
+            current_analysis.status = "completed"
+            current_analysis.file_hash = file_hash
+            current_analysis.pipeline_version = pipeline_version
+            if filename:
+                current_analysis.filename = filename
+
+        if cached_result and current_result:
+            current_result.file_activity = cached_result.file_activity
+            current_result.docker_output = cached_result.docker_output
+            current_result.results = cached_result.results
+
+        await results_repo.backfill_file_activity(source_analysis_id, commit=False)
+        await FileActivityRepository(db).copy(
+            source_analysis_id=source_analysis_id,
+            target_analysis_id=target_analysis_id,
+        )
+        await db.commit()
+        await AnalysisSummaryRepository(db).copy(
+            source_analysis_id=source_analysis_id,
+            target_analysis_id=target_analysis_id,
+        )
+        # trace.csv/trace.etl can be hundreds of MB; the worker loop is shared with other tasks
+        await asyncio.to_thread(_copy_artifacts, str(source_analysis_id), str(target_analysis_id))
+
+    @staticmethod
+    async def _resolve_follower(db: AsyncSession, *, leader, follower_analysis_id: uuid.UUID, file_hash: str, pipeline_version: str) -> None:
+        if leader is not None and leader.status == "completed":
+            await AnalysisFollowersService.copy_completed_analysis(
+                db,
+                source_analysis_id=leader.analysis_id,
+                target_analysis_id=follower_analysis_id,
+                file_hash=file_hash,
+                pipeline_version=pipeline_version,
+            )
+            return
+
+        analysis = await AnalysisRepository(db).get_by_id(follower_analysis_id)
+        result = await ResultRepository(db).get_by_analysis_id(follower_analysis_id)
+        if analysis and result:
+            analysis.status = "error"
+            result.docker_output = "Анализ с таким же файлом завершился с ошибкой"
+            result.file_activity = ""
+            result.results = ""
+            await db.commit()
+
+    @staticmethod
+    async def register_follower(
+        db: AsyncSession,
+        *,
+        leader_analysis_id: uuid.UUID,
+        follower_analysis_id: uuid.UUID,
+        file_hash: str,
+        pipeline_version: str,
+    ) -> None:
+        r = get_async_redis()
+        key = _followers_key(file_hash, pipeline_version)
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.sadd(key, str(follower_analysis_id))
+            pipe.expire(key, _FOLLOWERS_TTL_SECONDS)
+            await pipe.execute()
+
+        # The leader may have finished between find_active_by_hash and SADD; whoever removes
+        # the follower from the set first (leader or us) is the one that resolves it.
+        leader = await AnalysisRepository(db).get_by_id(leader_analysis_id)
+        if leader is not None:
+            # The identity map still holds the row loaded by find_active_by_hash
+            await db.refresh(leader)
+        if leader is not None and leader.status in {"queued", "running"}:
+            return
+        if await r.srem(key, str(follower_analysis_id)):
+            await AnalysisFollowersService._resolve_follower(
+                db,
+                leader=leader,
+                follower_analysis_id=follower_analysis_id,
+                file_hash=file_hash,
+                pipeline_version=pipeline_version,
+            )
+
+    @staticmethod
+    async def resolve_followers(*, leader_analysis_id: str, file_hash: str, pipeline_version: str) -> None:
+        if not file_hash:
+            return
+
+        logger = logging.getLogger("app")
+        key = _followers_key(file_hash, pipeline_version)
+        try:
+            async with get_async_redis().pipeline(transaction=True) as pipe:
+                pipe.smembers(key)
+                pipe.delete(key)
+                members, _ = await pipe.execute()
+        except Exception:
+            logger.exception(f"Failed to fetch followers of analysis {leader_analysis_id}")
+            return
+        if not members:
+            return
+
+        async with AsyncSessionLocal() as db:
+            try:
+                leader = await AnalysisRepository(db).get_by_id(uuid.UUID(str(leader_analysis_id)))
+            except Exception:
+                # Also called from the failure path of analyze_file, which must re-raise its own error
+                logger.exception(f"Failed to load leader analysis {leader_analysis_id}")
+                leader = None
+            for member in members:
+                try:
+                    await AnalysisFollowersService._resolve_follower(
+                        db,
+                        leader=leader,
+                        follower_analysis_id=uuid.UUID(str(member)),
+                        file_hash=file_hash,
+                        pipeline_version=pipeline_version,
+                    )
+                except Exception:
+                    logger.exception(f"Failed to resolve follower analysis {member}")
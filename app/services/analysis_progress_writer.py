@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.infra.db.session import AsyncSessionLocal
+from app.repositories.analysis_repository import AnalysisRepository
+from app.repositories.result_repository import ResultRepository
+
+
+logger = logging.getLogger("app")
+
+# Lines kept for the next attempt when a flush fails; beyond that the oldest are dropped
+_MAX_RETAINED_LINES = 10000
+
+
+class AnalysisProgressWriter:
+    """
+    Одна сессия БД на стадию анализа: строки analysis_log копятся и дописываются одним UPDATE
+    по таймеру (или при ANALYSIS_LOG_FLUSH_MAX_LINES строк), смена статуса сбрасывает буфер сразу.
+    AnalysisStatusService находит активный writer по analysis_id и пишет через него.
+    """
+
+    _active: Dict[str, "AnalysisProgressWriter"] = {}
+
+    def __init__(
+        self,
+        analysis_id: str,
+        flush_interval_s: Optional[float] = None,
+        max_pending_lines: Optional[int] = None,
+    ):
+        self.analysis_id = str(analysis_id)
+        if flush_interval_s is None:
+            flush_interval_s = settings.ANALYSIS_LOG_FLUSH_INTERVAL_MS / 1000
+        self.flush_interval_s = max(0.05, float(flush_interval_s))
+        self.max_pending_lines = max(1, int(max_pending_lines or settings.ANALYSIS_LOG_FLUSH_MAX_LINES))
+        self._lines: List[str] = []
+        self._status: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._db: Optional[AsyncSession] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._users = 0
+
+    @classmethod
+    def get(cls, analysis_id) -> Optional["AnalysisProgressWriter"]:
+        return cls._active.get(str(analysis_id))
+
+    @classmethod
+    @asynccontextmanager
+    async def open(cls, analysis_id) -> AsyncIterator["AnalysisProgressWriter"]:
+        """Writer анализа на время блока; вложенные open() того же анализа получают тот же writer."""
+        key = str(analysis_id)
+        writer = cls._active.get(key)
+        if writer is None:
+            writer = cls(key)
+            writer._start()
+            cls._active[key] = writer
+        writer._users += 1
+        try:
+            yield writer
+        finally:
+            writer._users -= 1
+            if writer._users == 0:
+                cls._active.pop(key, None)
+                await writer._close()
+
+    def log(self, line: str) -> None:
+        self._lines.append(line)
+        if len(self._lines) >= self.max_pending_lines:
+            self._wake.set()
+
+    async def set_status(self, status: str) -> None:
+        # Stage boundary: pushers and followers read the status from the DB
+        self._status = status
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            await self._flush_locked()
+
+    async def run(self, fn: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+        """Пишет буфер и выполняет fn(session) в сессии writer'а (fn коммитит сам)."""
+        async with self._lock:
+            await self._flush_locked()
+            try:
+                return await fn(self._session())
+            except Exception:
+                await self._session().rollback()
+                raise
+
+    def _session(self) -> AsyncSession:
+        if self._db is None:
+            self._db = AsyncSessionLocal()
+        return self._db
+
+    async def _flush_locked(self) -> None:
+        lines, status = self._lines, self._status
+        if not lines and status is None:
+            return
+        self._lines, self._status = [], None
+
+        db = self._session()
+        try:
+            if lines:
+                await ResultRepository(db).append_docker_output(self.analysis_id, "".join(lines), commit=False)
+            if status is not None:
+                await AnalysisRepository(db).set_status(self.analysis_id, status, commit=False)
+            await db.commit()
+        except Exception:
+            logger.exception(f"Failed to flush progress of analysis {self.analysis_id}")
+            try:
+                await db.rollback()
+            except Exception:
+                pass
+            self._lines = (lines + self._lines)[-_MAX_RETAINED_LINES:]
+            if self._status is None:
+                self._status = status
+
+    async def _run_timer(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # Cancellation in _close() must not interrupt a commit halfway
+            await asyncio.shield(self.flush())
+
+    def _start(self) -> None:
+        self._timer = asyncio.create_task(self._run_timer(), name=f"analysis-progress-{self.analysis_id}")
+
+    async def _close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+        try:
+            await self.flush()
+        finally:
+            if self._db is not None:
+                await self._db.close()
+                self._db = None
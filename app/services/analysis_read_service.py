@@ -13,17 +13,20 @@ class AnalysisReadService:
         self.analysis_repo = AnalysisRepository(db)
 
     async def get_meta(self, *, analysis_id: uuid.UUID, user_id: uuid.UUID) -> dict:
-        row = await self.analysis_repo.get_accessible_by_id(analysis_id=analysis_id, user_id=user_id)
-        if not row:
+        found = await self.analysis_repo.get_accessible_with_summary(analysis_id=analysis_id, user_id=user_id)
+        if not found:
             raise HTTPException(status_code=404, detail="analysis not found")
+        row, summary = found
 
         danger_count = 0
-        is_threat = False
-
-        threats = AnalysisArtifactsRepository.load_threat_report(str(analysis_id))
-        if isinstance(threats, list):
-            danger_count = len(threats)
-            is_threat = danger_count > 0
+        if summary is not None:
+            danger_count = int(summary.danger_count or 0)
+        else:
+            # Analyses finished before analysis_summary existed only have the report on disk.
+            threats = AnalysisArtifactsRepository.load_threat_report(str(analysis_id))
+            if isinstance(threats, list):
+                danger_count = len(threats)
+        is_threat = danger_count > 0
 
         return {
             "analysis_id": str(row.analysis_id),
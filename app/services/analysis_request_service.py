@@ -4,6 +4,7 @@ from fastapi import HTTPException, Request, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.auth import uuid_by_token
+from app.core.profiling import PROFILE_HEADER, is_profiling_authorized
 from app.core.settings import settings
 from app.services.audit_service import AuditService
 from app.services.hash_cache_service import HashCacheService
@@ -120,9 +121,16 @@ class AnalysisRequestService:
             },
         )
 
-        from app.celery_app import analyze_file_task
+        from app.celery_app import enqueue_analysis
 
-        task = analyze_file_task.delay(file.filename, str(run_id), str(uuid_user), file_hash, pipeline_version)
+        task = enqueue_analysis(
+            file.filename,
+            str(run_id),
+            str(uuid_user),
+            file_hash,
+            pipeline_version,
+            profile=is_profiling_authorized(request.headers.get(PROFILE_HEADER)),
+        )
         Logger.log(f"Файл загружен и анализ поставлен в очередь. ID анализа: {run_id}, task_id: {task.id}")
 
         return {
@@ -1,25 +1,37 @@
 import os
 import json
+import time
 import asyncio
 from fastapi import HTTPException
+from app.core.metrics import CLEANER_ROWS_PER_SECOND, TRACE_CSV_BYTES, TRACE_CSV_ROWS, observe_stage
+from app.core.profiling import profiled_call
 from app.utils.logging import Logger
+from app.services.analysis_progress_writer import AnalysisProgressWriter
 from app.services.analysis_status_service import AnalysisStatusService
 from app.utils.websocket_manager import manager
 
-from app.infra.docker import DockerCli, get_analysis_dir, write_analysis_dockerfile
+from app.infra.artifacts.analysis_artifacts_repository import AnalysisArtifactsRepository
+from app.infra.docker import create_docker_cli, get_analysis_dir, write_analysis_dockerfile
 from app.utils.cleaner import run_cleaner
 from app.services.etw_collector_singleton import etw_collector
 
+
+def _count_lines(path: str) -> int:
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+
 class AnalysisService:
-    def __init__(self, filename: str, analysis_id: str, uuid: str, file_hash: str, pipeline_version: str):
+    def __init__(self, filename: str, analysis_id: str, uuid: str, file_hash: str, pipeline_version: str, profile: bool = False):
         self.db = None
         self.uuid = uuid
         self.filename = filename
         self.analysis_id = analysis_id 
         self.file_hash = file_hash
         self.pipeline_version = pipeline_version
+        self.profile = profile
         self.lock = asyncio.Lock() 
-        self.docker_cli = DockerCli(str(self.analysis_id))
+        self.docker_cli = create_docker_cli(str(self.analysis_id))
 
     def update_dockerfile(self):
         write_analysis_dockerfile(analysis_id=str(self.analysis_id), filename=self.filename)
@@ -28,7 +40,8 @@ class AnalysisService:
         await AnalysisStatusService.analysis_log("Сборка Docker...", self.analysis_id)
         context_dir = get_analysis_dir(str(self.analysis_id))
         dockerfile_path = os.path.join(context_dir, "Dockerfile")
-        result = await self.docker_cli.build(dockerfile_path=dockerfile_path, context_dir=context_dir)
+        with observe_stage("build", self.analysis_id):
+            result = await self.docker_cli.build(dockerfile_path=dockerfile_path, context_dir=context_dir)
         if result.returncode != 0:
             if result.stdout:
                 await AnalysisStatusService.analysis_log(f"docker build stdout: {result.stdout.strip()}", self.analysis_id)
@@ -40,7 +53,8 @@ class AnalysisService:
     async def run_docker(self):
         await AnalysisStatusService.analysis_log("Запуск программы...", self.analysis_id)
         await asyncio.sleep(7)
-        result = await self.docker_cli.run()
+        with observe_stage("run", self.analysis_id):
+            result = await self.docker_cli.run()
         if result.returncode != 0:
             if result.stdout:
                 await AnalysisStatusService.analysis_log(f"docker run stdout: {result.stdout.strip()}", self.analysis_id)
@@ -58,46 +72,84 @@ class AnalysisService:
         if result.stderr:
             await AnalysisStatusService.analysis_log(f"docker logs stderr: {result.stderr.strip()}", self.analysis_id)
 
-    async def get_file_changes(self):
+    async def collect_file_changes(self):
         await AnalysisStatusService.analysis_log("Запуск отслеживания изменений...", self.analysis_id)
-        changes = await self.docker_cli.diff()
+        with observe_stage("diff", self.analysis_id):
+            changes = await self.docker_cli.diff()
 
         await AnalysisStatusService.analysis_log("Остановка программы...", self.analysis_id)
 
         await self.docker_cli.stop_rm_rmi()
+        return changes
 
+    async def clean_logs(self):
         try:
             await AnalysisStatusService.analysis_log("Очистка логов...", self.analysis_id)
             loop = asyncio.get_event_loop()
             base_dir = get_analysis_dir(str(self.analysis_id))
             target_exe = self.filename
-            result = await loop.run_in_executor(None, run_cleaner, target_exe, base_dir)
+            start = time.perf_counter()
+            with observe_stage("clean", self.analysis_id):
+                if self.profile:
+                    # The cleaner runs in an executor thread, outside the finalize profile of the loop thread
+                    result = await loop.run_in_executor(
+                        None,
+                        profiled_call,
+                        AnalysisArtifactsRepository.get_profiles_dir(str(self.analysis_id)),
+                        "cleaner",
+                        run_cleaner,
+                        target_exe,
+                        base_dir,
+                    )
+                else:
+                    result = await loop.run_in_executor(None, run_cleaner, target_exe, base_dir)
+            elapsed = time.perf_counter() - start
+            if result and elapsed > 0:
+                CLEANER_ROWS_PER_SECOND.observe(result.get("trace_events", 0) / elapsed)
             await AnalysisStatusService.analysis_log("Очистка завершена", self.analysis_id)
+            return result
         except Exception as e:
             await AnalysisStatusService.analysis_log(f"Ошибка при очистке логов: {str(e)}", self.analysis_id)
             raise HTTPException(status_code=500, detail=str(e))
 
+    async def get_file_changes(self):
+        changes = await self.collect_file_changes()
+        await self.clean_logs()
         await AnalysisStatusService.save_file_activity(self.analysis_id, changes)
         return changes
 
-    async def analyze(self):
-        status_to_send = None
+    async def run_sandbox(self) -> dict:
+        """
+        Стадия песочницы: сборка, запуск под ETW и docker diff.
+        Очистка логов сюда не входит — она выполняется в finalize() уже после освобождения слота.
+        """
+        async with AnalysisProgressWriter.open(self.analysis_id):
+            return await self._run_sandbox()
+
+    async def _run_sandbox(self) -> dict:
         etw_started = False
         docker_ran = False
+        started_at = time.time()
         try:
             async with self.lock:
                 await AnalysisStatusService.analysis_log("Анализ запущен", self.analysis_id)
  
             await AnalysisStatusService.update_analysis_status(self.analysis_id, "running")
             
-            self.update_dockerfile()
+            # The collector is only needed for capture: wait for it while the image builds
+            collector_ready = asyncio.create_task(asyncio.to_thread(etw_collector.ensure_running))
+            collector_ready.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+            await asyncio.to_thread(self.update_dockerfile)
             await self.build_docker()
             docker_built = True
 
             base_dir = get_analysis_dir(str(self.analysis_id))
             try:
                 await AnalysisStatusService.analysis_log("Запуск отслеживания...", self.analysis_id)
-                etw_collector.start_capture(
+                await collector_ready
+                await asyncio.to_thread(
+                    etw_collector.start_capture,
                     analysis_id=str(self.analysis_id),
                     output_dir=base_dir,
                     target_exe=self.filename,
@@ -115,7 +167,8 @@ class AnalysisService:
 
             try:
                 await AnalysisStatusService.analysis_log("Остановка отслеживания...", self.analysis_id)
-                etw_collector.stop_capture(str(self.analysis_id))
+                with observe_stage("etw_stop", self.analysis_id):
+                    await asyncio.to_thread(etw_collector.stop_capture, str(self.analysis_id))
                 await AnalysisStatusService.analysis_log("Отслеживание остановлено", self.analysis_id)
             except Exception as etw_stop_err:
                 await AnalysisStatusService.analysis_log(f"ETW: ошибка остановки захвата: {str(etw_stop_err)}", self.analysis_id)
@@ -125,8 +178,10 @@ class AnalysisService:
                 trace_csv_path = os.path.join(base_dir, "trace.csv")
                 if os.path.exists(trace_csv_path):
                     size_bytes = os.path.getsize(trace_csv_path)
-                    with open(trace_csv_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        line_count = sum(1 for _ in f)
+                    # trace.csv can be hundreds of MB: count off the worker loop
+                    line_count = await asyncio.to_thread(_count_lines, trace_csv_path)
+                    TRACE_CSV_BYTES.observe(size_bytes)
+                    TRACE_CSV_ROWS.observe(line_count)
                     await AnalysisStatusService.analysis_log(
                         f"trace.csv готов (строк={line_count})",
                         self.analysis_id,
@@ -136,11 +191,8 @@ class AnalysisService:
             except Exception as trace_stat_err:
                 await AnalysisStatusService.analysis_log(f"ETW: не удалось прочитать trace.csv для диагностики: {str(trace_stat_err)}", self.analysis_id)
 
-            if docker_ran:
-                await self.get_file_changes()
-
-            status_to_send = "completed"
-            return "Анализ завершен"
+            changes = await self.collect_file_changes()
+            return {"status": "sandboxed", "docker_ran": True, "changes": changes, "error": None, "started_at": started_at}
         except Exception as e:
             Logger.log(f"Ошибка при анализе: {str(e)}")
             try:
@@ -148,21 +200,47 @@ class AnalysisService:
                     await AnalysisStatusService.update_history_on_error(self.analysis_id, "Анализ завершен с ошибкой")
                 if etw_started:
                     try:
-                        etw_collector.stop_capture(str(self.analysis_id))
+                        await asyncio.to_thread(etw_collector.stop_capture, str(self.analysis_id))
                     except Exception:
                         pass
 
-                result = None
+                changes = None
                 if docker_ran:
-                    result = await self.get_file_changes()
-                status_to_send = "error"
-                return result or f"Ошибка анализа: {str(e)}"
+                    changes = await self.collect_file_changes()
+                return {"status": "error", "docker_ran": docker_ran, "changes": changes, "error": f"Ошибка анализа: {str(e)}"}
             except Exception as inner_e:
                 Logger.log(f"Внутренняя ошибка при обработке исключения: {str(inner_e)}")
                 async with self.lock:
                     await AnalysisStatusService.update_history_on_error(self.analysis_id, str(e))
+                return {"status": "error", "docker_ran": False, "changes": None, "error": f"Ошибка анализа: {str(e)}"}
+
+    async def finalize(self, sandbox_result: dict) -> str:
+        """CPU-стадия: очистка логов, сохранение файловой активности и итоговый статус."""
+        async with AnalysisProgressWriter.open(self.analysis_id):
+            return await self._finalize(sandbox_result)
+
+    async def _finalize(self, sandbox_result: dict) -> str:
+        status_to_send = None
+        try:
+            if sandbox_result.get("docker_ran"):
+                changes = sandbox_result.get("changes") or ""
+                stats = await self.clean_logs()
+                await AnalysisStatusService.save_file_activity(self.analysis_id, changes)
+                if sandbox_result.get("status") != "error":
+                    await self.save_summary(stats, sandbox_result.get("started_at"))
+
+            if sandbox_result.get("status") == "error":
                 status_to_send = "error"
-                return f"Ошибка анализа: {str(e)}"
+                return sandbox_result.get("changes") or sandbox_result.get("error") or "Ошибка анализа"
+
+            status_to_send = "completed"
+            return "Анализ завершен"
+        except Exception as e:
+            Logger.log(f"Ошибка при завершении анализа: {str(e)}")
+            async with self.lock:
+                await AnalysisStatusService.update_history_on_error(self.analysis_id, str(e))
+            status_to_send = "error"
+            return f"Ошибка анализа: {str(e)}"
         finally:
             if status_to_send:
                 try:
@@ -170,4 +248,30 @@ class AnalysisService:
                         "status": status_to_send
                     }))
                 except Exception as ws_err:
-                    Logger.log(f"Ошибка отправки статуса анализа по WebSocket: {str(ws_err)}")
\ No newline at end of file
+                    Logger.log(f"Ошибка отправки статуса анализа по WebSocket: {str(ws_err)}")
+
+    async def save_summary(self, stats: dict | None, started_at: float | None) -> None:
+        """Сводка для meta/history: считается один раз здесь, чтобы чтения не трогали файлы анализа."""
+        try:
+            base_dir = get_analysis_dir(str(self.analysis_id))
+
+            def _size(name: str) -> int:
+                try:
+                    return os.path.getsize(os.path.join(base_dir, name))
+                except OSError:
+                    return 0
+
+            summary = dict(stats or {})
+            summary["duration_seconds"] = round(time.time() - started_at, 3) if started_at else None
+            summary["trace_csv_bytes"] = _size("trace.csv")
+            summary["trace_etl_bytes"] = _size("trace.etl")
+            summary["clean_tree_bytes"] = _size("clean_tree.csv")
+            await AnalysisStatusService.save_summary(self.analysis_id, summary)
+        except Exception as e:
+            # Meta falls back to threat_report.json when the summary row is missing.
+            Logger.log(f"Не удалось сохранить сводку анализа: {str(e)}")
+
+    async def analyze(self):
+        # One writer (and DB session) for both stages when they run in the same process
+        async with AnalysisProgressWriter.open(self.analysis_id):
+            return await self.finalize(await self.run_sandbox())
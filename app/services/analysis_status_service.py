@@ -1,8 +1,11 @@
 import json
 import logging
+import uuid
 
 from app.infra.db.session import AsyncSessionLocal
+from app.services.analysis_progress_writer import AnalysisProgressWriter
 from app.repositories.analysis_repository import AnalysisRepository
+from app.repositories.analysis_summary_repository import AnalysisSummaryRepository
 from app.repositories.result_repository import ResultRepository
 from app.utils.websocket_manager import manager
 from app.utils.analysis_log_filter import should_suppress, sanitize_line
@@ -19,11 +22,15 @@ class AnalysisStatusService:
 
             msg = sanitize_line(msg)
 
-            try:
-                async with AsyncSessionLocal() as db:
-                    await ResultRepository(db).append_docker_output(str(analysis_id), msg + "\n")
-            except Exception:
-                logger.exception("Failed to append analysis log to DB")
+            writer = AnalysisProgressWriter.get(analysis_id)
+            if writer is not None:
+                writer.log(msg + "\n")
+            else:
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await ResultRepository(db).append_docker_output(str(analysis_id), msg + "\n")
+                except Exception:
+                    logger.exception("Failed to append analysis log to DB")
 
             try:
                 await manager.send_message(
@@ -42,23 +49,52 @@ class AnalysisStatusService:
             return
 
     @staticmethod
-    async def save_result(analysis_id, result_data):
+    async def _write(analysis_id, fn):
+        # Inside an analysis stage everything goes through its writer session, after the buffered log lines
+        writer = AnalysisProgressWriter.get(analysis_id)
+        if writer is not None:
+            return await writer.run(fn)
         async with AsyncSessionLocal() as db:
+            return await fn(db)
+
+    @staticmethod
+    async def save_result(analysis_id, result_data):
+        async def _save(db):
             await ResultRepository(db).set_results(str(analysis_id), result_data)
 
+        await AnalysisStatusService._write(analysis_id, _save)
+
     @staticmethod
     async def save_file_activity(analysis_id, history):
-        async with AsyncSessionLocal() as db:
-            await AnalysisRepository(db).set_status(str(analysis_id), "completed")
+        async def _save(db):
+            await AnalysisRepository(db).set_status(str(analysis_id), "completed", commit=False)
             await ResultRepository(db).set_file_activity(str(analysis_id), history)
+            # set_file_activity does not commit when the results row is missing; the status must still land
+            await db.commit()
+
+        await AnalysisStatusService._write(analysis_id, _save)
+
+    @staticmethod
+    async def save_summary(analysis_id, summary: dict):
+        async def _save(db):
+            await AnalysisSummaryRepository(db).upsert(uuid.UUID(str(analysis_id)), summary)
+
+        await AnalysisStatusService._write(analysis_id, _save)
 
     @staticmethod
     async def update_analysis_status(analysis_id, status: str):
+        writer = AnalysisProgressWriter.get(analysis_id)
+        if writer is not None:
+            await writer.set_status(status)
+            return
         async with AsyncSessionLocal() as db:
             await AnalysisRepository(db).set_status(str(analysis_id), status)
 
     @staticmethod
     async def update_history_on_error(analysis_id, error_message):
-        async with AsyncSessionLocal() as db:
-            await AnalysisRepository(db).set_status(str(analysis_id), "error")
+        async def _save(db):
+            await AnalysisRepository(db).set_status(str(analysis_id), "error", commit=False)
             await ResultRepository(db).set_error(str(analysis_id), error_message)
+            await db.commit()
+
+        await AnalysisStatusService._write(analysis_id, _save)
@@ -30,6 +30,8 @@ class AnalysisWsService:
                     "filename": getattr(row, "filename", None) or row[1],
                     "status": getattr(row, "status", None) or row[2],
                     "analysis_id": str(getattr(row, "analysis_id", None) or row[3]),
+                    "danger_count": getattr(row, "danger_count", None),
+                    "is_threat": bool(getattr(row, "danger_count", None)),
                 }
             )
 
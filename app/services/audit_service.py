@@ -1,11 +1,15 @@
-from typing import Optional, Dict, Any
+import asyncio
+from typing import Optional, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Request
 from app.repositories.audit_repository import AuditRepository
-from app.core.crypto import encrypt_str, encrypt_ip
+from app.core.crypto import cached_ip_ciphertext, encrypt_many, remember_ip_ciphertext
 from app.core.logging import REQUEST_ID_CTX
 
 
+_SENSITIVE_METADATA_KEYS = {"email", "ip"}
+
+
 class AuditService:
     def __init__(self, db: AsyncSession):
         self.repo = AuditRepository(db)
@@ -27,22 +31,34 @@ class AuditService:
                 rid = REQUEST_ID_CTX.get()
             except Exception:
                 rid = None
-        safe_metadata = self._sanitize_metadata(metadata or {})
+        source_ip, safe_metadata = await self._encrypt_event(ip, metadata or {})
         await self.repo.create(
             event_type=event_type,
             user_id=user_id,
-            source_ip=encrypt_ip(ip),
+            source_ip=source_ip,
             user_agent=ua,
             request_id=rid,
             metadata=safe_metadata,
         )
 
-    def _sanitize_metadata(self, meta: Dict[str, Any]) -> Dict[str, Any]:
-        out: Dict[str, Any] = {}
-        for k, v in meta.items():
-            kl = k.lower()
-            if isinstance(v, str) and kl in {"email", "ip"}:
-                out[k] = encrypt_str(v)
-            else:
-                out[k] = v
-        return out
+    async def _encrypt_event(self, ip: Optional[str], meta: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+        source_ip = cached_ip_ciphertext(ip) if ip else None
+        sensitive = [k for k, v in meta.items() if isinstance(v, str) and k.lower() in _SENSITIVE_METADATA_KEYS]
+
+        plaintexts = [meta[k] for k in sensitive]
+        encrypt_source_ip = bool(ip) and source_ip is None
+        if encrypt_source_ip:
+            plaintexts.append(ip)
+        if not plaintexts:
+            return source_ip, dict(meta)
+
+        # All Fernet work of one event goes to a worker thread in a single hop.
+        ciphertexts = await asyncio.get_running_loop().run_in_executor(None, encrypt_many, plaintexts)
+
+        if encrypt_source_ip:
+            source_ip = ciphertexts.pop()
+            remember_ip_ciphertext(ip, source_ip)
+        out = dict(meta)
+        for k, ciphertext in zip(sensitive, ciphertexts):
+            out[k] = ciphertext
+        return source_ip, out
@@ -1,46 +1,141 @@
 import os
 import subprocess
+import threading
 import time
-from typing import Optional
+from typing import List, Optional
 
 import requests
 
 import logging
 
+from app.core.tracing import SPAN_KIND_CLIENT, format_traceparent, start_span
+
 
 logger = logging.getLogger(__name__)
 
 
+def _trace_headers() -> dict:
+    traceparent = format_traceparent()
+    return {"traceparent": traceparent} if traceparent else {}
+
+
+_MODES = ("run", "prebuilt", "attach")
+
+
 class EtwCollectorService:
-    def __init__(self, base_url: str = "http://127.0.0.1:8765"):
+    def __init__(
+        self,
+        base_url: str = "http://127.0.0.1:8765",
+        mode: str = "run",
+        executable: Optional[str] = None,
+        log_path: Optional[str] = None,
+    ):
+        mode = (mode or "run").strip().lower()
+        if mode not in _MODES:
+            raise ValueError(f"Unknown ETW collector mode {mode!r}, expected one of {', '.join(_MODES)}")
         self.base_url = base_url.rstrip("/")
+        self.mode = mode
+        self.executable = executable
+        self.log_path = log_path or os.path.join("logs", "etw_collector.log")
         self.process: Optional[subprocess.Popen] = None
+        # Size of the log when the current process was spawned: its own output starts there
+        self._log_offset = 0
+        # Several analyses of one worker may find the collector down at the same time
+        self._start_lock = threading.Lock()
+
+    @property
+    def autostart(self) -> bool:
+        return self.mode != "attach"
+
+    def _build_command(self) -> List[str]:
+        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+        project_dir = os.path.join(repo_root, "etw_collector")
+
+        if self.mode == "run":
+            return [
+                "dotnet",
+                "run",
+                "--project",
+                os.path.join(project_dir, "EtwCollector.csproj"),
+                "--configuration",
+                "Release",
+            ]
+
+        # prebuilt: `dotnet build -c Release` once (or publish) and start the output without MSBuild
+        path = self.executable
+        if not path:
+            out_dir = os.path.join(project_dir, "bin", "Release", "net8.0")
+            exe = os.path.join(out_dir, "EtwCollector.exe" if os.name == "nt" else "EtwCollector")
+            path = exe if os.path.isfile(exe) else os.path.join(out_dir, "EtwCollector.dll")
+        if not os.path.isfile(path):
+            raise RuntimeError(
+                f"EtwCollector binary not found: {path}. Build it with "
+                f"`dotnet build etw_collector -c Release` or set ETW_COLLECTOR_PATH."
+            )
+        if path.lower().endswith(".dll"):
+            return ["dotnet", path]
+        return [path]
+
+    @property
+    def startup_timeout_s(self) -> int:
+        # MSBuild needs far longer than the compiled binary
+        return 20 if self.mode == "run" else 10
+
+    def spawn(self) -> None:
+        """Запуск процесса коллектора без ожидания готовности."""
+        if self.process and self.process.poll() is None:
+            return
+
+        command = self._build_command()
+        log_dir = os.path.dirname(self.log_path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        # stderr goes to a file, not a PIPE: nobody reads it while the collector runs,
+        # and a full pipe buffer would block the collector on its next write
+        with open(self.log_path, "ab") as log:
+            self._log_offset = log.tell()
+            self.process = subprocess.Popen(
+                command,
+                stdout=subprocess.DEVNULL,
+                stderr=log,
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0,
+            )
 
     def start_process(self) -> None:
+        if not self.autostart:
+            return
         if self.process and self.process.poll() is None:
             return
 
-        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-        project_dir = os.path.join(repo_root, "etw_collector")
+        self.spawn()
+        self.wait_ready(timeout_s=self.startup_timeout_s)
+
+    def is_healthy(self, timeout_s: float = 1) -> bool:
+        try:
+            return requests.get(f"{self.base_url}/health", timeout=timeout_s).ok
+        except Exception:
+            return False
 
-        cmd = [
-            "dotnet",
-            "run",
-            "--project",
-            os.path.join(project_dir, "EtwCollector.csproj"),
-            "--configuration",
-            "Release",
-        ]
-
-        self.process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0,
-        )
-
-        self.wait_ready(timeout_s=20)
+    def process_exited(self) -> Optional[int]:
+        """Код выхода, если процесс, запущенный этим экземпляром, завершился."""
+        if not self.process:
+            return None
+        return self.process.poll()
+
+    def exit_stderr(self, max_bytes: int = 4096) -> str:
+        """Хвост stderr завершившегося процесса из лога коллектора."""
+        try:
+            if self.process and self.process.poll() is not None:
+                with open(self.log_path, "rb") as f:
+                    end = f.seek(0, os.SEEK_END)
+                    f.seek(max(self._log_offset, end - max_bytes))
+                    tail = f.read()
+                # Reported once: the supervisor and wait_ready may both ask about the same exit
+                self._log_offset = end
+                return tail.decode("utf-8", errors="replace").strip()
+        except Exception:
+            pass
+        return ""
 
     def wait_ready(self, timeout_s: int = 20) -> None:
         start = time.time()
@@ -54,14 +149,8 @@ class EtwCollectorService:
                 last_err = e
             time.sleep(0.5)
 
-        extra = ""
-        try:
-            if self.process and self.process.poll() is not None and self.process.stderr:
-                err = self.process.stderr.read()
-                if err:
-                    extra = f" Process stderr: {err.strip()}"
-        except Exception:
-            pass
+        err = self.exit_stderr()
+        extra = f" Process stderr: {err}" if err else ""
 
         raise RuntimeError(f"EtwCollector did not become ready in {timeout_s}s. Last error: {last_err}.{extra}")
 
@@ -84,8 +173,16 @@ class EtwCollectorService:
         except Exception:
             pass
 
-        logger.info("Starting EtwCollector process...")
-        self.start_process()
+        if not self.autostart:
+            # Managed elsewhere (separate service, load-test stub): wait a little longer, never spawn it
+            self.wait_ready(timeout_s=5)
+            return
+
+        with self._start_lock:
+            if self.is_healthy():
+                return
+            logger.info("Starting EtwCollector process...")
+            self.start_process()
 
     def start_capture(self, analysis_id: str, output_dir: str, target_exe: str) -> None:
         self.ensure_running()
@@ -94,13 +191,15 @@ class EtwCollectorService:
             "outputDir": output_dir,
             "targetExe": target_exe,
         }
-        r = requests.post(f"{self.base_url}/start", json=payload, timeout=5)
+        with start_span("etw.start_capture", kind=SPAN_KIND_CLIENT, attributes={"analysis.id": analysis_id}):
+            r = requests.post(f"{self.base_url}/start", json=payload, timeout=5, headers=_trace_headers())
         if not r.ok:
             raise RuntimeError(f"EtwCollector /start failed: {r.status_code} {r.text}")
 
     def stop_capture(self, analysis_id: str) -> None:
         self.ensure_running()
         payload = {"analysisId": analysis_id}
-        r = requests.post(f"{self.base_url}/stop", json=payload, timeout=10)
+        with start_span("etw.stop_capture", kind=SPAN_KIND_CLIENT, attributes={"analysis.id": analysis_id}):
+            r = requests.post(f"{self.base_url}/stop", json=payload, timeout=10, headers=_trace_headers())
         if not r.ok:
             raise RuntimeError(f"EtwCollector /stop failed: {r.status_code} {r.text}")
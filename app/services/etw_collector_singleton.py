@@ -1,4 +1,10 @@
+from app.core.settings import settings
 from app.services.etw_collector_service import EtwCollectorService
 
 
-etw_collector = EtwCollectorService()
+etw_collector = EtwCollectorService(
+    base_url=settings.ETW_COLLECTOR_URL,
+    mode=settings.ETW_COLLECTOR_MODE,
+    executable=settings.ETW_COLLECTOR_PATH,
+    log_path=settings.ETW_COLLECTOR_LOG_PATH,
+)
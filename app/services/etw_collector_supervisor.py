@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from app.core.metrics import ETW_COLLECTOR_RESTARTS, ETW_COLLECTOR_UP
+from app.services.etw_collector_service import EtwCollectorService
+
+
+logger = logging.getLogger("app")
+
+
+class EtwCollectorSupervisor:
+    """
+    Фоновый запуск и наблюдение за EtwCollector в процессе API.
+    Lifespan не ждёт коллектор: готовность видна в status() и /health/ready,
+    упавший процесс перезапускается с экспоненциальной задержкой.
+    """
+
+    def __init__(
+        self,
+        collector: EtwCollectorService,
+        backoff_initial_s: float = 1,
+        backoff_max_s: float = 60,
+        check_interval_s: float = 5,
+    ):
+        self.collector = collector
+        self.backoff_initial_s = max(0.1, float(backoff_initial_s))
+        self.backoff_max_s = max(self.backoff_initial_s, float(backoff_max_s))
+        self.check_interval_s = max(0.1, float(check_interval_s))
+        # ETW and the collector binary are Windows-only; elsewhere an external collector can still be attached
+        self.can_spawn = collector.autostart and os.name == "nt"
+        self.state = "stopped"
+        self.restarts = 0
+        self._started = False
+        self.last_error: Optional[str] = None
+        self.ready_since: Optional[float] = None
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="etw-collector-supervisor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        if self.can_spawn:
+            await asyncio.to_thread(self.collector.stop_process)
+        self._set_ready(False, "stopped")
+
+    async def wait_ready(self, timeout_s: float) -> bool:
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout_s)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "mode": self.collector.mode,
+            "managed": self.can_spawn,
+            "restarts": self.restarts,
+            "ready_since": self.ready_since,
+            "last_error": self.last_error,
+        }
+
+    def _set_ready(self, ready: bool, state: str) -> None:
+        self.state = state
+        if ready:
+            if not self._ready.is_set():
+                self.ready_since = time.time()
+            self._ready.set()
+        else:
+            self.ready_since = None
+            self._ready.clear()
+        ETW_COLLECTOR_UP.set(1 if ready else 0)
+
+    async def _healthy(self) -> bool:
+        return await asyncio.to_thread(self.collector.is_healthy)
+
+    async def _start_once(self) -> bool:
+        self._set_ready(False, "starting")
+        try:
+            await asyncio.to_thread(self.collector.spawn)
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+        deadline = time.monotonic() + self.collector.startup_timeout_s
+        while time.monotonic() < deadline:
+            if await self._healthy():
+                return True
+            code = self.collector.process_exited()
+            if code is not None:
+                err = await asyncio.to_thread(self.collector.exit_stderr)
+                self.last_error = f"exited with code {code}" + (f": {err[-500:]}" if err else "")
+                return False
+            await asyncio.sleep(0.5)
+
+        self.last_error = f"not ready in {self.collector.startup_timeout_s}s"
+        # A half-started process would hold the port against the next attempt
+        await asyncio.to_thread(self.collector.stop_process)
+        return False
+
+    async def _run(self) -> None:
+        delay = self.backoff_initial_s
+        while True:
+            try:
+                if await self._healthy():
+                    # Ours, a worker's or an external collector: all the same for readiness
+                    self._set_ready(True, "ready")
+                    self.last_error = None
+                    delay = self.backoff_initial_s
+                    await asyncio.sleep(self.check_interval_s)
+                    continue
+
+                was_ready = self.ready
+                if not self.can_spawn:
+                    self._set_ready(False, "unavailable")
+                    await asyncio.sleep(self.check_interval_s)
+                    continue
+
+                code = self.collector.process_exited()
+                if was_ready or code is not None:
+                    err = await asyncio.to_thread(self.collector.exit_stderr) if code is not None else ""
+                    logger.warning("EtwCollector is down (exit code %s)%s", code, f": {err[-500:]}" if err else "")
+                if await self._start_once():
+                    if self._started:
+                        logger.info("EtwCollector restarted")
+                        ETW_COLLECTOR_RESTARTS.inc()
+                        self.restarts += 1
+                    self._started = True
+                    self._set_ready(True, "ready")
+                    self.last_error = None
+                    delay = self.backoff_initial_s
+                    await asyncio.sleep(self.check_interval_s)
+                    continue
+
+                logger.warning("EtwCollector failed to start: %s; retrying in %.1fs", self.last_error, delay)
+                self._set_ready(False, "backoff")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.backoff_max_s)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("EtwCollector supervisor iteration failed")
+                self._set_ready(False, "backoff")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.backoff_max_s)
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+import redis.asyncio as redis_asyncio
+
+from app.core.settings import settings
+from app.infra.redis_client import get_async_redis
+
+
+_VERDICT_CACHE_KEY_PREFIX = "filetrace:url_verdict:"
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def normalize_reputation_url(url: str) -> str:
+    parts = urlsplit((url or "").strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def _verdict_cache_key(url: str) -> str:
+    return _VERDICT_CACHE_KEY_PREFIX + hashlib.sha256(normalize_reputation_url(url).encode("utf-8")).hexdigest()
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http1=True,
+            http2=False,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+            timeout=httpx.Timeout(20.0, connect=5.0),
+        )
+    return _http_client
+
+
+async def close_url_reputation_clients() -> None:
+    global _http_client
+    if _http_client is not None:
+        try:
+            await _http_client.aclose()
+        except Exception:
+            pass
+        _http_client = None
+
+
+def aggregate_verdict(vt: Optional[Dict[str, Any]], ysb: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    verdict = "unknown"
+    reasons: List[str] = []
+
+    vt_mal = 0
+    vt_susp = 0
+    if vt and vt.get("ok"):
+        stats = vt.get("stats") or {}
+        vt_mal = int(stats.get("malicious") or 0)
+        vt_susp = int(stats.get("suspicious") or 0)
+
+    y_matches = 0
+    if ysb and ysb.get("ok"):
+        y_matches = len(ysb.get("matches") or [])
+
+    if y_matches > 0:
+        verdict = "malicious"
+        reasons.append("yandex_safe_browsing_match")
+
+    if vt_mal > 0:
+        verdict = "malicious"
+        reasons.append("virustotal_malicious")
+    elif verdict != "malicious" and vt_susp > 0:
+        verdict = "suspicious"
+        reasons.append("virustotal_suspicious")
+
+    if verdict == "unknown" and ((vt and vt.get("ok")) or (ysb and ysb.get("ok"))):
+        verdict = "clean"
+
+    return {
+        "verdict": verdict,
+        "reasons": reasons,
+        "vt": vt,
+        "yandex": ysb,
+    }
+
+
+class UrlReputationService:
+    def __init__(
+        self,
+        *,
+        http_client: Optional[httpx.AsyncClient] = None,
+        redis_client: Optional[redis_asyncio.Redis] = None,
+        use_cache: bool = True,
+        vt_api_key: Optional[str] = None,
+        vt_base_url: Optional[str] = None,
+        yandex_api_key: Optional[str] = None,
+        yandex_base_url: Optional[str] = None,
+    ):
+        self.http = http_client or _get_http_client()
+        self.cache = (redis_client or get_async_redis()) if use_cache else None
+        self.cache_ttl_seconds = int(getattr(settings, "URL_VERDICT_CACHE_TTL_SECONDS", 3600) or 0)
+        self.vt_api_key = vt_api_key if vt_api_key is not None else getattr(settings, "VT_API_KEY", None)
+        self.vt_base_url = (vt_base_url or settings.VT_API_BASE_URL).rstrip("/")
+        self.vt_timeout_s = float(getattr(settings, "URL_REPUTATION_VT_TIMEOUT_SECONDS", 30) or 30)
+        self.yandex_api_key = yandex_api_key if yandex_api_key is not None else getattr(settings, "YANDEX_SB_API_KEY", None)
+        self.yandex_base_url = (yandex_base_url or settings.YANDEX_SB_API_BASE_URL).rstrip("/")
+        self.yandex_timeout_s = float(getattr(settings, "URL_REPUTATION_YANDEX_TIMEOUT_SECONDS", 15) or 15)
+
+    async def check(self, url: str) -> Dict[str, Any]:
+        cached = await self._cache_get(url)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        vt, ysb = await asyncio.gather(
+            self._with_timeout(self._vt_url_report(url), self.vt_timeout_s, "VT"),
+            self._with_timeout(self._yandex_sb_lookup(url), self.yandex_timeout_s, "Yandex SB"),
+        )
+        agg = aggregate_verdict(vt, ysb)
+
+        # Only answers from at least one provider are worth sharing; errors are retried on the next check.
+        if (vt and vt.get("ok")) or (ysb and ysb.get("ok")):
+            await self._cache_set(url, agg)
+        return {**agg, "cached": False}
+
+    @staticmethod
+    async def _with_timeout(coro, timeout_s: float, provider: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(coro, timeout=timeout_s)
+        except asyncio.TimeoutError:
+            return {"ok": False, "error": f"{provider} timeout after {timeout_s:g}s"}
+
+    async def _cache_get(self, url: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None or self.cache_ttl_seconds <= 0:
+            return None
+        try:
+            raw = await self.cache.get(_verdict_cache_key(url))
+            return json.loads(raw) if raw else None
+        except Exception:
+            logging.getLogger("app").exception("URL verdict cache read failed")
+            return None
+
+    async def _cache_set(self, url: str, agg: Dict[str, Any]) -> None:
+        if self.cache is None or self.cache_ttl_seconds <= 0:
+            return
+        try:
+            await self.cache.set(_verdict_cache_key(url), json.dumps(agg, ensure_ascii=False), ex=self.cache_ttl_seconds)
+        except Exception:
+            logging.getLogger("app").exception("URL verdict cache write failed")
+
+    async def _vt_url_report(self, url: str) -> Optional[Dict[str, Any]]:
+        if not self.vt_api_key:
+            return None
+
+        try:
+            headers = {"x-apikey": self.vt_api_key}
+            submit = await self.http.post(f"{self.vt_base_url}/urls", headers=headers, data={"url": url})
+            if not submit.is_success:
+                return {"ok": False, "error": f"VT submit failed: {submit.status_code}", "raw": submit.text}
+
+            data = submit.json()
+            analysis_id = ((data or {}).get("data") or {}).get("id")
+            if not analysis_id:
+                return {"ok": False, "error": "VT did not return analysis id"}
+
+            report = await self.http.get(f"{self.vt_base_url}/analyses/{analysis_id}", headers=headers)
+            if not report.is_success:
+                return {"ok": False, "error": f"VT report failed: {report.status_code}", "raw": report.text}
+
+            rep = report.json()
+            stats = (((rep or {}).get("data") or {}).get("attributes") or {}).get("stats") or {}
+            return {"ok": True, "analysis_id": analysis_id, "stats": stats}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+
+    async def _yandex_sb_lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        if not self.yandex_api_key:
+            return None
+
+        body = {
+            "client": {
+                "clientId": "filetrace",
+                "clientVersion": "1.0",
+            },
+            "threatInfo": {
+                "threatTypes": [
+                    "MALWARE",
+                    "SOCIAL_ENGINEERING",
+                    "UNWANTED_SOFTWARE",
+                    "POTENTIALLY_HARMFUL_APPLICATION",
+                ],
+                "platformTypes": ["ANY_PLATFORM"],
+                "threatEntryTypes": ["URL"],
+                "threatEntries": [{"url": url}],
+            },
+        }
+
+        try:
+            r = await self.http.post(
+                f"{self.yandex_base_url}/threatMatches:find",
+                params={"key": self.yandex_api_key},
+                json=body,
+            )
+            if not r.is_success:
+                return {"ok": False, "error": f"Yandex SB failed: {r.status_code}", "raw": r.text}
+            data = r.json() if r.text else {}
+            matches = data.get("matches") if isinstance(data, dict) else None
+            return {"ok": True, "matches": matches or []}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
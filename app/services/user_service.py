@@ -1,13 +1,15 @@
+import logging
 import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth.auth import generate_code
+from app.auth.token_cache import revoke_refresh_token
 from app.models.user import Users
 from app.core.crypto import normalize_email, encrypt_str, hmac_hash
 from app.utils.sse_operations import subscribers
-from app.core.security import get_password_hash, verify_password
+from app.core.security import password_hasher
 from app.utils.analysis_log_filter import sanitize_multiline
 
 from app.repositories.analysis_repository import AnalysisRepository
@@ -81,7 +83,7 @@ class UserService:
 
     async def create_user(self,  email: str, password: str):
         
-        hashed_password = get_password_hash(password)
+        hashed_password = await password_hasher.hash(password)
         confirmation_code = generate_code()
         expires_at = datetime.utcnow() + timedelta(minutes=10)
         created_at = datetime.utcnow()
@@ -100,8 +102,6 @@ class UserService:
         return new_user.id, confirmation_code
     
     async def update_password(self, email=None, password=None, refresh_token=None):
-        from app.core.security import get_password_hash
-        
         if refresh_token:
             user = await self.get_by_refresh_token(refresh_token)
         elif email:
@@ -113,7 +113,7 @@ class UserService:
             return None
         
         if password:
-            user.hashed_password = get_password_hash(password)
+            user.hashed_password = await password_hasher.hash(password)
         
         user.login_attempts = 0
         
@@ -155,7 +155,7 @@ class UserService:
         if not user:
             return None
 
-        return await self.users_repo.set_refresh_token(user=user, refresh_token=refresh_token)
+        return await self._replace_refresh_token(user, refresh_token)
         
     async def notify_analysis_completed(self, analysis_id: str):
         for q in subscribers:
@@ -169,9 +169,21 @@ class UserService:
         if not user:
             return None
         
-        if not verify_password(password, user.hashed_password):
+        if not await password_hasher.verify(password, user.hashed_password):
             return None
-        
+
+        if password_hasher.needs_rehash(user.hashed_password):
+            # BCRYPT_ROUNDS changed since this hash was made; upgrade it while the plain password is known.
+            try:
+                user.hashed_password = await password_hasher.hash(password)
+                await self.add(user)
+                await self.commit()
+            except Exception:
+                logging.getLogger("app").exception("Failed to upgrade password hash")
+                await self.db.rollback()
+                # rollback() expires the instance; reload it so the caller can read its attributes
+                await self.db.refresh(user)
+
         return user
 
     async def get_by_email(self, email: str):
@@ -181,7 +193,14 @@ class UserService:
         user = await self.users_repo.get_by_id(user_id)
         if not user:
             return None
-        return await self.users_repo.set_refresh_token(user=user, refresh_token=refresh_token)
+        return await self._replace_refresh_token(user, refresh_token)
+
+    async def _replace_refresh_token(self, user, refresh_token):
+        old_refresh_token = user.refresh_token
+        user = await self.users_repo.set_refresh_token(user=user, refresh_token=refresh_token)
+        if old_refresh_token and old_refresh_token != refresh_token:
+            await revoke_refresh_token(old_refresh_token)
+        return user
 
     async def get_login_attempts(self, email: str) -> int:
         return await self.users_repo.get_login_attempts(email)
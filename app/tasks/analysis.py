@@ -1,21 +1,22 @@
 import asyncio
-import os
-import shutil
 import time
 import uuid
 
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-import redis
+from celery import chain
 
+from app.core.metrics import ANALYSIS_SLOT_WAIT_SECONDS
+from app.core.profiling import profiled
 from app.core.settings import settings
+from app.core.tracing import start_span
+from app.infra.artifacts.analysis_artifacts_repository import AnalysisArtifactsRepository
 from app.infra.db.session import AsyncSessionLocal
+from app.infra.url_download import download_to_temp_file
+from app.infra.worker_runtime import run_coro
+from app.infra.redis_client import get_redis
 from app.infra.redis_semaphore import acquire_semaphore_slot, refresh_semaphore_slot, release_semaphore_slot
-from app.infra.artifacts.analysis_artifacts_repository import AnalysisArtifactsRepository
 from app.repositories.analysis_repository import AnalysisRepository
 from app.repositories.result_repository import ResultRepository
+from app.services.analysis_followers_service import AnalysisFollowersService
 from app.services.analysis_service import AnalysisService
 from app.services.user_service import UserService
 from app.utils.file_operations import FileOperations
@@ -23,29 +24,36 @@ from app.utils.file_operations import FileOperations
 
 def register_tasks(celery_app):
     @celery_app.task(name="analyze_file")
-    def analyze_file_task(filename: str, analysis_id: str, user_id: str, file_hash: str, pipeline_version: str):
-        r = redis.Redis.from_url(settings.REDIS_URL, decode_responses=False)
+    def analyze_file_task(
+        filename: str, analysis_id: str, user_id: str, file_hash: str, pipeline_version: str, profile: bool = False
+    ):
+        # Sandbox stage only: the slot is released before cleaning, which runs as clean_analysis on the CPU queue.
+        r = get_redis(decode_responses=False)
         limit = int(getattr(settings, "MAX_CONCURRENT_ANALYSES", 1) or 1)
         if limit < 1:
             limit = 1
         token = None
         slot_ttl_seconds = 60 * 30
 
-        async def run_analysis():
+        async def run_sandbox():
             service = AnalysisService(
                 filename=filename,
                 analysis_id=analysis_id,
                 uuid=user_id,
                 file_hash=file_hash,
                 pipeline_version=pipeline_version,
+                profile=profile,
             )
-            try:
-                return await service.analyze()
-            finally:
-                pass
+            if not profile:
+                return await service.run_sandbox()
+            with profiled(AnalysisArtifactsRepository.get_profiles_dir(analysis_id), "sandbox"):
+                return await service.run_sandbox()
 
         try:
-            token = acquire_semaphore_slot(r, limit=limit, ttl_seconds=slot_ttl_seconds, poll_seconds=1.0)
+            wait_started = time.perf_counter()
+            with start_span("analysis.slot_wait", attributes={"analysis.id": analysis_id, "slot.limit": limit}):
+                token = acquire_semaphore_slot(r, limit=limit, ttl_seconds=slot_ttl_seconds, poll_seconds=1.0)
+            ANALYSIS_SLOT_WAIT_SECONDS.observe(time.perf_counter() - wait_started)
 
             stop_refresh = False
 
@@ -59,84 +67,84 @@ def register_tasks(celery_app):
             t = threading.Thread(target=_keepalive, daemon=True)
             t.start()
             try:
-                return asyncio.run(run_analysis())
+                return run_coro(run_sandbox())
             finally:
                 stop_refresh = True
+        except Exception:
+            # clean_analysis will not run after a failed sandbox stage, so its followers are failed here
+            run_coro(
+                AnalysisFollowersService.resolve_followers(
+                    leader_analysis_id=analysis_id,
+                    file_hash=file_hash,
+                    pipeline_version=pipeline_version,
+                )
+            )
+            raise
         finally:
             if token:
                 release_semaphore_slot(r, token)
 
-    return analyze_file_task
-
-
-def _download_stream(url: str, *, timeout_s: int, max_bytes: int) -> bytes:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) FileTrace/1.0",
-        "Accept": "*/*",
-        "Connection": "close",
-    }
-
-    s = requests.Session()
-    retry = Retry(
-        total=2,
-        connect=2,
-        read=2,
-        backoff_factor=0.5,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["GET"],
-        raise_on_status=False,
-    )
-    s.mount("http://", HTTPAdapter(max_retries=retry))
-    s.mount("https://", HTTPAdapter(max_retries=retry))
-
-    timeout = (min(10, timeout_s), timeout_s)
-
-    with s.get(url, stream=True, timeout=timeout, headers=headers, allow_redirects=True) as r:
-        r.raise_for_status()
-
-        cl = r.headers.get("Content-Length") or r.headers.get("content-length")
-        if str(cl or "").isdigit() and max_bytes > 0 and int(cl) > max_bytes:
-            raise RuntimeError("Слишком большой файл по ссылке")
-
-        buf = bytearray()
-        for chunk in r.iter_content(chunk_size=1024 * 256):
-            if not chunk:
-                continue
-            buf.extend(chunk)
-            if len(buf) > max_bytes:
-                raise RuntimeError("Слишком большой файл по ссылке")
-            if len(buf) >= 2 and buf[0:2] != b"MZ":
-                raise RuntimeError("Файл по ссылке не похож на Windows PE (.exe)")
-        return bytes(buf)
-
-
-def _copy_artifacts(src_analysis_id: str, dst_analysis_id: str) -> None:
-    try:
-        src_dir = AnalysisArtifactsRepository.get_base_dir(src_analysis_id)
-        dst_dir = AnalysisArtifactsRepository.get_base_dir(dst_analysis_id)
-        os.makedirs(dst_dir, exist_ok=True)
-
-        filenames = [
-            "trace.csv",
-            "trace.etl",
-            "trace.json",
-            "clean_tree.csv",
-            "clean_tree.json",
-            "threat_report.json",
-        ]
-
-        for name in filenames:
-            src = os.path.join(src_dir, name)
-            if os.path.exists(src):
-                shutil.copy2(src, os.path.join(dst_dir, name))
-    except Exception:
-        # Best-effort: artifacts are optional and may not exist
-        return
-
-
-def register_url_tasks(celery_app, analyze_file_task):
+    @celery_app.task(name="clean_analysis")
+    def clean_analysis_task(
+        sandbox_result: dict,
+        filename: str,
+        analysis_id: str,
+        user_id: str,
+        file_hash: str,
+        pipeline_version: str,
+        profile: bool = False,
+    ):
+        async def run_finalize():
+            service = AnalysisService(
+                filename=filename,
+                analysis_id=analysis_id,
+                uuid=user_id,
+                file_hash=file_hash,
+                pipeline_version=pipeline_version,
+                profile=profile,
+            )
+            try:
+                if not profile:
+                    return await service.finalize(sandbox_result or {})
+                with profiled(AnalysisArtifactsRepository.get_profiles_dir(analysis_id), "finalize"):
+                    return await service.finalize(sandbox_result or {})
+            finally:
+                await AnalysisFollowersService.resolve_followers(
+                    leader_analysis_id=analysis_id,
+                    file_hash=file_hash,
+                    pipeline_version=pipeline_version,
+                )
+
+        return run_coro(run_finalize())
+
+    return analyze_file_task, clean_analysis_task
+
+
+def build_analysis_pipeline(analyze_file_task, clean_analysis_task):
+    def enqueue_analysis(
+        filename: str, analysis_id: str, user_id: str, file_hash: str, pipeline_version: str, profile: bool = False
+    ):
+        args = (filename, analysis_id, user_id, file_hash, pipeline_version)
+        # Only profiled runs carry the flag, so task messages of ordinary analyses stay unchanged.
+        kwargs = {"profile": True} if profile else {}
+        return chain(
+            analyze_file_task.si(*args, **kwargs),
+            clean_analysis_task.s(*args, **kwargs),
+        ).apply_async()
+
+    return enqueue_analysis
+
+
+def register_url_tasks(celery_app, enqueue_analysis):
     @celery_app.task(name="download_url_and_enqueue_analysis")
-    def download_url_and_enqueue_analysis_task(url: str, analysis_id: str, user_id: str, filename: str, pipeline_version: str):
+    def download_url_and_enqueue_analysis_task(
+        url: str,
+        analysis_id: str,
+        user_id: str,
+        filename: str,
+        pipeline_version: str,
+        pinned_ip: str | None = None,
+    ):
         async def _run():
             db = AsyncSessionLocal()
             try:
@@ -156,120 +164,96 @@ def register_url_tasks(celery_app, analyze_file_task):
                         result.results = ""
                         await db.commit()
 
-                try:
-                    timeout_s = int(getattr(settings, "URL_DOWNLOAD_TIMEOUT_SECONDS", 30) or 30)
-                    max_bytes = int(getattr(settings, "URL_MAX_DOWNLOAD_BYTES", 50 * 1024 * 1024) or 50 * 1024 * 1024)
-                    content = _download_stream(url, timeout_s=timeout_s, max_bytes=max_bytes)
-                except Exception as e:
-                    await _set_error(str(e))
-                    return
+                async def _handle_downloaded(downloaded):
+                    file_hash = downloaded.sha256
+
+                    # If there is an active analysis with the same hash, do NOT start a second one.
+                    # Register as a follower: the leader copies results+artifacts into this analysis_id when it finishes.
+                    active = await userservice.find_active_by_hash(file_hash=file_hash, pipeline_version=pipeline_version)
+                    if active:
+                        await userservice.subscribe_user_to_analysis(analysis_id=active.analysis_id, user_id=user_uuid)
+
+                        analysis = await analysis_repo.get_by_id(analysis_uuid)
+                        if analysis:
+                            analysis.filename = filename
+                            analysis.file_hash = file_hash
+                            analysis.pipeline_version = pipeline_version
+                            analysis.status = active.status
+                            await db.commit()
+
+                        await AnalysisFollowersService.register_follower(
+                            db,
+                            leader_analysis_id=active.analysis_id,
+                            follower_analysis_id=analysis_uuid,
+                            file_hash=file_hash,
+                            pipeline_version=pipeline_version,
+                        )
+                        return
 
-                import hashlib
+                    # Cache shortcut: if same hash already completed, copy cached results into current analysis
+                    cached = await userservice.find_latest_completed_by_hash(file_hash=file_hash, pipeline_version=pipeline_version)
+                    if cached:
+                        await userservice.subscribe_user_to_analysis(analysis_id=cached.analysis_id, user_id=user_uuid)
+                        await AnalysisFollowersService.copy_completed_analysis(
+                            db,
+                            source_analysis_id=cached.analysis_id,
+                            target_analysis_id=analysis_uuid,
+                            file_hash=file_hash,
+                            pipeline_version=pipeline_version,
+                            filename=filename,
+                        )
+                        return
 
-                file_hash = hashlib.sha256(content).hexdigest()
+                    # Move the downloaded file into the content-addressed store and link it into the analysis dir
+                    stored_path, _ = await asyncio.to_thread(
+                        FileOperations.store_path_by_hash,
+                        downloaded.path,
+                        filename=filename,
+                        file_hash=file_hash,
+                        pipeline_version=pipeline_version,
+                    )
+
+                    upload_folder = await asyncio.to_thread(FileOperations.user_upload, str(analysis_id))
+                    if not upload_folder:
+                        await _set_error("Не удалось создать директорию для загрузки")
+                        return
 
-                # If there is an active analysis with the same hash, do NOT start a second one.
-                # Wait for it to finish, then copy results+artifacts into this analysis_id so UI works.
-                active = await userservice.find_active_by_hash(file_hash=file_hash, pipeline_version=pipeline_version)
-                if active:
-                    await userservice.subscribe_user_to_analysis(analysis_id=active.analysis_id, user_id=user_uuid)
+                    await asyncio.to_thread(
+                        FileOperations.user_file_link, stored_path, filename, user_upload_folder=upload_folder
+                    )
 
+                    # Update analysis metadata
                     analysis = await analysis_repo.get_by_id(analysis_uuid)
                     if analysis:
                         analysis.filename = filename
                         analysis.file_hash = file_hash
                         analysis.pipeline_version = pipeline_version
-                        analysis.status = active.status
+                        analysis.status = "queued"
                         await db.commit()
 
-                    # Poll until the active analysis finishes (best-effort)
-                    active_latest = None
-                    for _ in range(360):  # up to ~30 minutes
-                        active_latest = await analysis_repo.get_by_id(active.analysis_id)
-                        if not active_latest:
-                            break
-                        if active_latest.status in {"completed", "error"}:
-                            break
-                        await asyncio.sleep(5)
-
-                    if active_latest and active_latest.status == "completed":
-                        cached_result = await results_repo.get_by_analysis_id(active.analysis_id)
-                        current_result = await results_repo.get_by_analysis_id(analysis_uuid)
-                        current_analysis = await analysis_repo.get_by_id(analysis_uuid)
-                        if current_analysis:
-                            current_analysis.status = "completed"
-                            current_analysis.file_hash = file_hash
-                            current_analysis.pipeline_version = pipeline_version
-                            current_analysis.filename = filename
-
-                        if cached_result and current_result:
-                            current_result.file_activity = cached_result.file_activity
-                            current_result.docker_output = cached_result.docker_output
-                            current_result.results = cached_result.results
-
-                        await db.commit()
-                        _copy_artifacts(str(active.analysis_id), str(analysis_uuid))
-                        return
-
-                    await _set_error("Анализ с таким же файлом завершился с ошибкой")
-                    return
-
-                # Cache shortcut: if same hash already completed, copy cached results into current analysis
-                cached = await userservice.find_latest_completed_by_hash(file_hash=file_hash, pipeline_version=pipeline_version)
-                if cached:
-                    await userservice.subscribe_user_to_analysis(analysis_id=cached.analysis_id, user_id=user_uuid)
-
-                    cached_result = await results_repo.get_by_analysis_id(cached.analysis_id)
-                    current_result = await results_repo.get_by_analysis_id(analysis_uuid)
-                    current_analysis = await analysis_repo.get_by_id(analysis_uuid)
-                    if current_analysis:
-                        current_analysis.status = "completed"
-                        current_analysis.file_hash = file_hash
-                        current_analysis.pipeline_version = pipeline_version
-                        current_analysis.filename = filename
-
-                    if cached_result and current_result:
-                        current_result.file_activity = cached_result.file_activity
-                        current_result.docker_output = cached_result.docker_output
-                        current_result.results = cached_result.results
-
-                    await db.commit()
-                    _copy_artifacts(str(cached.analysis_id), str(analysis_uuid))
-                    return
-
-                # Store file on disk
-                class _MemUpload:
-                    def __init__(self, filename: str, data: bytes):
-                        import io
-
-                        self.filename = filename
-                        self.file = io.BytesIO(data)
+                    # Enqueue analysis pipeline (a blocking broker round trip)
+                    await asyncio.to_thread(
+                        enqueue_analysis, filename, str(analysis_id), str(user_id), file_hash, pipeline_version
+                    )
 
-                mem = _MemUpload(filename=filename, data=content)
-                FileOperations.store_file_by_hash(file=mem, file_hash=file_hash, pipeline_version=pipeline_version)
-
-                upload_folder = FileOperations.user_upload(str(analysis_id))
-                if not upload_folder:
-                    await _set_error("Не удалось создать директорию для загрузки")
+                try:
+                    timeout_s = int(getattr(settings, "URL_DOWNLOAD_TIMEOUT_SECONDS", 30) or 30)
+                    max_bytes = int(getattr(settings, "URL_MAX_DOWNLOAD_BYTES", 50 * 1024 * 1024) or 50 * 1024 * 1024)
+                    # Blocking HTTP and disk I/O; the worker loop is shared by every task of the process
+                    downloaded = await asyncio.to_thread(
+                        download_to_temp_file, url, pinned_ip=pinned_ip, timeout_s=timeout_s, max_bytes=max_bytes
+                    )
+                except Exception as e:
+                    await _set_error(str(e))
                     return
 
-                mem2 = _MemUpload(filename=filename, data=content)
-                FileOperations.user_file_upload(file=mem2, user_upload_folder=upload_folder)
-
-                # Update analysis metadata
-                analysis = await analysis_repo.get_by_id(analysis_uuid)
-                if analysis:
-                    analysis.filename = filename
-                    analysis.file_hash = file_hash
-                    analysis.pipeline_version = pipeline_version
-                    analysis.status = "queued"
-                    await db.commit()
-
-                # Enqueue analysis pipeline
-                analyze_file_task.delay(filename, str(analysis_id), str(user_id), file_hash, pipeline_version)
+                try:
+                    await _handle_downloaded(downloaded)
+                finally:
+                    await asyncio.to_thread(downloaded.discard)
             finally:
                 await db.close()
 
-        return asyncio.run(_run())
+        return run_coro(_run())
 
     return download_url_and_enqueue_analysis_task
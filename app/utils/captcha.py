@@ -1,17 +1,30 @@
 import os
-import time
+import json
 import uuid
 import random
 import base64
+import asyncio
+import logging
 from io import BytesIO
+from fastapi import HTTPException
 from PIL import Image, ImageDraw, ImageFont
-from typing import Dict
+from typing import Dict, Optional
+
+from app.core.settings import settings
+from app.infra.redis_client import get_async_redis
+
+
+_CAPTCHA_KEY_PREFIX = "filetrace:captcha:"
+_CAPTCHA_POOL_KEY = "filetrace:captcha_pool"
+
 
 class CaptchaGenerator:
 
     def __init__(self):
-        self.captchas = {}
         self.captcha_expiration = 600
+        self.pool_size = max(0, int(settings.CAPTCHA_POOL_SIZE))
+        self.pool_refill_interval = max(1, int(settings.CAPTCHA_POOL_REFILL_INTERVAL_SECONDS))
+        self._producer_task: Optional[asyncio.Task] = None
         
         self.font_path = os.path.join(os.path.dirname(__file__), 'fonts')
         if not os.path.exists(self.font_path):
@@ -21,55 +34,92 @@ class CaptchaGenerator:
         if not os.path.exists(self.font_file):
             self.font_file = None
 
-    def generate_captcha(self) -> Dict[str, str]:
-        
+    def _render(self) -> Dict[str, str]:
         allowed_chars = '2346791ACDEFGHJKLMNPQRTUVWXYZ'
         captcha_code = ''.join(random.choices(allowed_chars, k=5))
-        
-        captcha_id = str(uuid.uuid4())
-        
-        self.captchas[captcha_id] = {
+        return {
             'code': captcha_code,
-            'created_at': time.time()
+            'image': self._generate_captcha_image(captcha_code),
         }
-        
-        self._cleanup_expired_captchas()
-        
-        image_base64 = self._generate_captcha_image(captcha_code)
-        
+
+    async def _take_rendered(self) -> Dict[str, str]:
+        try:
+            raw = await get_async_redis().lpop(_CAPTCHA_POOL_KEY)
+            if raw:
+                return json.loads(raw)
+        except Exception:
+            logging.getLogger("app").exception("Captcha pool read failed")
+        # Pool is empty (cold start or burst): render now, but off the event loop.
+        return await asyncio.get_running_loop().run_in_executor(None, self._render)
+
+    async def generate_captcha(self) -> Dict[str, str]:
+        rendered = await self._take_rendered()
+        captcha_id = str(uuid.uuid4())
+
+        try:
+            await get_async_redis().set(_CAPTCHA_KEY_PREFIX + captcha_id, rendered['code'], ex=self.captcha_expiration)
+        except Exception:
+            # A captcha that cannot be stored could never be verified
+            logging.getLogger("app").exception("Captcha store failed")
+            raise HTTPException(status_code=503, detail="Капча временно недоступна. Попробуйте позже")
+
         return {
             'captcha_id': captcha_id,
-            'image': image_base64
+            'image': rendered['image']
         }
 
-    def verify_captcha(self, captcha_id: str, user_input: str) -> bool:
+    async def verify_captcha(self, captcha_id: str, user_input: str) -> bool:
         if not captcha_id or not user_input:
             return False
-        
-        captcha_data = self.captchas.get(captcha_id)
-        if not captcha_data:
+
+        try:
+            # GETDEL makes every captcha single-use, whichever worker verifies it.
+            code = await get_async_redis().getdel(_CAPTCHA_KEY_PREFIX + captcha_id)
+        except Exception:
+            logging.getLogger("app").exception("Captcha verification failed")
             return False
-        
-        if time.time() - captcha_data['created_at'] > self.captcha_expiration:
-            del self.captchas[captcha_id]
+        if not code:
             return False
-        
-        is_valid = user_input.upper() == captcha_data['code']
-        
-        del self.captchas[captcha_id]
-        
-        return is_valid
 
-    def _cleanup_expired_captchas(self) -> None:
-        
-        current_time = time.time()
-        expired_ids = [
-            captcha_id for captcha_id, data in self.captchas.items()
-            if current_time - data['created_at'] > self.captcha_expiration
-        ]
-        
-        for captcha_id in expired_ids:
-            del self.captchas[captcha_id]
+        return user_input.upper() == code
+
+    async def _refill_pool(self) -> None:
+        r = get_async_redis()
+        missing = self.pool_size - int(await r.llen(_CAPTCHA_POOL_KEY))
+        if missing <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        for _ in range(missing):
+            rendered = await loop.run_in_executor(None, self._render)
+            await r.rpush(_CAPTCHA_POOL_KEY, json.dumps(rendered))
+        # Several API workers may refill at once; keep the pool bounded.
+        await r.ltrim(_CAPTCHA_POOL_KEY, 0, self.pool_size - 1)
+
+    async def _run_pool_producer(self) -> None:
+        while True:
+            try:
+                await self._refill_pool()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.getLogger("app").exception("Captcha pool refill failed")
+            await asyncio.sleep(self.pool_refill_interval)
+
+    def start_pool_producer(self) -> None:
+        if self.pool_size <= 0:
+            return
+        if self._producer_task is None or self._producer_task.done():
+            self._producer_task = asyncio.get_running_loop().create_task(self._run_pool_producer())
+
+    async def stop_pool_producer(self) -> None:
+        task, self._producer_task = self._producer_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
 
     def _generate_captcha_image(self, code: str) -> str:
         
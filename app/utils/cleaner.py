@@ -108,6 +108,7 @@ def main():
     rows_to_keep = []
     threats_log = []
     start_found = False
+    trace_events = 0
     
     try:
         with open(CSV_INPUT, 'r', encoding='utf-8', errors='ignore') as f:
@@ -117,6 +118,7 @@ def main():
             for row_data in enumerate(reader):
                 row = row_data[1]
                 if len(row) < 10: continue
+                trace_events += 1
                 
                 event_name = row[0].strip()
                 event_type = row[1].strip()
@@ -175,21 +177,23 @@ def main():
             if headers:
                 writer.writerow(headers)
 
+        # The summary counts the same entries as the report, as the report-based fallbacks do
+        threats_log = [
+            {
+                "line_number": 0,
+                "event": "Process",
+                "details": TARGET_EXE,
+                "level": "INFO",
+                "msg": f"Не найден запуск {TARGET_EXE}"
+            }
+        ]
         with open(REPORT_OUTPUT, 'w', encoding='utf-8') as f:
-            json.dump([
-                {
-                    "line_number": 0,
-                    "event": "Process",
-                    "details": TARGET_EXE,
-                    "level": "INFO",
-                    "msg": f"Не найден запуск {TARGET_EXE}"
-                }
-            ], f, indent=4, ensure_ascii=False)
+            json.dump(threats_log, f, indent=4, ensure_ascii=False)
 
         with open(JSON_OUTPUT, 'w', encoding='utf-8') as f:
             json.dump([], f, indent=4, ensure_ascii=False)
 
-        return
+        return _summarize(threats_log, trace_events, 0, 0)
     
     with open(CSV_OUTPUT, 'w', encoding='utf-8', newline='') as f:
         writer = csv.writer(f)
@@ -234,6 +238,21 @@ def main():
     except: 
         raise HTTPException(status_code=500, detail="Failed to process JSON")
 
+    return _summarize(threats_log, trace_events, len(rows_to_keep), len(tracked_pids))
+
+def _summarize(threats_log, trace_events, kept_events, tracked_processes):
+    threat_levels = {}
+    for entry in threats_log:
+        level = entry.get("level") or "UNKNOWN"
+        threat_levels[level] = threat_levels.get(level, 0) + 1
+    return {
+        "danger_count": len(threats_log),
+        "threat_levels": threat_levels,
+        "trace_events": trace_events,
+        "kept_events": kept_events,
+        "tracked_processes": tracked_processes,
+    }
+
 def run_cleaner(target_exe, base_dir):
     global TARGET_EXE, CSV_INPUT, JSON_INPUT, CSV_OUTPUT, JSON_OUTPUT, REPORT_OUTPUT
     original_target_exe = TARGET_EXE
@@ -249,7 +268,7 @@ def run_cleaner(target_exe, base_dir):
         CSV_OUTPUT = os.path.join(base_dir, "clean_tree.csv")
         JSON_OUTPUT = os.path.join(base_dir, "clean_tree.json")
         REPORT_OUTPUT = os.path.join(base_dir, "threat_report.json")
-        main()
+        return main()
     finally:
         TARGET_EXE = original_target_exe
         CSV_INPUT = original_csv_input
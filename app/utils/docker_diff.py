@@ -0,0 +1,18 @@
+from typing import List, Tuple
+
+
+# docker diff prefixes: A - added, C - changed, D - deleted
+_KINDS = frozenset("ACD")
+
+
+def parse_docker_diff(output: str | None) -> List[Tuple[str, str]]:
+    """Разбирает вывод `docker diff` в список (вид изменения, путь); прочие строки пропускаются."""
+    entries: List[Tuple[str, str]] = []
+    for line in (output or "").splitlines():
+        line = line.strip()
+        if len(line) < 3 or line[0] not in _KINDS or line[1] != " ":
+            continue
+        path = line[2:].strip()
+        if path:
+            entries.append((line[0], path))
+    return entries
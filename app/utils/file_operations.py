@@ -2,7 +2,7 @@ import os
 import uuid
 import json
 from datetime import datetime
-from shutil import copyfileobj
+from shutil import copy2, copyfileobj
 from app.infra.docker.paths import get_docker_root
 
 
@@ -47,6 +47,26 @@ class FileOperations:
 
         return file_path, storage
 
+    @staticmethod
+    def store_path_by_hash(src_path: str, filename: str, file_hash: str, pipeline_version: str):
+        storage = FileOperations.hash_based_storage(file_hash, pipeline_version)
+
+        file_path = os.path.join(storage["files"], "original.exe")
+        os.replace(src_path, file_path)
+
+        metadata = {
+            "filename": filename,
+            "size": os.path.getsize(file_path),
+            "hash": file_hash,
+            "pipeline_version": pipeline_version,
+            "uploaded_at": datetime.utcnow().isoformat(),
+        }
+
+        with open(os.path.join(storage["files"], "metadata.json"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+        return file_path, storage
+
     @staticmethod
     def user_upload(email):
         upload_path = os.path.join(get_docker_root(), "analysis", email)
@@ -62,5 +82,19 @@ class FileOperations:
         with open(file_path, "wb") as buffer:
             copyfileobj(file.file, buffer)
 
+    @staticmethod
+    def user_file_link(src_path: str, filename: str, user_upload_folder):
+        if not user_upload_folder:
+            raise ValueError("Путь для загрузки файла не указан")
+
+        file_path = os.path.join(user_upload_folder, filename)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        try:
+            os.link(src_path, file_path)
+        except OSError:
+            copy2(src_path, file_path)
+        return file_path
+
     def run_ID():
         return uuid.uuid4()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import os
+from typing import Mapping, Optional
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+
+class FileRegionResponse(Response):
+    """
+    prefix + байты файла [offset, EOF) без чтения в память целиком.
+    Если сервер поддерживает ASGI-расширение http.response.zerocopysend, файл уходит через sendfile,
+    иначе — кусками по chunk_size из рабочего потока.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        offset: int = 0,
+        prefix: bytes = b"",
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        background: Optional[BackgroundTask] = None,
+    ) -> None:
+        self.path = path
+        self.offset = max(0, int(offset))
+        self.prefix = prefix
+        self.status_code = 200
+        self.media_type = media_type
+        self.background = background
+        self.init_headers(headers)
+        if filename is not None:
+            self.headers.setdefault("content-disposition", f"attachment; filename={filename}")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        size = await anyio.to_thread.run_sync(os.path.getsize, self.path)
+        count = max(0, size - self.offset)
+        self.headers["content-length"] = str(len(self.prefix) + count)
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            if self.prefix or not count:
+                await send({"type": "http.response.body", "body": self.prefix, "more_body": bool(count)})
+            if count:
+                f = await anyio.to_thread.run_sync(open, self.path, "rb")
+                try:
+                    if zerocopy:
+                        await send(
+                            {
+                                "type": "http.response.zerocopysend",
+                                "file": f,
+                                "offset": self.offset,
+                                "count": count,
+                                "more_body": False,
+                            }
+                        )
+                    else:
+                        await self._send_chunks(f, count, send)
+                finally:
+                    f.close()
+
+        if self.background is not None:
+            await self.background()
+
+    async def _send_chunks(self, f, count: int, send: Send) -> None:
+        await anyio.to_thread.run_sync(f.seek, self.offset)
+        remaining = count
+        while remaining > 0:
+            chunk = await anyio.to_thread.run_sync(f.read, min(self.chunk_size, remaining))
+            if not chunk:
+                # Truncated while streaming: end the body rather than hang on the declared length
+                break
+            remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -1,12 +1,36 @@
 from __future__ import annotations
 
+import json
+import os
+from typing import Callable, Optional, Tuple
 
-def filter_trace_csv_lines(csv_file_path: str, target_exe: str | None):
+
+_MATCH_INDEX_VERSION = 1
+_READ_BUFFER = 1024 * 1024
+
+
+def _target_matcher(target_exe: str | None) -> Optional[Callable[[str], bool]]:
     target_exe_lower = (target_exe or "").lower()
     if not target_exe_lower:
         return None
 
     target_exe_lower_no_ext = target_exe_lower[:-4] if target_exe_lower.endswith(".exe") else target_exe_lower
+    n_comma = "," + target_exe_lower + ","
+    n_path = "\\" + target_exe_lower
+    n_path_exe = "\\" + target_exe_lower_no_ext + ".exe"
+    n_space = " " + target_exe_lower
+    n_space_no_ext = " " + target_exe_lower_no_ext
+
+    def matches(l: str) -> bool:
+        return n_comma in l or n_path in l or n_path_exe in l or n_space in l or n_space_no_ext in l
+
+    return matches
+
+
+def filter_trace_csv_lines(csv_file_path: str, target_exe: str | None):
+    matches = _target_matcher(target_exe)
+    if matches is None:
+        return None
 
     filtered_lines: list[str] = []
     with open(csv_file_path, "r", encoding="utf-8", errors="ignore") as f:
@@ -16,16 +40,8 @@ def filter_trace_csv_lines(csv_file_path: str, target_exe: str | None):
 
         found = False
         for line in f:
-            if not found:
-                l = line.lower()
-                if (
-                    ("," + target_exe_lower + ",") in l
-                    or ("\\" + target_exe_lower) in l
-                    or ("\\" + target_exe_lower_no_ext + ".exe") in l
-                    or (" " + target_exe_lower) in l
-                    or (" " + target_exe_lower_no_ext) in l
-                ):
-                    found = True
+            if not found and matches(line.lower()):
+                found = True
 
             if found:
                 filtered_lines.append(line)
@@ -34,3 +50,65 @@ def filter_trace_csv_lines(csv_file_path: str, target_exe: str | None):
         return None
 
     return filtered_lines
+
+
+def find_trace_csv_match(csv_file_path: str, target_exe: str | None) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Байтовые смещения для отфильтрованной выгрузки: (конец заголовка, начало первой строки с target_exe).
+    Отфильтрованный trace.csv = [0, конец заголовка) + [смещение, EOF). Смещение None — совпадений нет.
+    """
+    matches = _target_matcher(target_exe)
+    if matches is None:
+        return None
+
+    with open(csv_file_path, "rb", buffering=_READ_BUFFER) as f:
+        header = f.readline()
+        header_end = len(header)
+        offset = header_end
+        for line in f:
+            if matches(line.decode("utf-8", errors="ignore").lower()):
+                return header_end, offset
+            offset += len(line)
+    return header_end, None
+
+
+def get_trace_csv_match(
+    csv_file_path: str, target_exe: str | None, index_path: str | None = None
+) -> Optional[Tuple[int, Optional[int]]]:
+    """find_trace_csv_match с кэшем в JSON рядом с trace.csv (сбрасывается при смене размера/mtime файла)."""
+    if not (target_exe or ""):
+        return None
+
+    index_path = index_path or csv_file_path + ".match.json"
+    st = os.stat(csv_file_path)
+    key = {
+        "version": _MATCH_INDEX_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "target": target_exe.lower(),
+    }
+
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if all(cached.get(k) == v for k, v in key.items()):
+            return cached["header_end"], cached["offset"]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    found = find_trace_csv_match(csv_file_path, target_exe)
+    if found is None:
+        return None
+
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({**key, "header_end": found[0], "offset": found[1]}, f)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        # Read-only or full disk: the download still works, just without the cache
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return found
@@ -2,6 +2,8 @@ import json
 from typing import Dict, List
 from fastapi import WebSocket
 
+from app.core.metrics import WEBSOCKET_CONNECTIONS
+
 app_loop = None
 
 class ConnectionManager:
@@ -13,10 +15,12 @@ class ConnectionManager:
         if analysis_id not in self.active_connections:
             self.active_connections[analysis_id] = []
         self.active_connections[analysis_id].append(websocket)
+        WEBSOCKET_CONNECTIONS.labels(channel="analysis").inc()
 
     def disconnect(self, analysis_id: str, websocket: WebSocket):
-        if analysis_id in self.active_connections:
+        if analysis_id in self.active_connections and websocket in self.active_connections[analysis_id]:
             self.active_connections[analysis_id].remove(websocket)
+            WEBSOCKET_CONNECTIONS.labels(channel="analysis").dec()
             if not self.active_connections[analysis_id]:
                 del self.active_connections[analysis_id]
 
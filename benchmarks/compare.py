@@ -0,0 +1,51 @@
+"""
+Сравнение двух результатов benchmarks.run по медиане.
+
+    python -m benchmarks.compare benchmarks/results/<base>.json benchmarks/results/<new>.json --threshold 10
+
+Код выхода 1, если какой-то кейс замедлился больше чем на --threshold процентов.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+
+def _load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown, percent")
+    args = parser.parse_args(argv)
+
+    base, new = _load(args.base), _load(args.new)
+    if base.get("dataset", {}).get("spec") != new.get("dataset", {}).get("spec"):
+        print("warning: datasets differ, numbers are not directly comparable", file=sys.stderr)
+
+    commit = lambda r: (r.get("environment", {}).get("commit") or "?")[:10]
+    print(f"{'case':20s} {commit(base):>12s} {commit(new):>12s} {'change':>9s}")
+
+    regressions = []
+    for name in sorted(set(base.get("results", {})) | set(new.get("results", {}))):
+        b = base.get("results", {}).get(name)
+        n = new.get("results", {}).get(name)
+        if not b or not n:
+            print(f"{name:20s} {'-' if not b else '%.1f ms' % (b['median_s'] * 1000):>12s} "
+                  f"{'-' if not n else '%.1f ms' % (n['median_s'] * 1000):>12s}")
+            continue
+        change = (n["median_s"] - b["median_s"]) / b["median_s"] * 100 if b["median_s"] else 0.0
+        flag = "  REGRESSION" if change > args.threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:20s} {b['median_s'] * 1000:9.1f} ms {n['median_s'] * 1000:9.1f} ms {change:+8.1f}%{flag}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
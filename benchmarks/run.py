@@ -0,0 +1,291 @@
+"""
+Бенчмарки горячих путей обработки трассы: cleaner, фильтр trace.csv, /clean-tree, /etl-chunk, sanitize_multiline.
+
+    python -m benchmarks.run --size 10m
+    python -m benchmarks.run --size 1g --repeat 1 --only cleaner,trace_filter --json none
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Датасеты кешируются в <tmp>/filetrace-bench/<size>-<seed>; результаты пишутся в benchmarks/results/.
+Нужны те же переменные окружения, что и для приложения (импорт app.api.analysis_rest читает settings).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from benchmarks.trace_generator import GENERATOR_VERSION, TraceSpec, generate_docker_output, generate_trace, parse_size
+
+
+ALL_CASES = ["cleaner", "trace_filter", "trace_match", "clean_tree", "etl_chunk", "sanitize_multiline"]
+
+_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class _NullSession:
+    """Минимальная замена AsyncSession для AuditService: запись в audit не входит в замер."""
+
+    def add(self, obj) -> None:
+        pass
+
+    async def commit(self) -> None:
+        pass
+
+    async def refresh(self, obj) -> None:
+        pass
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], capture_output=True, text=True, check=True, timeout=10)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def _environment() -> Dict:
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _dataset(spec: TraceSpec, size_label: str, cache_root: str, regenerate: bool) -> tuple[str, Dict]:
+    out_dir = os.path.join(cache_root, f"{size_label}-{spec.seed}-{spec.json_mode}")
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    if not regenerate and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("spec") == spec.__dict__ and manifest.get("generator_version") == GENERATOR_VERSION:
+            return out_dir, manifest
+    shutil.rmtree(out_dir, ignore_errors=True)
+    print(f"generating {size_label} dataset in {out_dir}", file=sys.stderr)
+    manifest = generate_trace(out_dir, spec)
+    return out_dir, manifest.__dict__
+
+
+@contextmanager
+def _analysis_workspace(dataset_dir: str) -> Iterator[str]:
+    """
+    Обработчики ищут артефакты в <cwd>/dockerer/analysis/<id>: подменяем cwd на временный каталог,
+    где <id> указывает на датасет (симлинк, иначе копия).
+    """
+    analysis_id = str(uuid.uuid4())
+    prev_cwd = os.getcwd()
+    root = tempfile.mkdtemp(prefix="filetrace-bench-")
+    try:
+        analysis_root = os.path.join(root, "dockerer", "analysis")
+        os.makedirs(analysis_root)
+        link = os.path.join(analysis_root, analysis_id)
+        try:
+            os.symlink(dataset_dir, link, target_is_directory=True)
+        except OSError:
+            shutil.copytree(dataset_dir, link)
+        os.chdir(root)
+        yield analysis_id
+    finally:
+        os.chdir(prev_cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _measure(fn: Callable[[], object], repeat: int, warmup: int) -> tuple[List[float], object]:
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def _summary(timings: List[float], *, nbytes: int = 0, rows: int = 0) -> Dict:
+    median = statistics.median(timings)
+    out = {
+        "repeat": len(timings),
+        "min_s": min(timings),
+        "median_s": median,
+        "mean_s": statistics.fmean(timings),
+        "stdev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "timings_s": timings,
+    }
+    if nbytes and median > 0:
+        out["mb_per_s"] = nbytes / 1024 ** 2 / median
+    if rows and median > 0:
+        out["rows_per_s"] = rows / median
+    return out
+
+
+def _response_json(response) -> Dict:
+    body = json.loads(response.body)
+    if response.status_code != 200:
+        raise RuntimeError(f"handler returned {response.status_code}: {body}")
+    return body
+
+
+def run_cases(dataset_dir: str, manifest: Dict, cases: List[str], *, repeat: int, warmup: int,
+              target_exe: str, chunk_limit: int, etl_offset: int, log_lines: int, seed: int) -> Dict[str, Dict]:
+    csv_path = os.path.join(dataset_dir, "trace.csv")
+    csv_bytes = manifest.get("csv_bytes") or os.path.getsize(csv_path)
+    rows = manifest.get("rows") or 0
+    results: Dict[str, Dict] = {}
+
+    if "cleaner" in cases or ("clean_tree" in cases and not os.path.exists(os.path.join(dataset_dir, "clean_tree.csv"))):
+        from app.utils.cleaner import run_cleaner
+
+        timings, stats = _measure(lambda: run_cleaner(target_exe, dataset_dir), repeat if "cleaner" in cases else 1, 0)
+        if "cleaner" in cases:
+            results["cleaner"] = {**_summary(timings, nbytes=csv_bytes, rows=rows), "output": stats}
+
+    if "trace_filter" in cases:
+        from app.utils.trace_csv_filter import filter_trace_csv_lines
+
+        timings, lines = _measure(lambda: filter_trace_csv_lines(csv_path, target_exe), repeat, warmup)
+        results["trace_filter"] = {**_summary(timings, nbytes=csv_bytes, rows=rows), "output": {"lines": len(lines or [])}}
+
+    if "trace_match" in cases:
+        # Uncached scan behind the streaming trace.csv download
+        from app.utils.trace_csv_filter import find_trace_csv_match
+
+        timings, match = _measure(lambda: find_trace_csv_match(csv_path, target_exe), repeat, warmup)
+        header_end, offset = match or (0, None)
+        results["trace_match"] = {
+            **_summary(timings, nbytes=csv_bytes, rows=rows),
+            "output": {"header_end": header_end, "offset": offset},
+        }
+
+    if "clean_tree" in cases or "etl_chunk" in cases:
+        from app.api.analysis_rest import get_clean_tree, get_etl_chunk
+
+        with _analysis_workspace(dataset_dir) as analysis_id:
+            if "clean_tree" in cases:
+                clean_bytes = os.path.getsize(os.path.join(dataset_dir, "clean_tree.csv"))
+                timings, response = _measure(
+                    lambda: asyncio.run(get_clean_tree(analysis_id, limit=chunk_limit, db=_NullSession())), repeat, warmup
+                )
+                body = _response_json(response)
+                results["clean_tree"] = {
+                    **_summary(timings, nbytes=clean_bytes),
+                    "output": {"rows": len(body.get("rows") or []), "total_rows": body.get("total_rows")},
+                }
+            if "etl_chunk" in cases and os.path.exists(os.path.join(dataset_dir, "trace.json")):
+                json_bytes = os.path.getsize(os.path.join(dataset_dir, "trace.json"))
+                timings, response = _measure(
+                    lambda: asyncio.run(
+                        get_etl_chunk(analysis_id, offset=etl_offset, limit=chunk_limit, db=_NullSession())
+                    ),
+                    repeat,
+                    warmup,
+                )
+                body = _response_json(response)
+                results["etl_chunk"] = {
+                    **_summary(timings, nbytes=json_bytes),
+                    "output": {"lines": len(body.get("chunk") or []), "total": body.get("total")},
+                }
+
+    if "sanitize_multiline" in cases:
+        from app.utils.analysis_log_filter import sanitize_multiline
+
+        raw = generate_docker_output(log_lines, seed)
+        timings, cleaned = _measure(lambda: sanitize_multiline(raw), repeat, warmup)
+        results["sanitize_multiline"] = {
+            **_summary(timings, nbytes=len(raw.encode("utf-8")), rows=log_lines),
+            "output": {"chars": len(cleaned)},
+        }
+
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="FileTrace trace-processing benchmarks")
+    parser.add_argument("--size", default="10m", help="10m | 1g | 5g | <n>[k|m|g]")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--threat-density", type=float, default=0.001)
+    parser.add_argument("--garbage-ratio", type=float, default=0.3)
+    parser.add_argument("--target-exe", default="sample.exe")
+    parser.add_argument("--json", dest="json_mode", choices=["full", "none"], default="full",
+                        help="trace.json is ~2.5x trace.csv; use none for 1g/5g to skip etl_chunk")
+    parser.add_argument("--only", default=",".join(ALL_CASES), help="comma-separated subset of " + ",".join(ALL_CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--chunk-limit", type=int, default=200)
+    parser.add_argument("--etl-offset", type=int, default=0)
+    parser.add_argument("--log-lines", type=int, default=200_000)
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "filetrace-bench"))
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--out", help="result file (default benchmarks/results/<utc>-<commit>-<size>.json)")
+    args = parser.parse_args(argv)
+
+    cases = [c.strip() for c in args.only.split(",") if c.strip()]
+    unknown = sorted(set(cases) - set(ALL_CASES))
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    spec = TraceSpec(
+        size_bytes=parse_size(args.size),
+        target_exe=args.target_exe,
+        processes=args.processes,
+        max_depth=args.max_depth,
+        threat_density=args.threat_density,
+        garbage_ratio=args.garbage_ratio,
+        seed=args.seed,
+        json_mode=args.json_mode,
+    )
+    dataset_dir, manifest = _dataset(spec, args.size.lower(), args.cache_dir, args.regenerate)
+
+    env = _environment()
+    results = run_cases(
+        dataset_dir,
+        manifest,
+        cases,
+        repeat=max(1, args.repeat),
+        warmup=max(0, args.warmup),
+        target_exe=args.target_exe,
+        chunk_limit=args.chunk_limit,
+        etl_offset=args.etl_offset,
+        log_lines=args.log_lines,
+        seed=args.seed,
+    )
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": env,
+        "dataset": {k: v for k, v in manifest.items() if k != "threat_rows"},
+        "params": {k: v for k, v in vars(args).items() if k not in {"out", "cache_dir", "regenerate"}},
+        "results": results,
+    }
+
+    out = args.out
+    if not out:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        out = os.path.join(_RESULTS_DIR, f"{stamp}-{(env['commit'] or 'nogit')[:10]}-{args.size.lower()}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    for name, res in results.items():
+        extra = f"  {res['mb_per_s']:.1f} MB/s" if "mb_per_s" in res else ""
+        print(f"{name:20s} median {res['median_s'] * 1000:10.1f} ms  min {res['min_s'] * 1000:10.1f} ms{extra}")
+    print(f"saved {out}")
+
+
+if __name__ == "__main__":
+    main()
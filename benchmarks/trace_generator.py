@@ -0,0 +1,282 @@
+"""
+Генератор синтетических ETW-трасс в формате EtwCollector (trace.csv / trace.json).
+
+    python -m benchmarks.trace_generator --size 10m --out /tmp/trace-10m
+    python -m benchmarks.trace_generator --size 1g --processes 40 --threat-density 0.002 --json none --out /tmp/trace-1g
+
+Вывод детерминирован для одинаковых параметров и --seed.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+
+# Same column order as Capture.CsvHeaders in etw_collector/Program.cs
+CSV_HEADERS = [
+    "Event Name", "Type", "TimeStamp", "Provider", "Task", "Opcode", "Flags", "Level", "Keywords", "PID",
+    "TID", "ProcessName", "ImageFileName", "CommandLine", "Path", "User Data",
+]
+
+# Bump when the generated content changes so cached datasets are rebuilt
+GENERATOR_VERSION = 1
+
+SIZE_PRESETS = {
+    "10m": 10 * 1024 ** 2,
+    "1g": 1024 ** 3,
+    "5g": 5 * 1024 ** 3,
+}
+
+_SYSTEM_PROCESSES = ["svchost.exe", "conhost.exe", "csrss.exe", "lsass.exe", "services.exe", "wmiprvse.exe"]
+_CHILD_PROCESSES = ["helper.exe", "updater.exe", "rundll32.exe", "regsvr32.exe", "msiexec.exe"]
+_DLLS = ["ntdll.dll", "kernel32.dll", "kernelbase.dll", "user32.dll", "advapi32.dll", "ws2_32.dll", "ucrtbase.dll"]
+_FILE_OPS = ["Create", "Read", "Write", "Cleanup", "Close", "QueryInfo", "SetInfo"]
+_DIRS = [
+    "C:\\Windows\\System32",
+    "C:\\Users\\ContainerUser\\AppData\\Local\\Temp",
+    "C:\\ProgramData",
+    "C:\\Users\\ContainerUser\\Documents",
+]
+
+# (event name, type, process name, command line, path): each row trips one detect_threat rule
+_THREATS = [
+    ("Process", "Start", "powershell.exe", "C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe -enc AAAA", ""),
+    ("Process", "Start", "cmd.exe", "C:\\Windows\\System32\\cmd.exe /c whoami", ""),
+    ("Process", "Start", "wscript.exe", "C:\\Windows\\System32\\wscript.exe payload.vbs", ""),
+    ("FileIo", "Write", "", "", "C:\\Users\\ContainerUser\\AppData\\Local\\Temp\\dropped.exe"),
+    ("FileIo", "Write", "", "", "C:\\Windows\\System32\\drivers\\etc\\hosts"),
+    ("FileIo", "Create", "", "", "C:\\Users\\ContainerUser\\AppData\\Roaming\\Microsoft\\Windows\\Start Menu\\Programs\\Startup\\run.lnk"),
+    ("TcpIp", "Send", "", "", ""),
+    ("Image", "Load", "", "", "C:\\Windows\\Microsoft.NET\\Framework64\\v4.0.30319\\clr.dll"),
+]
+
+
+def parse_size(value: str) -> int:
+    v = str(value).strip().lower()
+    if v in SIZE_PRESETS:
+        return SIZE_PRESETS[v]
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    if v and v[-1] in units:
+        return int(float(v[:-1]) * units[v[-1]])
+    return int(v)
+
+
+@dataclass
+class TraceSpec:
+    size_bytes: int
+    target_exe: str = "sample.exe"
+    processes: int = 8
+    max_depth: int = 3
+    threat_density: float = 0.001
+    garbage_ratio: float = 0.3
+    preamble_rows: int = 200
+    seed: int = 1
+    json_mode: str = "full"  # full | none
+
+
+@dataclass
+class TraceManifest:
+    spec: Dict
+    generator_version: int = GENERATOR_VERSION
+    csv_bytes: int = 0
+    json_bytes: int = 0
+    rows: int = 0
+    tracked_processes: int = 0
+    threats: int = 0
+    threat_rows: List[int] = field(default_factory=list)
+
+
+class _ProcessTree:
+    def __init__(self, rnd: random.Random, spec: TraceSpec):
+        self.rnd = rnd
+        self.spec = spec
+        self.next_pid = 0x1000
+        self.depth: Dict[int, int] = {}
+        self.names: Dict[int, str] = {}
+        self.pids: List[int] = []
+
+    def new_pid(self) -> int:
+        self.next_pid += self.rnd.randint(4, 64) * 4
+        return self.next_pid
+
+    def add(self, pid: int, name: str, depth: int) -> None:
+        self.depth[pid] = depth
+        self.names[pid] = name
+        self.pids.append(pid)
+
+    def can_spawn(self) -> bool:
+        return len(self.depth) < self.spec.processes
+
+    def spawn_parent(self) -> Optional[int]:
+        candidates = [p for p, d in self.depth.items() if d < self.spec.max_depth]
+        return self.rnd.choice(candidates) if candidates else None
+
+
+def _row(event, etype, ts, pid, tid, proc="", image="", cmd="", path="", user_data="") -> List[str]:
+    return [event, etype, ts, "", "", "", "", "", "", f"0x{pid:X}", str(tid), proc, image, cmd, path, user_data]
+
+
+def _timestamp(i: int) -> str:
+    # Monotonic, cheap to format: one event every ~50us starting at a fixed moment
+    total_us = i * 50
+    s, us = divmod(total_us, 1_000_000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"2024-01-01T{h % 24:02d}:{m:02d}:{s:02d}.{us:06d}0Z"
+
+
+def generate_trace(out_dir: str, spec: TraceSpec) -> TraceManifest:
+    """Пишет trace.csv (и trace.json при json_mode=full) в out_dir до достижения spec.size_bytes."""
+    os.makedirs(out_dir, exist_ok=True)
+    rnd = random.Random(spec.seed)
+    tree = _ProcessTree(rnd, spec)
+    manifest = TraceManifest(spec=asdict(spec))
+
+    csv_path = os.path.join(out_dir, "trace.csv")
+    json_path = os.path.join(out_dir, "trace.json")
+    write_json = spec.json_mode == "full"
+
+    with open(csv_path, "w", encoding="utf-8", newline="") as csv_file:
+        json_file = open(json_path, "w", encoding="utf-8") if write_json else None
+        try:
+            writer = csv.writer(csv_file)
+            writer.writerow(CSV_HEADERS)
+            json_first = True
+            i = 0
+
+            def emit(row: List[str]) -> None:
+                nonlocal i, json_first
+                writer.writerow(row)
+                i += 1
+                if json_file is not None:
+                    json_file.write("[" if json_first else ",")
+                    json_first = False
+                    json_file.write(json.dumps(dict(zip(CSV_HEADERS, row)), ensure_ascii=False, separators=(",", ":")))
+
+            # Collector writes every process start until the target appears
+            for _ in range(spec.preamble_rows):
+                pid = tree.new_pid()
+                name = rnd.choice(_SYSTEM_PROCESSES)
+                emit(_row("Process", "Start", _timestamp(i), pid, rnd.randint(1, 9999), name,
+                          f"C:\\Windows\\System32\\{name}", name, "", f"Parent=0x{rnd.randint(4, 999) * 4:X}"))
+
+            target_pid = tree.new_pid()
+            tree.add(target_pid, spec.target_exe, 0)
+            emit(_row("Process", "Start", _timestamp(i), target_pid, rnd.randint(1, 9999), spec.target_exe,
+                      f"C:\\sandbox\\{spec.target_exe}", f"C:\\sandbox\\{spec.target_exe}", "", "Parent=0x4E4"))
+
+            # Like the kernel provider, child Process/Start rows carry the creator in PID and the new
+            # process id in User Data, which is how the cleaner follows the tree.
+            # TextIOWrapper.tell() flushes, so the size is only checked every few hundred rows
+            while i % 512 or csv_file.tell() < spec.size_bytes:
+                pid = rnd.choice(tree.pids)
+                tid = rnd.randint(1, 9999)
+                ts = _timestamp(i)
+                roll = rnd.random()
+
+                if roll < spec.threat_density:
+                    event, etype, proc, cmd, path = rnd.choice(_THREATS)
+                    if event == "Process":
+                        child = tree.new_pid()
+                        if tree.can_spawn():
+                            tree.add(child, proc, tree.depth[pid] + 1)
+                        row = _row(event, etype, ts, pid, tid, proc, f"C:\\Windows\\System32\\{proc}", cmd, "", f"ProcessID=0x{child:X}")
+                    elif event == "TcpIp":
+                        row = _row(event, etype, ts, pid, tid, tree.names[pid], "", "", "",
+                                   f"10.0.0.5:{rnd.randint(49152, 65535)} -> 203.0.113.{rnd.randint(1, 254)}:443")
+                    else:
+                        row = _row(event, etype, ts, pid, tid, tree.names[pid], path if event == "Image" else "", "", path, path)
+                    manifest.threats += 1
+                    manifest.threat_rows.append(i)
+                elif roll < spec.threat_density + spec.garbage_ratio:
+                    kind = rnd.randrange(3)
+                    if kind == 0:
+                        row = _row("Thread", "Start", ts, pid, tid, tree.names[pid], "", "", "", f"0x{rnd.getrandbits(32):08X}")
+                    elif kind == 1:
+                        row = _row("FileIo", "OperationEnd", ts, pid, tid, tree.names[pid], "", "", "", "0x0")
+                    else:
+                        row = _row("FileIo", "Read", ts, pid, tid, tree.names[pid], "", "", "", f"0xFFFF{rnd.getrandbits(32):08X}")
+                elif roll < spec.threat_density + spec.garbage_ratio + 0.002 and tree.can_spawn():
+                    parent = tree.spawn_parent()
+                    if parent is None:
+                        continue
+                    child = tree.new_pid()
+                    name = rnd.choice(_CHILD_PROCESSES)
+                    tree.add(child, name, tree.depth[parent] + 1)
+                    row = _row("Process", "Start", ts, parent, tid, name, f"C:\\Windows\\System32\\{name}",
+                               f"{name} /q", "", f"ProcessID=0x{child:X}")
+                elif roll < 0.85:
+                    path = f"{rnd.choice(_DIRS)}\\file_{rnd.randrange(5000)}.{rnd.choice(['dat', 'log', 'tmp', 'ini', 'txt'])}"
+                    row = _row("FileIo", rnd.choice(_FILE_OPS), ts, pid, tid, tree.names[pid], "", "", path, path)
+                else:
+                    dll = f"C:\\Windows\\System32\\{rnd.choice(_DLLS)}"
+                    row = _row("Image", "Load", ts, pid, tid, tree.names[pid], dll, "", dll, dll)
+                emit(row)
+
+            if json_file is not None:
+                json_file.write("[]" if json_first else "]")
+            manifest.rows = i
+        finally:
+            if json_file is not None:
+                json_file.close()
+
+    manifest.tracked_processes = len(tree.depth)
+    manifest.csv_bytes = os.path.getsize(csv_path)
+    manifest.json_bytes = os.path.getsize(json_path) if write_json else 0
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(asdict(manifest), f, indent=2)
+    return manifest
+
+
+def generate_docker_output(lines: int, seed: int = 1) -> str:
+    """Лог анализа вперемешку с шумом docker build и путями — вход для sanitize_multiline."""
+    rnd = random.Random(seed)
+    templates = [
+        "Step {n}/12 : COPY sample.exe C:\\sandbox\\",
+        " ---> Running in {h}",
+        "Removed intermediate container {h}",
+        "docker run stdout: Handles  NPM(K)    PM(K)      WS(K)",
+        "ETW: trace.csv ready output_dir=C:\\FileTrace\\dockerer\\analysis\\{h}",
+        "Запуск программы... base_dir=C:\\FileTrace\\dockerer\\analysis\\{h}",
+        "Файл C:\\Users\\ContainerUser\\AppData\\Local\\Temp\\file_{n}.tmp создан",
+        "Анализ запущен",
+        "Отслеживание остановлено",
+    ]
+    out = []
+    for _ in range(lines):
+        out.append(rnd.choice(templates).format(n=rnd.randrange(1000), h=f"{rnd.getrandbits(48):012x}"))
+    return "\n".join(out)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Synthetic ETW trace generator")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--size", default="10m", help="10m | 1g | 5g | <n>[k|m|g]")
+    parser.add_argument("--target-exe", default="sample.exe")
+    parser.add_argument("--processes", type=int, default=8, help="max tracked processes in the tree")
+    parser.add_argument("--max-depth", type=int, default=3)
+    parser.add_argument("--threat-density", type=float, default=0.001, help="share of rows that trigger a threat rule")
+    parser.add_argument("--garbage-ratio", type=float, default=0.3, help="share of rows the cleaner filters out")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_mode", choices=["full", "none"], default="full")
+    args = parser.parse_args(argv)
+
+    spec = TraceSpec(
+        size_bytes=parse_size(args.size),
+        target_exe=args.target_exe,
+        processes=args.processes,
+        max_depth=args.max_depth,
+        threat_density=args.threat_density,
+        garbage_ratio=args.garbage_ratio,
+        seed=args.seed,
+        json_mode=args.json_mode,
+    )
+    manifest = generate_trace(args.out, spec)
+    print(json.dumps({k: v for k, v in asdict(manifest).items() if k != "threat_rows"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
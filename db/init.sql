@@ -38,6 +38,20 @@ Create Table IF NOT EXISTS Analysis_Subscribers(
     UNIQUE (analysis_id, user_id)
 );
 
+-- Same indexes as db/migrations/0002_hot_query_indexes.sql, for databases created from this file
+CREATE INDEX IF NOT EXISTS idx_analysis_hash_version_status_time
+    ON Analysis (file_hash, pipeline_version, status, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_analysis_active_time
+    ON Analysis (timestamp)
+    WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_analysis_user_time
+    ON Analysis (user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_analysis_subscribers_user
+    ON Analysis_Subscribers (user_id, analysis_id);
+CREATE INDEX IF NOT EXISTS idx_users_unconfirmed_expires
+    ON Users (expires_at)
+    WHERE confirmed = FALSE;
+
 
 Create Table IF NOT EXISTS Results(
     analysis_id uuid PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -47,6 +61,30 @@ Create Table IF NOT EXISTS Results(
     FOREIGN KEY (analysis_id) REFERENCES Analysis(analysis_id) ON DELETE CASCADE
 );
 
+Create Table IF NOT EXISTS Analysis_Summary(
+    analysis_id uuid PRIMARY KEY,
+    danger_count INTEGER NOT NULL DEFAULT 0,
+    threat_levels JSONB NOT NULL DEFAULT '{}'::jsonb,
+    trace_events INTEGER NOT NULL DEFAULT 0,
+    kept_events INTEGER NOT NULL DEFAULT 0,
+    tracked_processes INTEGER NOT NULL DEFAULT 0,
+    duration_seconds DOUBLE PRECISION,
+    trace_csv_bytes BIGINT NOT NULL DEFAULT 0,
+    trace_etl_bytes BIGINT NOT NULL DEFAULT 0,
+    clean_tree_bytes BIGINT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (analysis_id) REFERENCES Analysis(analysis_id) ON DELETE CASCADE
+);
+
+Create Table IF NOT EXISTS File_Activity_Events(
+    analysis_id uuid NOT NULL,
+    seq INTEGER NOT NULL,
+    kind CHAR(1) NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (analysis_id, seq),
+    FOREIGN KEY (analysis_id) REFERENCES Analysis(analysis_id) ON DELETE CASCADE
+);
+
 -- Audit events table for security and user actions logging
 Create Table IF NOT EXISTS AuditEvents(
     id uuid PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -0,0 +1,25 @@
+-- Tables added after the initial schema, a no-op on databases created from a current init.sql
+
+Create Table IF NOT EXISTS Analysis_Summary(
+    analysis_id uuid PRIMARY KEY,
+    danger_count INTEGER NOT NULL DEFAULT 0,
+    threat_levels JSONB NOT NULL DEFAULT '{}'::jsonb,
+    trace_events INTEGER NOT NULL DEFAULT 0,
+    kept_events INTEGER NOT NULL DEFAULT 0,
+    tracked_processes INTEGER NOT NULL DEFAULT 0,
+    duration_seconds DOUBLE PRECISION,
+    trace_csv_bytes BIGINT NOT NULL DEFAULT 0,
+    trace_etl_bytes BIGINT NOT NULL DEFAULT 0,
+    clean_tree_bytes BIGINT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (analysis_id) REFERENCES Analysis(analysis_id) ON DELETE CASCADE
+);
+
+Create Table IF NOT EXISTS File_Activity_Events(
+    analysis_id uuid NOT NULL,
+    seq INTEGER NOT NULL,
+    kind CHAR(1) NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (analysis_id, seq),
+    FOREIGN KEY (analysis_id) REFERENCES Analysis(analysis_id) ON DELETE CASCADE
+);
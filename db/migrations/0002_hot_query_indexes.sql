@@ -0,0 +1,21 @@
+-- find_latest_completed_by_hash / find_active_by_hash: equality on all three columns, newest first
+CREATE INDEX IF NOT EXISTS idx_analysis_hash_version_status_time
+    ON Analysis (file_hash, pipeline_version, status, timestamp DESC);
+
+-- list_global_active: the queue is a small slice of the table, so index only that slice
+CREATE INDEX IF NOT EXISTS idx_analysis_active_time
+    ON Analysis (timestamp)
+    WHERE status IN ('queued', 'running');
+
+-- list_user_analyses, own analyses
+CREATE INDEX IF NOT EXISTS idx_analysis_user_time
+    ON Analysis (user_id, timestamp DESC);
+
+-- list_user_analyses, subscribed analyses: the unique (analysis_id, user_id) index cannot serve user_id lookups
+CREATE INDEX IF NOT EXISTS idx_analysis_subscribers_user
+    ON Analysis_Subscribers (user_id, analysis_id);
+
+-- cleanup of unconfirmed accounts
+CREATE INDEX IF NOT EXISTS idx_users_unconfirmed_expires
+    ON Users (expires_at)
+    WHERE confirmed = FALSE;
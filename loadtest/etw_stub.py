@@ -0,0 +1,242 @@
+"""
+Заглушка EtwCollector с тем же HTTP API (/health, /start, /stop).
+
+На /stop в outputDir записываются заранее записанные trace.csv/trace.json (по кругу), а имя
+исполняемого файла из записи заменяется на targetExe текущего анализа.
+
+    python -m loadtest.etw_stub --port 8765 --traces /path/to/recorded
+    python -m loadtest.etw_stub --generate 10m --stop-latency 0.5
+
+Каталог --traces: либо сам содержит trace.csv, либо его подкаталоги (формат benchmarks.trace_generator).
+Воркеры запускаются с ETW_COLLECTOR_URL=http://127.0.0.1:8765 и ETW_COLLECTOR_MODE=attach.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+_BLOCK = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class RecordedTrace:
+    directory: str
+    target_exe: str
+
+    @property
+    def csv_path(self) -> str:
+        return os.path.join(self.directory, "trace.csv")
+
+    @property
+    def json_path(self) -> str:
+        return os.path.join(self.directory, "trace.json")
+
+
+def find_traces(root: str, default_target: str) -> List[RecordedTrace]:
+    candidates = [root] + sorted(
+        os.path.join(root, name) for name in os.listdir(root) if os.path.isdir(os.path.join(root, name))
+    )
+    traces = []
+    for directory in candidates:
+        if not os.path.isfile(os.path.join(directory, "trace.csv")):
+            continue
+        target = default_target
+        manifest_path = os.path.join(directory, "manifest.json")
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                target = (json.load(f).get("spec") or {}).get("target_exe") or target
+        traces.append(RecordedTrace(directory=directory, target_exe=target))
+    return traces
+
+
+def copy_replacing(src: str, dst: str, old: str, new: str) -> int:
+    """Потоковое копирование с заменой old -> new, в том числе на границах блоков. Возвращает размер результата."""
+    written = 0
+    with open(src, "r", encoding="utf-8", errors="ignore", newline="") as fin, open(
+        dst, "w", encoding="utf-8", newline=""
+    ) as fout:
+        if not old or old == new:
+            while True:
+                block = fin.read(_BLOCK)
+                if not block:
+                    break
+                written += fout.write(block)
+            return written
+
+        carry = ""
+        while True:
+            block = fin.read(_BLOCK)
+            if not block:
+                written += fout.write(carry.replace(old, new))
+                return written
+            data = carry + block
+            safe = max(0, len(data) - (len(old) - 1))
+            # A match that starts before `safe` but ends after it has to go out in this block.
+            crossing = data.find(old, max(0, safe - len(old) + 1))
+            if crossing != -1 and crossing < safe:
+                safe = crossing + len(old)
+            written += fout.write(data[:safe].replace(old, new))
+            carry = data[safe:]
+
+
+class StubCollector:
+    def __init__(self, traces: List[RecordedTrace], *, start_latency: float, stop_latency: float,
+                 failure_rate: float, seed: int):
+        if not traces:
+            raise ValueError("no recorded traces")
+        self._traces = itertools.cycle(traces)
+        self.start_latency = start_latency
+        self.stop_latency = stop_latency
+        self.failure_rate = failure_rate
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._captures: Dict[str, dict] = {}
+        self.stats = {"started": 0, "stopped": 0, "failed": 0, "replayed_bytes": 0}
+
+    def diag(self) -> dict:
+        with self._lock:
+            return {"active": len(self._captures), **self.stats}
+
+    def _maybe_fail(self) -> None:
+        with self._lock:
+            failed = self.failure_rate > 0 and self._rnd.random() < self.failure_rate
+            if failed:
+                self.stats["failed"] += 1
+        if failed:
+            raise RuntimeError("stub collector: injected failure")
+
+    def start(self, analysis_id: str, output_dir: str, target_exe: str) -> None:
+        time.sleep(self.start_latency)
+        self._maybe_fail()
+        with self._lock:
+            trace = next(self._traces)
+            self._captures[analysis_id] = {"output_dir": output_dir, "target_exe": target_exe, "trace": trace}
+            self.stats["started"] += 1
+
+    def stop(self, analysis_id: str) -> bool:
+        with self._lock:
+            capture = self._captures.pop(analysis_id, None)
+        if capture is None:
+            return False
+        time.sleep(self.stop_latency)
+        self._maybe_fail()
+
+        trace: RecordedTrace = capture["trace"]
+        os.makedirs(capture["output_dir"], exist_ok=True)
+        written = copy_replacing(
+            trace.csv_path, os.path.join(capture["output_dir"], "trace.csv"), trace.target_exe, capture["target_exe"]
+        )
+        if os.path.isfile(trace.json_path):
+            written += copy_replacing(
+                trace.json_path, os.path.join(capture["output_dir"], "trace.json"), trace.target_exe, capture["target_exe"]
+            )
+        with self._lock:
+            self.stats["stopped"] += 1
+            self.stats["replayed_bytes"] += written
+        return True
+
+
+def _make_handler(collector: StubCollector):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, payload: dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            try:
+                data = json.loads(raw or b"{}")
+            except ValueError:
+                return {}
+            # ASP.NET binds camelCase and PascalCase alike
+            return {str(k).lower(): v for k, v in data.items()} if isinstance(data, dict) else {}
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "diag": collector.diag()})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            body = self._body()
+            analysis_id = body.get("analysisid")
+            try:
+                if self.path == "/start":
+                    for key in ("analysisid", "outputdir", "targetexe"):
+                        if not body.get(key):
+                            return self._reply(400, {"error": f"{key} is required"})
+                    collector.start(analysis_id, body["outputdir"], body["targetexe"])
+                    return self._reply(200, {"status": "started"})
+                if self.path == "/stop":
+                    if not analysis_id:
+                        return self._reply(400, {"error": "analysis_id is required"})
+                    stopped = collector.stop(analysis_id)
+                    return self._reply(200, {"status": "stopped" if stopped else "already_stopped"})
+                return self._reply(404, {"error": "not found"})
+            except Exception as e:
+                return self._reply(500, {"title": str(e)})
+
+    return Handler
+
+
+def _generated_traces(size: str, seed: int) -> str:
+    from benchmarks.trace_generator import TraceSpec, generate_trace, parse_size
+
+    out_dir = os.path.join(tempfile.gettempdir(), "filetrace-loadtest", f"etw-{size}-{seed}")
+    if not os.path.isfile(os.path.join(out_dir, "manifest.json")):
+        generate_trace(out_dir, TraceSpec(size_bytes=parse_size(size), seed=seed))
+    return out_dir
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stub EtwCollector replaying recorded traces")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--traces", help="directory with recorded trace.csv/trace.json")
+    parser.add_argument("--generate", default="10m", help="synthetic trace size when --traces is not given")
+    parser.add_argument("--recorded-target", default="sample.exe", help="target exe name inside recorded traces")
+    parser.add_argument("--start-latency", type=float, default=0.05)
+    parser.add_argument("--stop-latency", type=float, default=0.2)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    root = args.traces or _generated_traces(args.generate, args.seed)
+    traces = find_traces(root, args.recorded_target)
+    collector = StubCollector(
+        traces,
+        start_latency=args.start_latency,
+        stop_latency=args.stop_latency,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(collector))
+    print(f"stub EtwCollector on http://{args.host}:{args.port} replaying {len(traces)} trace(s) from {root}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Замена DockerCli для нагрузочных прогонов без Windows и docker (DOCKER_BACKEND=fake).
+
+Задержки и доля отказов задаются переменными окружения воркера:
+
+    LOADTEST_DOCKER_BUILD_SECONDS=2  LOADTEST_DOCKER_RUN_SECONDS=5  LOADTEST_DOCKER_DIFF_SECONDS=0.2
+    LOADTEST_DOCKER_JITTER=0.2       (± доля от задержки)
+    LOADTEST_DOCKER_BUILD_FAILURE_RATE=0  LOADTEST_DOCKER_RUN_FAILURE_RATE=0
+    LOADTEST_DOCKER_DIFF_LINES=50    LOADTEST_DOCKER_LOG_LINES=20
+"""
+import asyncio
+import os
+import random
+from dataclasses import dataclass
+
+from app.infra.docker.runner import DockerResult
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(frozen=True)
+class FakeDockerProfile:
+    build_seconds: float
+    run_seconds: float
+    diff_seconds: float
+    cleanup_seconds: float
+    jitter: float
+    build_failure_rate: float
+    run_failure_rate: float
+    diff_lines: int
+    log_lines: int
+
+    @classmethod
+    def from_env(cls) -> "FakeDockerProfile":
+        return cls(
+            build_seconds=_env_float("LOADTEST_DOCKER_BUILD_SECONDS", 2.0),
+            run_seconds=_env_float("LOADTEST_DOCKER_RUN_SECONDS", 5.0),
+            diff_seconds=_env_float("LOADTEST_DOCKER_DIFF_SECONDS", 0.2),
+            cleanup_seconds=_env_float("LOADTEST_DOCKER_CLEANUP_SECONDS", 0.5),
+            jitter=max(0.0, _env_float("LOADTEST_DOCKER_JITTER", 0.2)),
+            build_failure_rate=_env_float("LOADTEST_DOCKER_BUILD_FAILURE_RATE", 0.0),
+            run_failure_rate=_env_float("LOADTEST_DOCKER_RUN_FAILURE_RATE", 0.0),
+            diff_lines=int(_env_float("LOADTEST_DOCKER_DIFF_LINES", 50)),
+            log_lines=int(_env_float("LOADTEST_DOCKER_LOG_LINES", 20)),
+        )
+
+
+class FakeDockerCli:
+    """Тот же интерфейс, что у DockerCli: задержки вместо docker и правдоподобный вывод diff/logs."""
+
+    def __init__(self, analysis_id: str, profile: FakeDockerProfile | None = None):
+        self.analysis_id = str(analysis_id)
+        self.profile = profile or FakeDockerProfile.from_env()
+        self._rnd = random.Random(self.analysis_id)
+
+    @property
+    def container_name(self) -> str:
+        return f"analysis_{self.analysis_id}"
+
+    @property
+    def image_tag(self) -> str:
+        return f"analysis_{self.analysis_id}"
+
+    async def _delay(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        spread = seconds * self.profile.jitter
+        await asyncio.sleep(max(0.0, seconds + self._rnd.uniform(-spread, spread)))
+
+    def _fails(self, rate: float) -> bool:
+        return rate > 0 and self._rnd.random() < rate
+
+    async def build(self, *, dockerfile_path: str, context_dir: str) -> DockerResult:
+        await self._delay(self.profile.build_seconds)
+        if self._fails(self.profile.build_failure_rate):
+            return DockerResult(1, "", f"fake build failure for {self.image_tag}")
+        return DockerResult(0, f"Successfully tagged {self.image_tag}:latest", "")
+
+    async def run(self) -> DockerResult:
+        await self._delay(self.profile.run_seconds)
+        if self._fails(self.profile.run_failure_rate):
+            return DockerResult(125, "", f"fake run failure for {self.container_name}")
+        return DockerResult(0, "", "")
+
+    async def diff(self) -> str:
+        await self._delay(self.profile.diff_seconds)
+        lines = ["C /Users", "C /Users/ContainerUser", "C /Users/ContainerUser/AppData/Local/Temp"]
+        for i in range(max(0, self.profile.diff_lines - len(lines))):
+            kind = self._rnd.choice("AAC")
+            lines.append(f"{kind} /Users/ContainerUser/AppData/Local/Temp/file_{i}.{self._rnd.choice(['tmp', 'dat', 'log'])}")
+        return "\n".join(lines)
+
+    async def logs(self) -> DockerResult:
+        out = "\n".join(f"[{self.container_name}] line {i}" for i in range(self.profile.log_lines))
+        return DockerResult(0, out, "")
+
+    async def stop_rm_rmi(self) -> None:
+        await self._delay(self.profile.cleanup_seconds)
@@ -0,0 +1,336 @@
+"""
+Сценарии нагрузки на запущенный стенд: загрузка файлов, WebSocket статуса анализа, история (REST и /ws-history).
+
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --scenario upload,history,ws-history \\
+        --concurrency 20 --duration 60 --out /tmp/filetrace-loadtest/report.json
+
+Для каждого сценария: пропускная способность, p50/p95/p99 по операциям, ошибки и прирост
+filetrace_db_statements_total / filetrace_redis_roundtrips_total с /metrics за время сценария
+(для учёта воркеров у API и воркеров должен быть общий PROMETHEUS_MULTIPROC_DIR).
+Пользователи берутся из файла loadtest.seed.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+from prometheus_client.parser import text_string_to_metric_families
+
+from loadtest.seed import DEFAULT_USERS_FILE
+
+
+SCENARIOS = ["upload", "history", "ws-history"]
+_COUNTED_METRICS = {
+    "filetrace_db_statements_total": "db_statements",
+    "filetrace_redis_roundtrips_total": "redis_roundtrips",
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.extra: Dict[str, int] = defaultdict(int)
+
+    def ok(self, op: str, seconds: float) -> None:
+        self.latencies[op].append(seconds)
+
+    def error(self, op: str, reason: str) -> None:
+        self.errors[op][reason[:120]] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        ops = {}
+        for op in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies.get(op, []))
+            errors = dict(self.errors.get(op, {}))
+            ops[op] = {
+                "ok": len(values),
+                "errors": sum(errors.values()),
+                "error_reasons": errors,
+                "throughput_per_s": len(values) / elapsed if elapsed > 0 else 0.0,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": (values[-1] if values else 0.0) * 1000,
+            }
+        return ops
+
+
+def _cookies(user: dict) -> Dict[str, str]:
+    return {"refresh_token": user["refresh_token"], "access_token": user["access_token"]}
+
+
+def _cookie_header(user: dict) -> str:
+    return "; ".join(f"{k}={v}" for k, v in _cookies(user).items())
+
+
+def _ws_url(base_url: str, path: str) -> str:
+    if base_url.startswith("https://"):
+        return "wss://" + base_url[len("https://"):] + path
+    return "ws://" + base_url[len("http://"):] + path if base_url.startswith("http://") else base_url + path
+
+
+async def scrape_counters(client: httpx.AsyncClient, metrics_token: str) -> Dict[str, Dict[str, float]]:
+    headers = {"Authorization": f"Bearer {metrics_token}"} if metrics_token else {}
+    try:
+        r = await client.get("/metrics", headers=headers)
+        r.raise_for_status()
+    except Exception:
+        return {}
+    counters: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for family in text_string_to_metric_families(r.text):
+        for sample in family.samples:
+            key = _COUNTED_METRICS.get(sample.name)
+            if key:
+                label = sample.labels.get("verb") or sample.labels.get("kind") or "all"
+                counters[key][label] += sample.value
+    return {k: dict(v) for k, v in counters.items()}
+
+
+def _delta(before: Dict[str, Dict[str, float]], after: Dict[str, Dict[str, float]]) -> Dict[str, dict]:
+    out = {}
+    for key in _COUNTED_METRICS.values():
+        labels = set(before.get(key, {})) | set(after.get(key, {}))
+        by_label = {l: after.get(key, {}).get(l, 0.0) - before.get(key, {}).get(l, 0.0) for l in sorted(labels)}
+        out[key] = {"total": sum(by_label.values()), **by_label}
+    return out
+
+
+class Scenario:
+    def __init__(self, args, users: List[dict], recorder: Recorder):
+        self.args = args
+        self.users = users
+        self.recorder = recorder
+        self.deadline = 0.0
+        self._payloads: List[bytes] = []
+
+    def _client(self, user: dict) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.args.base_url,
+            cookies=_cookies(user),
+            timeout=self.args.timeout,
+            follow_redirects=False,
+            verify=not self.args.insecure,
+        )
+
+    def _payload(self, rnd: random.Random) -> bytes:
+        if self._payloads and rnd.random() < self.args.duplicate_ratio:
+            return rnd.choice(self._payloads)
+        body = b"MZ" + rnd.randbytes(max(0, self.args.file_bytes - 2))
+        self._payloads.append(body)
+        return body
+
+    async def _wait_status(self, user: dict, analysis_id: str, started: float) -> None:
+        rec = self.recorder
+        t0 = time.perf_counter()
+        try:
+            async with websockets.connect(
+                _ws_url(self.args.base_url, f"/analysis/ws/{analysis_id}"),
+                additional_headers={"Cookie": _cookie_header(user)},
+                open_timeout=self.args.timeout,
+            ) as ws:
+                rec.ok("ws_connect", time.perf_counter() - t0)
+                while True:
+                    remaining = self.args.analysis_timeout - (time.perf_counter() - started)
+                    if remaining <= 0:
+                        rec.error("analysis", "timeout")
+                        return
+                    message = json.loads(await asyncio.wait_for(ws.recv(), timeout=remaining))
+                    if "event" in message:
+                        rec.extra["ws_log_messages"] += 1
+                    status = message.get("status")
+                    if status == "completed":
+                        rec.ok("analysis", time.perf_counter() - started)
+                        return
+                    if status == "error":
+                        rec.error("analysis", "status=error")
+                        return
+        except asyncio.TimeoutError:
+            rec.error("analysis", "timeout")
+        except Exception as e:
+            rec.error("ws_connect", f"{type(e).__name__}: {e}")
+
+    async def upload_worker(self, idx: int) -> None:
+        user = self.users[idx % len(self.users)]
+        rnd = random.Random(self.args.seed * 1000 + idx)
+        async with self._client(user) as client:
+            n = 0
+            while time.perf_counter() < self.deadline:
+                n += 1
+                started = time.perf_counter()
+                files = {"file": (f"sample_{idx}_{n}.exe", self._payload(rnd), "application/octet-stream")}
+                try:
+                    r = await client.post("/analysis/analyze", files=files)
+                except Exception as e:
+                    self.recorder.error("upload", f"{type(e).__name__}")
+                    await asyncio.sleep(0.5)
+                    continue
+                if r.status_code != 200:
+                    self.recorder.error("upload", f"HTTP {r.status_code}")
+                    if r.status_code == 429:
+                        await asyncio.sleep(float(r.headers.get("Retry-After") or 1))
+                    continue
+                self.recorder.ok("upload", time.perf_counter() - started)
+                body = r.json()
+                self.recorder.extra[f"upload_{'cached' if body.get('cached') else 'joined' if body.get('joined') else 'queued'}"] += 1
+                if self.args.wait_analysis and body.get("analysis_id"):
+                    if body.get("status") == "completed":
+                        self.recorder.ok("analysis", time.perf_counter() - started)
+                    else:
+                        await self._wait_status(user, body["analysis_id"], started)
+                if self.args.think_time:
+                    await asyncio.sleep(self.args.think_time)
+
+    async def history_worker(self, idx: int) -> None:
+        user = self.users[idx % len(self.users)]
+        async with self._client(user) as client:
+            while time.perf_counter() < self.deadline:
+                started = time.perf_counter()
+                try:
+                    r = await client.get("/analysis/history")
+                    if r.status_code == 200:
+                        self.recorder.ok("history", time.perf_counter() - started)
+                        self.recorder.extra["history_rows"] += len(r.json().get("history") or [])
+                    else:
+                        self.recorder.error("history", f"HTTP {r.status_code}")
+                except Exception as e:
+                    self.recorder.error("history", f"{type(e).__name__}")
+                if self.args.think_time:
+                    await asyncio.sleep(self.args.think_time)
+
+    async def ws_history_worker(self, idx: int) -> None:
+        user = self.users[idx % len(self.users)]
+        while time.perf_counter() < self.deadline:
+            started = time.perf_counter()
+            try:
+                async with websockets.connect(
+                    _ws_url(self.args.base_url, "/analysis/ws-history"),
+                    additional_headers={"Cookie": _cookie_header(user)},
+                    open_timeout=self.args.timeout,
+                ) as ws:
+                    await asyncio.wait_for(ws.recv(), timeout=self.args.timeout)
+                    self.recorder.ok("ws_history_first_message", time.perf_counter() - started)
+                    hold_until = min(self.deadline, time.perf_counter() + self.args.ws_hold)
+                    while time.perf_counter() < hold_until:
+                        try:
+                            await asyncio.wait_for(ws.recv(), timeout=max(0.01, hold_until - time.perf_counter()))
+                            self.recorder.extra["ws_history_updates"] += 1
+                        except asyncio.TimeoutError:
+                            break
+            except Exception as e:
+                self.recorder.error("ws_history_first_message", f"{type(e).__name__}")
+                await asyncio.sleep(0.5)
+
+    async def run(self, name: str) -> float:
+        worker = {
+            "upload": self.upload_worker,
+            "history": self.history_worker,
+            "ws-history": self.ws_history_worker,
+        }[name]
+        started = time.perf_counter()
+        self.deadline = started + self.args.duration
+        await asyncio.gather(*(worker(i) for i in range(self.args.concurrency)))
+        return time.perf_counter() - started
+
+
+async def run_scenarios(args, users: List[dict]) -> dict:
+    report = {"params": {k: v for k, v in vars(args).items() if k not in {"metrics_token"}}, "scenarios": {}}
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, verify=not args.insecure) as metrics_client:
+        for name in args.scenarios:
+            recorder = Recorder()
+            before = await scrape_counters(metrics_client, args.metrics_token)
+            elapsed = await Scenario(args, users, recorder).run(name)
+            # Let in-flight worker writes land in the counters
+            await asyncio.sleep(args.settle)
+            after = await scrape_counters(metrics_client, args.metrics_token)
+            ops = recorder.summary(elapsed)
+            counters = _delta(before, after) if before and after else {}
+            total_ok = sum(op["ok"] for op in ops.values())
+            report["scenarios"][name] = {
+                "elapsed_s": elapsed,
+                "concurrency": args.concurrency,
+                "operations": ops,
+                "counts": dict(recorder.extra),
+                "server_counters": counters,
+                "per_operation": {
+                    key: (value["total"] / total_ok if total_ok else 0.0) for key, value in counters.items()
+                },
+            }
+    return report
+
+
+def print_report(report: dict) -> None:
+    for name, scenario in report["scenarios"].items():
+        print(f"\n== {name}: {scenario['elapsed_s']:.1f}s, concurrency {scenario['concurrency']}")
+        print(f"{'operation':28s} {'ok':>7s} {'err':>6s} {'rps':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s}")
+        for op, s in scenario["operations"].items():
+            print(
+                f"{op:28s} {s['ok']:7d} {s['errors']:6d} {s['throughput_per_s']:8.2f} "
+                f"{s['p50_ms']:9.1f} {s['p95_ms']:9.1f} {s['p99_ms']:9.1f}"
+            )
+        for key, value in scenario["server_counters"].items():
+            per_op = scenario["per_operation"].get(key, 0.0)
+            detail = ", ".join(f"{k}={v:.0f}" for k, v in value.items() if k != "total")
+            print(f"{key:28s} {value['total']:9.0f}  ({per_op:.1f}/op)  {detail}")
+        if not scenario["server_counters"]:
+            print("server counters: /metrics unavailable")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="FileTrace load test clients")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users-file", default=DEFAULT_USERS_FILE)
+    parser.add_argument("--scenario", default="upload,history,ws-history", help=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per scenario")
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--insecure", action="store_true", help="skip TLS verification")
+    parser.add_argument("--file-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="share of uploads reusing an earlier file")
+    parser.add_argument("--no-wait", dest="wait_analysis", action="store_false", help="do not follow analyses over WebSocket")
+    parser.add_argument("--analysis-timeout", type=float, default=600.0)
+    parser.add_argument("--ws-hold", type=float, default=5.0, help="seconds to keep each /ws-history connection")
+    parser.add_argument("--settle", type=float, default=1.0)
+    parser.add_argument("--metrics-token", default=os.getenv("METRICS_TOKEN", ""))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    args.scenarios = [s.strip() for s in args.scenario.split(",") if s.strip()]
+    unknown = sorted(set(args.scenarios) - set(SCENARIOS))
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    args.base_url = args.base_url.rstrip("/")
+
+    with open(args.users_file, "r", encoding="utf-8") as f:
+        users = json.load(f)
+    if not users:
+        parser.error("users file is empty, run python -m loadtest.seed first")
+
+    report = asyncio.run(run_scenarios(args, users))
+    print_report(report)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nsaved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Подтверждённые пользователи для нагрузочных клиентов (вход с капчей скриптами не пройти).
+
+    python -m loadtest.seed --users 50 --out /tmp/filetrace-loadtest/users.json
+
+Повторный запуск переиспользует тех же пользователей и выдаёт им новые refresh-токены.
+Нужны DATABASE_URL, SECRET_KEY, ENCRYPTION_KEY и HMAC_KEY того же стенда, что у API.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from typing import List, Optional
+
+from app.auth.auth import create_access_token, create_refresh_token
+from app.core.crypto import encrypt_str, hmac_hash, normalize_email
+from app.core.security import get_password_hash
+from app.infra.db.session import AsyncSessionLocal, engine
+from app.models.user import Users
+from app.repositories.user_repository import UserRepository
+
+
+DEFAULT_USERS_FILE = os.path.join(tempfile.gettempdir(), "filetrace-loadtest", "users.json")
+
+
+async def seed_users(count: int, prefix: str = "loadtest") -> List[dict]:
+    # One cheap hash for everybody: the password is never used by the clients.
+    hashed_password = get_password_hash(f"{prefix}-password", rounds=4)
+    users = []
+    async with AsyncSessionLocal() as db:
+        repo = UserRepository(db)
+        for i in range(count):
+            email = f"{prefix}-{i}@example.invalid"
+            user = await repo.get_by_email(email)
+            if user is None:
+                user = Users(
+                    email_hash=hmac_hash(normalize_email(email)),
+                    email_encrypted=encrypt_str(email),
+                    hashed_password=hashed_password,
+                    confirmed=True,
+                )
+                db.add(user)
+                await db.flush()
+            user.confirmed = True
+            user.refresh_token = create_refresh_token(data={"sub": str(user.id)})
+            users.append(
+                {
+                    "user_id": str(user.id),
+                    "email": email,
+                    "refresh_token": user.refresh_token,
+                    "access_token": create_access_token(data={"sub": str(user.id)}),
+                }
+            )
+        await db.commit()
+    return users
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Seed confirmed users for the load test")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--prefix", default="loadtest")
+    parser.add_argument("--out", default=DEFAULT_USERS_FILE)
+    args = parser.parse_args(argv)
+
+    async def _run():
+        try:
+            return await seed_users(args.users, args.prefix)
+        finally:
+            await engine.dispose()
+
+    users = asyncio.run(_run())
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(users, f, indent=2)
+    print(f"{len(users)} users written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
 import subprocess
 from app.main import create_app
 import time
-import psycopg2
-from psycopg2 import OperationalError
+from app.core.settings import settings
 from app.infra.db.session import DATABASE_URL
 
 app = create_app()
 
 def wait_for_postgres(timeout=60, delay=2):
     """Ожидание запуска PostgreSQL."""
+    import psycopg2
+    from psycopg2 import OperationalError
+
     start_time = time.time()
 
     sync_url = DATABASE_URL
@@ -33,7 +35,7 @@ import uvicorn
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=443,
-        reload=True
+        host=settings.UVICORN_HOST,
+        port=settings.UVICORN_PORT,
+        reload=settings.UVICORN_RELOAD,
     )
\ No newline at end of file
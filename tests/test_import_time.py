@@ -0,0 +1,64 @@
+"""
+Бюджет холодного старта API: `import app.main` + `create_app()` в чистом интерпретаторе.
+
+Порог — IMPORT_TIME_BUDGET_SECONDS (по умолчанию 2.5 с, лучший из трёх запусков).
+Разбор по модулям: python -X importtime -c "import app.main" 2> importtime.txt
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "2.5"))
+
+# Needed only by Celery workers, e-mail sending, captcha rendering or maintenance scripts
+_LAZY_MODULES = (
+    "app.celery_app",
+    "app.tasks.analysis",
+    "app.utils.captcha",
+    "captcha",
+    "PIL",
+    "fastapi_mail",
+    "psycopg2",
+)
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app.main import create_app
+create_app()
+elapsed = time.perf_counter() - started
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (_LAZY_MODULES,)
+
+
+def _probe() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if proc.returncode != 0:
+        pytest.fail(f"create_app() failed in a fresh interpreter:\n{proc.stderr[-4000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_heavy_subsystems_are_imported_lazily():
+    assert _probe()["loaded"] == []
+
+
+def test_cold_start_within_budget():
+    best = min(_probe()["elapsed"] for _ in range(3))
+    assert best <= IMPORT_TIME_BUDGET_SECONDS, (
+        f"import app.main + create_app() took {best:.2f}s, budget {IMPORT_TIME_BUDGET_SECONDS:.2f}s"
+    )
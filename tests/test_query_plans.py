@@ -0,0 +1,175 @@
+"""
+EXPLAIN-проверка горячих запросов репозиториев: каждый должен идти по индексу.
+
+Нужна отдельная PostgreSQL база: TEST_DATABASE_URL=postgresql://... python -m pytest tests/test_query_plans.py
+Схема создаётся во временном schema из db/init.sql + db/migrations и удаляется после теста.
+"""
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.infra.db.init import _split_sql_statements
+from app.infra.db.migrations import apply_migrations
+from app.infra.db.session import _normalize_database_url
+from app.repositories.analysis_repository import AnalysisRepository
+from app.repositories.analysis_subscriber_repository import AnalysisSubscriberRepository
+from app.repositories.analysis_summary_repository import AnalysisSummaryRepository
+from app.repositories.file_activity_repository import FileActivityRepository
+from app.repositories.result_repository import ResultRepository
+from app.repositories.user_repository import UserRepository
+
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+_CHECKED_TABLES = {"analysis", "analysis_subscribers", "users", "results", "analysis_summary", "file_activity_events"}
+
+_SEED_SQL = """
+INSERT INTO users (id, email_hash, email_encrypted, hashed_password, confirmed, refresh_token, expires_at)
+SELECT uuid_generate_v4(), md5('u' || g), 'x', 'x', g % 10 <> 0, md5('t' || g), now() + interval '10 minutes'
+FROM generate_series(1, 2000) AS g;
+
+INSERT INTO analysis (user_id, filename, file_hash, pipeline_version, timestamp, status, analysis_id)
+SELECT u.id, 'f' || g || '.exe', md5('h' || (g % 3000)), 'v1', now() - g * interval '1 minute',
+       CASE WHEN g % 200 = 0 THEN 'queued' WHEN g % 200 = 1 THEN 'running' WHEN g % 20 = 2 THEN 'error' ELSE 'completed' END,
+       uuid_generate_v4()
+FROM generate_series(1, 20000) AS g
+JOIN (SELECT id, row_number() OVER () AS n FROM users) AS u ON u.n = 1 + g % 2000;
+
+INSERT INTO analysis_subscribers (analysis_id, user_id)
+SELECT a.analysis_id, u.id
+FROM (SELECT analysis_id, row_number() OVER () AS n FROM analysis) AS a
+JOIN (SELECT id, row_number() OVER () AS n FROM users) AS u ON u.n = 1 + (a.n * 7) % 2000
+WHERE a.n % 5 = 0;
+
+INSERT INTO results (analysis_id, file_activity, docker_output, results)
+SELECT analysis_id, '', '', '' FROM analysis;
+
+INSERT INTO analysis_summary (analysis_id, danger_count)
+SELECT analysis_id, 1 FROM analysis WHERE status = 'completed';
+
+INSERT INTO file_activity_events (analysis_id, seq, kind, path)
+SELECT a.analysis_id, s, 'A', '/tmp/' || s
+FROM (SELECT analysis_id FROM analysis LIMIT 200) AS a, generate_series(0, 99) AS s;
+
+ANALYZE
+"""
+
+
+def _seq_scans(plan: dict) -> list:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in _CHECKED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []) or []:
+        found.extend(_seq_scans(child))
+    return found
+
+
+async def _run_checks() -> dict:
+    schema = f"plan_check_{uuid.uuid4().hex[:12]}"
+    url = _normalize_database_url(TEST_DATABASE_URL)
+
+    admin = create_async_engine(url)
+    async with admin.begin() as conn:
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+
+    # Seq scans stay possible but maximally expensive: any that remain mean no usable index exists.
+    engine = create_async_engine(
+        url,
+        connect_args={"server_settings": {"search_path": f"{schema}, public", "enable_seqscan": "off"}},
+    )
+    captured = []
+    capturing = {"on": False}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if capturing["on"] and statement.lstrip().upper().startswith(("SELECT", "(SELECT")):
+            captured.append((statement, parameters))
+
+    try:
+        with open(os.path.join("db", "init.sql"), "r", encoding="utf-8") as f:
+            init_sql = f.read()
+        async with engine.begin() as conn:
+            for stmt in _split_sql_statements(init_sql):
+                await conn.execute(text(stmt))
+        await apply_migrations(engine)
+        async with engine.begin() as conn:
+            for stmt in _split_sql_statements(_SEED_SQL):
+                await conn.execute(text(stmt))
+
+        async with engine.connect() as conn:
+            row = (
+                await conn.execute(
+                    text(
+                        "SELECT a.analysis_id, a.user_id, a.file_hash, u.refresh_token "
+                        "FROM analysis a JOIN users u ON u.id = a.user_id LIMIT 1"
+                    )
+                )
+            ).first()
+        analysis_id, user_id, file_hash, refresh_token = row
+
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        cases = {
+            "list_global_active": lambda db: AnalysisRepository(db).list_global_active(),
+            "list_user_analyses": lambda db: AnalysisRepository(db).list_user_analyses(user_id),
+            "get_accessible_by_id": lambda db: AnalysisRepository(db).get_accessible_by_id(
+                analysis_id=analysis_id, user_id=user_id
+            ),
+            "get_accessible_with_summary": lambda db: AnalysisRepository(db).get_accessible_with_summary(
+                analysis_id=analysis_id, user_id=user_id
+            ),
+            "get_by_id": lambda db: AnalysisRepository(db).get_by_id(analysis_id),
+            "find_latest_completed_by_hash": lambda db: AnalysisRepository(db).find_latest_completed_by_hash(
+                file_hash=file_hash, pipeline_version="v1"
+            ),
+            "find_active_by_hash": lambda db: AnalysisRepository(db).find_active_by_hash(
+                file_hash=file_hash, pipeline_version="v1"
+            ),
+            "subscriber_get": lambda db: AnalysisSubscriberRepository(db).get(analysis_id=analysis_id, user_id=user_id),
+            "result_get": lambda db: ResultRepository(db).get_by_analysis_id(analysis_id),
+            "summary_get": lambda db: AnalysisSummaryRepository(db).get_by_analysis_id(analysis_id),
+            "file_activity_chunk": lambda db: FileActivityRepository(db).get_chunk(analysis_id, offset=10, limit=50),
+            "file_activity_count": lambda db: FileActivityRepository(db).count(analysis_id),
+            "user_by_id": lambda db: UserRepository(db).get_by_id(user_id),
+            "user_by_refresh_token": lambda db: UserRepository(db).get_by_refresh_token(refresh_token),
+            "list_unconfirmed_users": lambda db: UserRepository(db).list_unconfirmed_users(),
+        }
+
+        results = {}
+        for name, call in cases.items():
+            captured.clear()
+            capturing["on"] = True
+            try:
+                async with session_factory() as db:
+                    await call(db)
+            finally:
+                capturing["on"] = False
+            assert captured, f"{name}: no SELECT captured"
+
+            scans = []
+            async with engine.connect() as conn:
+                for statement, parameters in captured:
+                    res = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+                    plan = res.scalar()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    scans.extend(_seq_scans(plan[0]["Plan"]))
+            results[name] = scans
+        return results
+    finally:
+        await engine.dispose()
+        async with admin.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await admin.dispose()
+
+
+def test_repository_queries_use_indexes():
+    results = asyncio.run(_run_checks())
+    offenders = {name: scans for name, scans in results.items() if scans}
+    assert not offenders, f"sequential scans: {offenders}"
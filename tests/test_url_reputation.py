@@ -0,0 +1,84 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.services.url_reputation_service import UrlReputationService, normalize_reputation_url
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    delay_s = 0.3
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        time.sleep(self.delay_s)
+        if self.path.startswith("/vt/urls"):
+            self._reply({"data": {"id": "an-1"}})
+        elif self.path.startswith("/ysb/threatMatches:find"):
+            self._reply({"matches": [{"threatType": "MALWARE"}]})
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        time.sleep(self.delay_s)
+        if self.path.startswith("/vt/analyses/an-1"):
+            self._reply({"data": {"attributes": {"stats": {"malicious": 0, "suspicious": 1}}}})
+        else:
+            self.send_error(404)
+
+
+def _start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_check_queries_providers_concurrently():
+    server, base = _start_stub()
+
+    async def _run():
+        async with httpx.AsyncClient() as client:
+            service = UrlReputationService(
+                http_client=client,
+                use_cache=False,
+                vt_api_key="vt",
+                vt_base_url=f"{base}/vt",
+                yandex_api_key="ysb",
+                yandex_base_url=f"{base}/ysb",
+            )
+            started = time.monotonic()
+            result = await service.check("http://example.com/a.exe")
+            return result, time.monotonic() - started
+
+    try:
+        result, elapsed = asyncio.run(_run())
+    finally:
+        server.shutdown()
+
+    assert result["verdict"] == "malicious"
+    assert result["reasons"] == ["yandex_safe_browsing_match"]
+    assert result["vt"]["stats"]["suspicious"] == 1
+    assert result["cached"] is False
+    # VT needs two sequential round trips, Yandex one; run together this is ~2 delays, not 3.
+    assert elapsed < _StubHandler.delay_s * 3
+
+
+def test_normalize_reputation_url():
+    assert normalize_reputation_url("HTTP://Example.COM:80/a.exe#x") == "http://example.com/a.exe"
+    assert normalize_reputation_url("https://example.com") == "https://example.com/"
+    assert normalize_reputation_url("https://example.com:8443/?q=1") == "https://example.com:8443/?q=1"